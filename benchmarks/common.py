@@ -0,0 +1,79 @@
+"""Helpers to run the application in-process against a seeded file cache, without upstream requests."""
+
+from __future__ import annotations
+
+import asyncio
+import datetime
+import os
+import statistics
+import sys
+import tempfile
+import time
+from decimal import Decimal
+
+import aiohttp
+from aiohttp import web
+
+
+def configure_environment() -> None:
+    """Point the settings at a temporary file cache, must run before the application is imported."""
+    os.environ["STORAGE_TYPE"] = "file"
+    os.environ["CACHE_DIR"] = tempfile.mkdtemp(prefix="rates-benchmark-")
+
+
+async def seed(app: web.Application, values: int = 4) -> None:
+    from src.app import STORAGE_KEY  # noqa: PLC0415
+    from src.lib.currency_check_exists import check_currency  # noqa: PLC0415
+    from src.lib.types import (  # noqa: PLC0415
+        CurrencyInfo,
+        CurrencyValue,
+    )
+
+    today = datetime.datetime.now(tz=datetime.UTC).date()
+    check_currency.cached_currencies.update({"usd", "eur", "rub", "byn", "pln"})
+    info = CurrencyInfo(
+        date=today,
+        currency="usd",
+        values=[CurrencyValue(currency=f"c{number:05}", value=Decimal("1.2345")) for number in range(values)],
+    )
+    await app[STORAGE_KEY].cache_currency_info(info=info, key=f"{today.isoformat()}-usd.json")
+
+
+async def run_requests(requests: int, concurrency: int, values: int = 4) -> list[float]:
+    """Serve the seeded application over TCP and return the latency of each ``/rates/usd`` request."""
+    from src.app import create_app  # noqa: PLC0415
+
+    runner = web.AppRunner(create_app(), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host="127.0.0.1", port=0)
+    await site.start()
+    await seed(app=runner.app, values=values)
+    host, port = runner.addresses[0][:2]
+    url = f"http://{host}:{port}/rates/usd"
+    latencies: list[float] = []
+    remaining = iter(range(requests))
+
+    async def worker(session: aiohttp.ClientSession) -> None:
+        for _ in remaining:
+            started = time.perf_counter()
+            async with session.get(url) as response:
+                await response.read()
+            latencies.append(time.perf_counter() - started)
+
+    try:
+        async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=concurrency)) as session:
+            await asyncio.gather(*(worker(session=session) for _ in range(concurrency)))
+    finally:
+        await runner.cleanup()
+    return latencies
+
+
+def report(name: str, latencies: list[float], elapsed: float, cpu: float | None = None) -> None:
+    quantiles = statistics.quantiles(latencies, n=100)
+    line = (
+        f"{name:>8}: {len(latencies) / elapsed:9.0f} req/s"
+        f"  p50 {quantiles[49] * 1000:6.2f} ms  p99 {quantiles[98] * 1000:6.2f} ms"
+    )
+    if cpu is not None:
+        line += f"  CPU {cpu / len(latencies) * 1_000_000:6.1f} us/req"
+    sys.stdout.write(line + "\n")
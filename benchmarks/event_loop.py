@@ -0,0 +1,52 @@
+"""Compare the default asyncio event loop with uvloop on cached ``/rates`` requests.
+
+The application runs in-process on file storage in a temporary directory, seeded with today's
+document so that no request reaches upstream, and is driven over TCP by a client on the same loop::
+
+    uv run --extra uvloop python -m benchmarks.event_loop --requests 20000 --concurrency 64
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+import time
+from collections.abc import Callable
+
+from benchmarks.common import (
+    configure_environment,
+    report,
+    run_requests,
+)
+
+LoopFactory = Callable[[], asyncio.AbstractEventLoop]
+
+
+def loop_factories() -> dict[str, LoopFactory]:
+    factories: dict[str, LoopFactory] = {"asyncio": asyncio.new_event_loop}
+    try:
+        import uvloop  # noqa: PLC0415
+    except ImportError:
+        sys.stdout.write("uvloop is not installed, only the default loop is measured\n")
+    else:
+        factories["uvloop"] = uvloop.new_event_loop
+    return factories
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=10_000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args()
+
+    configure_environment()
+    for name, factory in loop_factories().items():
+        with asyncio.Runner(loop_factory=factory) as runner:
+            started = time.perf_counter()
+            latencies = runner.run(run_requests(requests=args.requests, concurrency=args.concurrency))
+            report(name=name, latencies=latencies, elapsed=time.perf_counter() - started)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Compare the CPU cost of file storage hits answered from bytes and with ``sendfile``.
+
+Both runs serve today's seeded document from a file cache without an in-process copy; one hands
+the file to ``FileResponse``, the other reads it into memory and answers with ``json_response``.
+The CPU time includes the in-process client, so only the difference matters. ``--values`` sets the
+size of the document (about 30 bytes per value) to find where ``sendfile`` starts to pay off::
+
+    uv run python -m benchmarks.file_response --requests 5000 --values 10000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import time
+
+from benchmarks.common import (
+    configure_environment,
+    report,
+    run_requests,
+)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=10_000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--values", type=int, default=4, help="currency values in the served document")
+    args = parser.parse_args()
+
+    configure_environment()
+    os.environ["MEMORY_CACHE_SIZE"] = "0"
+    from src.config import get_settings  # noqa: PLC0415
+
+    settings = get_settings()
+    settings.api.SENDFILE_MIN_BYTES = 0
+    for name, sendfile in (("sendfile", True), ("bytes", False)):
+        settings.api.SENDFILE_ENABLED = sendfile
+        started = time.perf_counter()
+        cpu_started = time.process_time()
+        latencies = asyncio.run(run_requests(requests=args.requests, concurrency=args.concurrency, values=args.values))
+        report(
+            name=name,
+            latencies=latencies,
+            elapsed=time.perf_counter() - started,
+            cpu=time.process_time() - cpu_started,
+        )
+
+
+if __name__ == "__main__":
+    main()
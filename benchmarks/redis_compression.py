@@ -0,0 +1,97 @@
+"""Compare the size of Redis values stored raw and zlib-compressed with the CPU spent per read.
+
+Documents of a few sizes are encoded in both media formats; for each, the stored size with and
+without compression and the time to decompress it on a read are reported. With ``--redis-url``,
+``--keys`` copies of each document are also written to that Redis, and the ``MEMORY USAGE`` of a
+raw and of a compressed key is reported::
+
+    uv run python -m benchmarks.redis_compression --values 5 50 300 2000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import datetime
+import sys
+import timeit
+from decimal import Decimal
+
+from redis.asyncio import Redis
+
+from src.lib.coders import (
+    json_encoder,
+    msgpack_encoder,
+)
+from src.lib.compression import ValueCodec
+from src.lib.types import (
+    CurrencyInfo,
+    CurrencyValue,
+)
+
+
+def document(values: int) -> CurrencyInfo:
+    return CurrencyInfo(
+        date=datetime.date(2024, 5, 1),
+        currency="usd",
+        values=[
+            CurrencyValue(currency=f"c{number:04}", value=Decimal(f"{(number * 7919) % 100_000 / 997:.8f}"))
+            for number in range(values)
+        ],
+    )
+
+
+def measure(name: str, raw: bytes, codec: ValueCodec, number: int) -> bytes:
+    compressed = codec.encode(raw)
+    encode_us = timeit.timeit(lambda: codec.encode(raw), number=number) / number * 1_000_000
+    decode_us = timeit.timeit(lambda: codec.decode(compressed), number=number) / number * 1_000_000
+    sys.stdout.write(
+        f"{name:>16}: {len(raw):8d} B raw  {len(compressed):8d} B stored ({len(compressed) / len(raw):6.1%})"
+        f"  encode {encode_us:7.1f} us  decode {decode_us:7.1f} us/read\n",
+    )
+    return compressed
+
+
+async def memory_usage(url: str, raw: bytes, compressed: bytes, keys: int) -> tuple[int, int]:
+    client = Redis.from_url(url)
+    try:
+        async with client.pipeline(transaction=False) as pipe:
+            for number in range(keys):
+                pipe.set(f"benchmark:raw:{number}", raw)
+                pipe.set(f"benchmark:zlib:{number}", compressed)
+            await pipe.execute()
+        raw_usage: int = await client.memory_usage("benchmark:raw:0") or 0
+        compressed_usage: int = await client.memory_usage("benchmark:zlib:0") or 0
+        for pattern in ("benchmark:raw:*", "benchmark:zlib:*"):
+            keys_to_delete = [key async for key in client.scan_iter(match=pattern)]
+            if keys_to_delete:
+                await client.unlink(*keys_to_delete)
+    finally:
+        await client.aclose()
+    return raw_usage, compressed_usage
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--values", type=int, nargs="+", default=[5, 50, 300, 2000], help="values per document")
+    parser.add_argument("--level", type=int, default=6, help="zlib compression level")
+    parser.add_argument("--number", type=int, default=2000, help="timed encodings and decodings per document")
+    parser.add_argument("--redis-url", default=None, help="also measure MEMORY USAGE on this Redis")
+    parser.add_argument("--keys", type=int, default=1000, help="keys written per document to Redis")
+    args = parser.parse_args()
+
+    codec = ValueCodec(min_size=0, level=args.level, min_saving=0)
+    for values in args.values:
+        info = document(values=values)
+        for format_name, encoder in (("json", json_encoder), ("msgpack", msgpack_encoder)):
+            raw = encoder.encode(info)
+            compressed = measure(name=f"{values} {format_name}", raw=raw, codec=codec, number=args.number)
+            if args.redis_url is not None:
+                raw_usage, compressed_usage = asyncio.run(
+                    memory_usage(url=args.redis_url, raw=raw, compressed=compressed, keys=args.keys),
+                )
+                sys.stdout.write(f"{'':>16}  MEMORY USAGE {raw_usage} B raw, {compressed_usage} B compressed\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""Replay captured rate requests against the application and report latency and cache hits.
+
+Requests captured with ``TRAFFIC_CAPTURE_PATH`` are sent to ``create_app()`` in-process, at their
+original pace or ``--speed`` times faster, while an in-process upstream simulator serves the rates.
+Storage and expiry settings come from the environment, so configurations can be compared on the
+same traffic::
+
+    STORAGE_TYPE=file FILE_EXPIRE_SECONDS=600 uv run python -m benchmarks.replay capture.tsv --speed 10
+    STORAGE_TYPE=redis REDIS_LAYOUT=hash uv run python -m benchmarks.replay capture.tsv --speed 10
+
+The cache hit ratio counts the successful responses that were served without an upstream request for
+rate documents, nor from the stale fallback (``X-Rates-Stale``), which is reported apart.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import collections
+import datetime
+import os
+import socket
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import (
+    dataclass,
+    field,
+)
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import aiohttp
+from aiohttp import web
+
+from src.lib.capture import (
+    CapturedRequest,
+    read_capture,
+)
+from src.lib.upstream_sim import (
+    SIMULATOR_KEY,
+    LatencyDistribution,
+    SimulatorOptions,
+    create_simulator_app,
+    simulator_urls,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Mapping
+
+LATE_THRESHOLD = 0.01
+
+
+@dataclass
+class ReplayResult:
+    latencies: list[float] = field(default_factory=list)
+    statuses: collections.Counter[int] = field(default_factory=collections.Counter)
+    stale: int = 0
+    """Successful responses served from the stale fallback."""
+    late: int = 0
+    elapsed: float = 0.0
+
+
+def free_port(host: str) -> int:
+    with socket.socket() as sock:
+        sock.bind((host, 0))
+        port: int = sock.getsockname()[1]
+        return port
+
+
+def configure_environment(host: str, port: int, cache_dir: Path | None) -> None:
+    """Point the settings at the simulator and a cache directory, must run before the application is imported."""
+    currencies_url, currency_url = simulator_urls(host=host, port=port)
+    os.environ["CURRENCIES_API_LIST_URL"] = currencies_url
+    os.environ["CURRENCY_API_WITH_DATE_URL"] = currency_url
+    os.environ["CACHE_DIR"] = str(cache_dir or tempfile.mkdtemp(prefix="rates-replay-"))
+
+
+def request_path(request: CapturedRequest, shift: datetime.timedelta | None) -> str:
+    if not request.date:
+        return f"/rates/{request.currency}"
+    if shift is None:
+        return f"/rates/{request.currency}/{request.date}"
+    try:
+        shifted = datetime.date.fromisoformat(request.date) + shift
+    except ValueError:
+        return f"/rates/{request.currency}/{request.date}"
+    return f"/rates/{request.currency}/{shifted.isoformat()}"
+
+
+async def replay(
+    requests: list[CapturedRequest],
+    base_url: str,
+    speed: float,
+    max_connections: int,
+    shift: datetime.timedelta | None,
+) -> ReplayResult:
+    """Send each request at its captured offset from the first one, divided by ``speed``."""
+    from src.app import STALE_HEADER  # noqa: PLC0415
+
+    result = ReplayResult()
+    loop = asyncio.get_running_loop()
+    first = requests[0].timestamp
+
+    async def send(session: aiohttp.ClientSession, path: str) -> None:
+        started = time.perf_counter()
+        try:
+            async with session.get(f"{base_url}{path}") as response:
+                await response.read()
+                result.statuses[response.status] += 1
+                if STALE_HEADER in response.headers:
+                    result.stale += 1
+        except aiohttp.ClientError:
+            result.statuses[0] += 1
+        result.latencies.append(time.perf_counter() - started)
+
+    started = loop.time()
+    tasks: list[asyncio.Task[None]] = []
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=max_connections)) as session:
+        for request in requests:
+            delay = started + (request.timestamp - first) / speed - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            elif delay < -LATE_THRESHOLD:
+                result.late += 1
+            tasks.append(asyncio.create_task(send(session=session, path=request_path(request=request, shift=shift))))
+        await asyncio.gather(*tasks)
+    result.elapsed = loop.time() - started
+    return result
+
+
+async def run(args: argparse.Namespace, requests: list[CapturedRequest], port: int) -> None:
+    from src.app import (  # noqa: PLC0415
+        METRICS_KEY,
+        create_app,
+    )
+
+    options = SimulatorOptions(latency=args.upstream_latency, currencies=args.currencies)
+    simulator = web.AppRunner(create_simulator_app(options=options), access_log=None)
+    await simulator.setup()
+    await web.TCPSite(simulator, host=args.host, port=port).start()
+    runner = web.AppRunner(create_app(), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host=args.host, port=0)
+    await site.start()
+    host, app_port = runner.addresses[0][:2]
+    shift = None
+    if args.shift_dates:
+        captured_on = datetime.datetime.fromtimestamp(requests[0].timestamp, tz=datetime.UTC).date()
+        shift = datetime.datetime.now(tz=datetime.UTC).date() - captured_on
+    try:
+        result = await replay(
+            requests=requests,
+            base_url=f"http://{host}:{app_port}",
+            speed=args.speed,
+            max_connections=args.max_connections,
+            shift=shift,
+        )
+        upstream_sim = simulator.app[SIMULATOR_KEY]
+        upstream = {**upstream_sim.stats(), "documents": upstream_sim.documents}
+        metrics = runner.app[METRICS_KEY].collect() if args.metrics else None
+    finally:
+        await runner.cleanup()
+        await simulator.cleanup()
+    report(result=result, upstream=upstream, metrics=metrics)
+
+
+def report(result: ReplayResult, upstream: dict[str, int], metrics: Mapping[str, object] | None) -> None:
+    requests = len(result.latencies)
+    quantiles = statistics.quantiles(result.latencies, n=100) if requests > 1 else result.latencies * 99
+    successful = result.statuses[200]
+    fetched = upstream["ok"] + upstream["slow"]
+    hits = successful - result.stale - fetched
+    hit_ratio = max(hits, 0) / successful if successful else 0.0
+    statuses = ", ".join(f"{status or 'failed'}: {count}" for status, count in sorted(result.statuses.items()))
+    sys.stdout.write(
+        f"requests: {requests} in {result.elapsed:.1f} s ({requests / result.elapsed:.0f} req/s), {result.late} late\n"
+        f"statuses: {statuses}\n"
+        f"latency: p50 {quantiles[49] * 1000:.2f} ms  p90 {quantiles[89] * 1000:.2f} ms"
+        f"  p99 {quantiles[98] * 1000:.2f} ms  max {max(result.latencies) * 1000:.2f} ms\n"
+        f"upstream: {upstream['documents']} rate documents requested, {fetched} served,"
+        f" {upstream['currency_lists']} currency lists\n"
+        f"stale fallbacks: {result.stale} of successful responses\n"
+        f"cache hit ratio: {hit_ratio:.2%} of successful responses\n",
+    )
+    if metrics is not None:
+        from src.lib.coders import json_encoder  # noqa: PLC0415
+
+        sys.stdout.write(json_encoder.encode(metrics).decode() + "\n")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("capture", type=Path, help="file written with TRAFFIC_CAPTURE_PATH")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay rate as a multiple of the captured one")
+    parser.add_argument("--limit", type=int, default=None, help="replay the first requests only")
+    parser.add_argument("--max-connections", type=int, default=256, help="simultaneous connections to the app")
+    parser.add_argument("--shift-dates", action="store_true", help="move requested dates by the capture's age")
+    parser.add_argument("--cache-dir", type=Path, default=None, help="cache directory, a new one by default")
+    parser.add_argument(
+        "--upstream-latency",
+        type=LatencyDistribution.parse,
+        default=LatencyDistribution.parse("p50=20,p90=80,p99=400"),
+        help="simulated upstream latency percentiles in milliseconds",
+    )
+    parser.add_argument("--currencies", type=int, default=28, help="rates per simulated document")
+    parser.add_argument("--metrics", action="store_true", help="print the application metrics after the replay")
+    parser.add_argument("--host", default="127.0.0.1")
+    args = parser.parse_args()
+
+    requests = list(read_capture(path=args.capture))[: args.limit]
+    if not requests:
+        message = f"No requests in {args.capture}"
+        raise SystemExit(message)
+    port = free_port(host=args.host)
+    configure_environment(host=args.host, port=port, cache_dir=args.cache_dir)
+    asyncio.run(run(args=args, requests=requests, port=port))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,72 @@
-from aiohttp import web
+import asyncio
+import contextlib
+import logging
+from pathlib import Path
+
+from aiohttp import (
+    hdrs,
+    web,
+)
 from redis.asyncio import Redis
 
 from src.config import get_settings
+from src.lib.admission import (
+    STREAM_ROUTE_NAME,
+    AdmissionController,
+    admission_middleware,
+)
 from src.lib.cache_storage import (
+    HASH_LAYOUT,
+    CachedFile,
+    CacheStorage,
     FileStorage,
+    RedisHashStorage,
     RedisStorage,
 )
+from src.lib.capture import (
+    TrafficCapture,
+    capture_middleware,
+)
+from src.lib.coders import (
+    JSON_FORMAT,
+    MediaFormat,
+    json_encoder,
+    negotiate_media_format,
+)
+from src.lib.compression import get_value_codec
+from src.lib.currency_check_exists import check_currency
 from src.lib.currency_rates_getter import CurrencyRatesGetter
-from src.lib.validators import get_currency_and_date
+from src.lib.debug import check_debug_token
+from src.lib.loop_monitor import LoopLagMonitor
+from src.lib.memory_cache import MemoryCache
+from src.lib.memory_tracer import (
+    GROUP_BY,
+    MemoryTracer,
+)
+from src.lib.metrics import MetricsRegistry
+from src.lib.profiler import SlowRequestProfiler
+from src.lib.providers import (
+    RacingProvider,
+    get_provider,
+    get_upstream_limiter,
+)
+from src.lib.rate_updates import (
+    CLOSED,
+    RateBroadcaster,
+)
+from src.lib.redis_tracking import ClientSideCache
+from src.lib.single_flight import SingleFlight
+from src.lib.sketch import HeavyHitters
+from src.lib.snapshot import CacheSnapshot
+from src.lib.stale_fallback import StaleFallback
+from src.lib.timeseries import TimeSeriesStore
+from src.lib.validators import (
+    coverage_window,
+    get_currency_and_date,
+    get_currency_and_date_range,
+    validate_currency,
+)
+from src.lib.write_behind import WriteBehindStorage
 
 routes = web.RouteTableDef()
 
@@ -15,51 +74,481 @@ routes = web.RouteTableDef()
 __all__ = ("create_app",)
 
 
-STORAGE_KEY: web.AppKey[FileStorage | RedisStorage] = web.AppKey("storage")
+STORAGE_KEY: web.AppKey[CacheStorage] = web.AppKey("storage")
 REDIS_CLIENT_KEY: web.AppKey[Redis] = web.AppKey("redis_client")
+ADMISSION_KEY: web.AppKey[AdmissionController] = web.AppKey("admission")
+LOOP_MONITOR_KEY: web.AppKey[LoopLagMonitor] = web.AppKey("loop_monitor")
+CLIENT_CACHE_KEY: web.AppKey[ClientSideCache] = web.AppKey("client_cache")
+METRICS_KEY: web.AppKey[MetricsRegistry] = web.AppKey("metrics")
+SNAPSHOT_KEY: web.AppKey[CacheSnapshot] = web.AppKey("snapshot")
+TIMESERIES_KEY: web.AppKey[TimeSeriesStore] = web.AppKey("timeseries")
+BROADCASTER_KEY: web.AppKey[RateBroadcaster] = web.AppKey("broadcaster")
+PROFILER_KEY: web.AppKey[SlowRequestProfiler] = web.AppKey("profiler")
+DEBUG_TOKEN_KEY: web.AppKey[str] = web.AppKey("debug_token")
+HOT_KEYS_KEY: web.AppKey[HeavyHitters] = web.AppKey("hot_keys")
+FALLBACK_KEY: web.AppKey[StaleFallback] = web.AppKey("stale_fallback")
+SINGLE_FLIGHT_KEY: web.AppKey[SingleFlight] = web.AppKey("single_flight")
+MEMORY_TRACER_KEY: web.AppKey[MemoryTracer] = web.AppKey("memory_tracer")
+CAPTURE_KEY: web.AppKey[TrafficCapture] = web.AppKey("capture")
+STALE_HEADER = "X-Rates-Stale"
+IMMUTABLE_CACHE_CONTROL = "max-age=31536000, immutable"
 
 settings = get_settings()
+log = logging.getLogger(__name__)
 
 
 @routes.get("/rates/{currency}")
 @routes.get("/rates/{currency}/{date}")
-async def get_currency_rates(request: web.Request) -> web.Response:
-    currency, date = await get_currency_and_date(request=request)
-    currency_getter = CurrencyRatesGetter(
-        currency=currency,
-        for_date=date,
-        storage=request.app[STORAGE_KEY],
-    )
-    currency_info_bytes = await currency_getter.get_currency_info()
+async def get_currency_rates(request: web.Request) -> web.StreamResponse:
+    profiler = request.app.get(PROFILER_KEY)
+    memory_tracer = request.app.get(MEMORY_TRACER_KEY)
+    with (
+        profiler.profile() if profiler is not None else contextlib.nullcontext(),
+        memory_tracer.measure() if memory_tracer is not None else contextlib.nullcontext(),
+    ):
+        currency, date = await get_currency_and_date(request=request)
+        hot_keys = request.app.get(HOT_KEYS_KEY)
+        if hot_keys is not None:
+            hot_keys.add(key=f"{date.isoformat()}/{currency}")
+        media_format = negotiate_media_format(accept=request.headers.get(hdrs.ACCEPT))
+        currency_getter = CurrencyRatesGetter(
+            currency=currency,
+            for_date=date,
+            storage=request.app[STORAGE_KEY],
+            admission=request.app.get(ADMISSION_KEY),
+            media_format=media_format,
+            timeseries=request.app.get(TIMESERIES_KEY),
+            fallback=request.app.get(FALLBACK_KEY),
+            single_flight=request.app.get(SINGLE_FLIGHT_KEY),
+        )
+        if settings.api.SENDFILE_ENABLED:
+            cached_file = await currency_getter.get_cached_file(min_size=settings.api.SENDFILE_MIN_BYTES)
+            if cached_file is not None:
+                return file_response(cached_file=cached_file, media_format=media_format)
+        currency_info_bytes = await currency_getter.get_currency_info()
+        headers: dict[str, str] = {hdrs.VARY: hdrs.ACCEPT}
+        if currency_getter.stale_date is not None:
+            headers[STALE_HEADER] = currency_getter.stale_date.isoformat()
+        if media_format is JSON_FORMAT:
+            return web.json_response(
+                body=currency_info_bytes,
+                status=200,
+                headers=headers,
+            )
+        return web.Response(
+            body=currency_info_bytes,
+            status=200,
+            content_type=media_format.content_type,
+            headers=headers,
+        )
+
+
+def file_response(cached_file: CachedFile, media_format: MediaFormat) -> web.FileResponse:
+    headers = {
+        hdrs.CONTENT_TYPE: media_format.content_type,
+        hdrs.VARY: hdrs.ACCEPT,
+    }
+    if cached_file.ttl is not None:
+        headers[hdrs.CACHE_CONTROL] = f"max-age={int(cached_file.ttl)}"
+    else:
+        headers[hdrs.CACHE_CONTROL] = IMMUTABLE_CACHE_CONTROL
+    return web.FileResponse(path=cached_file.path, headers=headers)
+
+
+async def stream_currency_rates(request: web.Request) -> web.StreamResponse:
+    currency: str = await validate_currency(
+        currency=request.match_info["currency"].lower(),
+    )
+    response = web.StreamResponse(
+        headers={
+            hdrs.CONTENT_TYPE: "text/event-stream",
+            hdrs.CACHE_CONTROL: "no-cache",
+        },
+    )
+    await response.prepare(request)
+    async with request.app[BROADCASTER_KEY].subscribe(currency=currency) as updates:
+        while True:
+            try:
+                frame = await asyncio.wait_for(updates.get(), timeout=settings.api.STREAM_HEARTBEAT_INTERVAL)
+            except TimeoutError:
+                frame = b": keep-alive\n\n"
+            if frame == CLOSED:
+                break
+            await response.write(frame)
+
+    return response
+
+
+async def get_currency_stats(request: web.Request) -> web.Response:
+    currency, start, end = await get_currency_and_date_range(request=request)
+    rates = await request.app[TIMESERIES_KEY].stats(
+        base=currency,
+        targets=settings.api.TARGET_CURRENCIES,
+        start=start,
+        end=end,
+    )
+    stats = {
+        "currency": currency,
+        "from": start,
+        "to": end,
+        "rates": rates,
+    }
     return web.json_response(
-        body=currency_info_bytes,
+        body=json_encoder.encode(stats),
+        status=200,
+    )
+
+
+async def get_debug_profile(request: web.Request) -> web.Response:
+    check_debug_token(request=request, token=request.app[DEBUG_TOKEN_KEY])
+    return web.Response(
+        text=request.app[PROFILER_KEY].collapsed(reset="reset" in request.query),
+        status=200,
+    )
+
+
+async def get_debug_hot_keys(request: web.Request) -> web.Response:
+    check_debug_token(request=request, token=request.app[DEBUG_TOKEN_KEY])
+    hot_keys = request.app[HOT_KEYS_KEY]
+    return web.json_response(
+        body=json_encoder.encode(
+            [{"key": key, "count": count} for key, count in hot_keys.top()],
+        ),
+        status=200,
+    )
+
+
+async def get_debug_memory(request: web.Request) -> web.Response:
+    check_debug_token(request=request, token=request.app[DEBUG_TOKEN_KEY])
+    group_by = request.query.get("group", GROUP_BY[0])
+    if group_by not in GROUP_BY:
+        raise web.HTTPBadRequest(reason=f"group must be one of {', '.join(GROUP_BY)}")
+    try:
+        limit = int(request.query.get("limit", "20"))
+    except ValueError:
+        raise web.HTTPBadRequest(reason="limit must be an integer") from None
+    report = await asyncio.to_thread(
+        request.app[MEMORY_TRACER_KEY].report,
+        group_by=group_by,
+        limit=limit,
+        diff="diff" in request.query,
+        reset="reset" in request.query,
+    )
+    return web.json_response(
+        body=json_encoder.encode(report),
+        status=200,
+    )
+
+
+@routes.get("/metrics")
+async def get_metrics(request: web.Request) -> web.Response:
+    return web.json_response(
+        body=json_encoder.encode(request.app[METRICS_KEY].collect()),
         status=200,
     )
 
 
 def create_app() -> web.Application:
     app = web.Application()
+    app[METRICS_KEY] = MetricsRegistry()
+    app[METRICS_KEY].register("date_coverage", coverage_window.stats)
+    if isinstance(provider := get_provider(), RacingProvider):
+        app[METRICS_KEY].register("rate_providers", provider.stats)
+    if (limiter := get_upstream_limiter()) is not None:
+        app[METRICS_KEY].register("upstream_limiter", limiter.stats)
     app.on_startup.append(initialize_storage)
+    app.on_cleanup.append(close_storage)
     app.on_cleanup.append(close_redis_client)
+    if settings.api.STALE_FALLBACK_ENABLED:
+        setup_stale_fallback(app=app)
+    setup_rate_updates(app=app)
+    if settings.api.TIMESERIES_ENABLED:
+        setup_timeseries(app=app)
     app.add_routes(routes=routes)
+    if settings.admission.ENABLED or settings.debug.LOOP_MONITOR_ENABLED:
+        setup_loop_monitor(app=app)
+    if settings.admission.ENABLED:
+        setup_admission(app=app)
+    if settings.api.SNAPSHOT_ENABLED:
+        setup_snapshot(app=app)
+    setup_diagnostics(app=app)
 
     return app
 
 
+def setup_diagnostics(app: web.Application) -> None:
+    if settings.debug.TOKEN is not None:
+        app[DEBUG_TOKEN_KEY] = settings.debug.TOKEN
+    if settings.debug.PROFILER_ENABLED:
+        setup_profiler(app=app)
+    if settings.debug.HOT_KEYS_ENABLED:
+        setup_hot_keys(app=app)
+    if settings.debug.MEMORY_TRACE_ENABLED:
+        setup_memory_tracer(app=app)
+    if settings.debug.CAPTURE_PATH is not None:
+        setup_capture(app=app, path=settings.debug.CAPTURE_PATH)
+
+
+def setup_loop_monitor(app: web.Application) -> None:
+    loop_monitor = LoopLagMonitor(
+        interval=settings.debug.LOOP_LAG_INTERVAL_MS / 1000,
+        block_threshold=settings.debug.LOOP_BLOCK_THRESHOLD_MS / 1000,
+    )
+    app[LOOP_MONITOR_KEY] = loop_monitor
+    app[METRICS_KEY].register("event_loop", loop_monitor.stats)
+    app.on_startup.append(start_loop_monitor)
+    app.on_cleanup.append(stop_loop_monitor)
+
+
+def setup_admission(app: web.Application) -> None:
+    controller = AdmissionController(
+        config=settings.admission,
+        loop_monitor=app[LOOP_MONITOR_KEY],
+    )
+    app[ADMISSION_KEY] = controller
+    app[METRICS_KEY].register("admission", controller.stats)
+    app.middlewares.append(admission_middleware(controller=controller))
+
+
+def setup_profiler(app: web.Application) -> None:
+    profiler = SlowRequestProfiler(
+        threshold=settings.debug.PROFILER_THRESHOLD_MS / 1000,
+        interval=settings.debug.PROFILER_INTERVAL_MS / 1000,
+    )
+    app[PROFILER_KEY] = profiler
+    app[METRICS_KEY].register("profiler", profiler.stats)
+    app.on_startup.append(start_profiler)
+    app.on_cleanup.append(stop_profiler)
+    if DEBUG_TOKEN_KEY in app:
+        app.router.add_get("/debug/profile", get_debug_profile)
+    else:
+        log.warning("DEBUG_TOKEN is not set, collapsed stacks are not served at /debug/profile")
+
+
+def setup_hot_keys(app: web.Application) -> None:
+    hot_keys = HeavyHitters(k=settings.debug.HOT_KEYS_TOP_K)
+    app[HOT_KEYS_KEY] = hot_keys
+    app[METRICS_KEY].register("hot_keys", hot_keys.stats)
+    if DEBUG_TOKEN_KEY in app:
+        app.router.add_get("/debug/hot-keys", get_debug_hot_keys)
+    else:
+        log.warning("DEBUG_TOKEN is not set, the most requested rates are not served at /debug/hot-keys")
+
+
+def setup_memory_tracer(app: web.Application) -> None:
+    memory_tracer = MemoryTracer(
+        frames=settings.debug.MEMORY_TRACE_FRAMES,
+        sample_rate=settings.debug.MEMORY_SAMPLE_RATE,
+    )
+    app[MEMORY_TRACER_KEY] = memory_tracer
+    app[METRICS_KEY].register("memory", memory_tracer.stats)
+    app.on_startup.append(start_memory_tracer)
+    app.on_cleanup.append(stop_memory_tracer)
+    if DEBUG_TOKEN_KEY in app:
+        app.router.add_get("/debug/memory", get_debug_memory)
+    else:
+        log.warning("DEBUG_TOKEN is not set, allocation sites are not served at /debug/memory")
+
+
+def setup_capture(app: web.Application, path: Path) -> None:
+    capture = TrafficCapture(path=path)
+    app[CAPTURE_KEY] = capture
+    app[METRICS_KEY].register("capture", capture.stats)
+    app.middlewares.append(capture_middleware(capture=capture, handlers={get_currency_rates}))
+    app.on_startup.append(start_capture)
+    app.on_cleanup.append(close_capture)
+
+
+def setup_stale_fallback(app: web.Application) -> None:
+    fallback = StaleFallback(
+        cooldown=settings.api.DEGRADED_COOLDOWN,
+        forced=settings.api.DEGRADED_MODE,
+    )
+    app[FALLBACK_KEY] = fallback
+    app[METRICS_KEY].register("stale_fallback", fallback.stats)
+    app.on_startup.append(index_cached_dates)
+
+
+def setup_rate_updates(app: web.Application) -> None:
+    async def poll(currency: str) -> bytes:
+        currency_getter = CurrencyRatesGetter(
+            currency=currency,
+            storage=app[STORAGE_KEY],
+            timeseries=app.get(TIMESERIES_KEY),
+            single_flight=app.get(SINGLE_FLIGHT_KEY),
+        )
+        return await currency_getter.get_currency_info()
+
+    broadcaster = RateBroadcaster(poll=poll, interval=settings.api.STREAM_POLL_INTERVAL)
+    app[BROADCASTER_KEY] = broadcaster
+    app[METRICS_KEY].register("rate_updates", broadcaster.stats)
+    app.on_shutdown.append(close_rate_updates)
+    # Registered ahead of the route table so that "stream" is not taken for a date.
+    app.router.add_get("/rates/{currency}/stream", stream_currency_rates, name=STREAM_ROUTE_NAME)
+
+
+def setup_timeseries(app: web.Application) -> None:
+    app[TIMESERIES_KEY] = TimeSeriesStore(root=settings.api.timeseries_dir)
+    # Registered ahead of the route table so that "stats" is not taken for a date.
+    app.router.add_get("/rates/{currency}/stats", get_currency_stats)
+
+
+def setup_snapshot(app: web.Application) -> None:
+    app[SNAPSHOT_KEY] = CacheSnapshot(
+        path=settings.api.snapshot_path,
+        max_entries=settings.api.SNAPSHOT_MAX_ENTRIES,
+        currencies_ttl=settings.api.SNAPSHOT_CURRENCIES_TTL,
+    )
+    app.on_startup.append(restore_snapshot)
+    app.on_cleanup.insert(0, save_snapshot)
+
+
 async def initialize_storage(_app: web.Application) -> None:
+    storage: CacheStorage
     storage_type = settings.api.STORAGE_TYPE
     if storage_type == "file":
-        _app[STORAGE_KEY] = FileStorage()
+        memory_cache = None
+        if settings.api.MEMORY_CACHE_SIZE > 0:
+            memory_cache = MemoryCache(max_entries=settings.api.MEMORY_CACHE_SIZE)
+            _app[METRICS_KEY].register("memory_cache", memory_cache.stats)
+        file_storage = FileStorage(
+            memory_cache=memory_cache,
+            keep_expired=settings.api.STALE_FALLBACK_ENABLED,
+        )
+        file_storage.start_janitor(interval=settings.api.FILE_JANITOR_INTERVAL)
+        storage = file_storage
+        _app[METRICS_KEY].register("file_storage", file_storage.stats)
     else:
-        redis_client = settings.redis.client
-        _app[STORAGE_KEY] = RedisStorage(
-            redis_client=redis_client,
+        storage = create_redis_storage(app=_app)
+    if settings.api.WRITE_BEHIND_ENABLED:
+        storage = start_write_behind(app=_app, storage=storage)
+    _app[STORAGE_KEY] = storage
+    if settings.api.SINGLE_FLIGHT_ENABLED:
+        single_flight = SingleFlight(
+            redis_client=_app.get(REDIS_CLIENT_KEY),
+            lease=settings.redis.LEASE_SECONDS,
+            wait_timeout=settings.redis.LEASE_WAIT_TIMEOUT,
+        )
+        _app[SINGLE_FLIGHT_KEY] = single_flight
+        _app[METRICS_KEY].register("single_flight", single_flight.stats)
+
+
+def create_redis_storage(app: web.Application) -> RedisStorage:
+    redis_client = settings.redis.client
+    app[REDIS_CLIENT_KEY] = redis_client
+    app[METRICS_KEY].register("redis_pool", settings.redis.pool.stats)
+    codec = get_value_codec()
+    if codec is not None:
+        app[METRICS_KEY].register("redis_compression", codec.stats)
+    if settings.redis.LAYOUT == HASH_LAYOUT:
+        if settings.redis.CLIENT_TRACKING:
+            log.warning("REDIS_CLIENT_TRACKING is ignored, client-side caching does not support the hash layout")
+        return RedisHashStorage(redis_client=redis_client, codec=codec)
+    client_cache = None
+    if settings.redis.CLIENT_TRACKING:
+        client_cache = ClientSideCache(
+            url=settings.redis.URL,
+            max_entries=settings.redis.CLIENT_CACHE_SIZE,
+            ttl=settings.redis.KEY_EXPIRE_SECONDS,
         )
-        _app[REDIS_CLIENT_KEY] = redis_client
+        client_cache.start()
+        app[CLIENT_CACHE_KEY] = client_cache
+        app[METRICS_KEY].register("redis_client_cache", client_cache.stats)
+    return RedisStorage(
+        redis_client=redis_client,
+        client_cache=client_cache,
+        codec=codec,
+    )
+
+
+def start_write_behind(app: web.Application, storage: CacheStorage) -> WriteBehindStorage:
+    write_behind = WriteBehindStorage(
+        storage=storage,
+        max_pending=settings.api.WRITE_BEHIND_MAX_PENDING,
+        batch_size=settings.api.WRITE_BEHIND_BATCH_SIZE,
+        flush_interval=settings.api.WRITE_BEHIND_FLUSH_INTERVAL,
+        put_timeout=settings.api.WRITE_BEHIND_PUT_TIMEOUT,
+    )
+    write_behind.start()
+    app[METRICS_KEY].register("write_behind", write_behind.stats)
+    return write_behind
+
+
+async def index_cached_dates(_app: web.Application) -> None:
+    index = _app[FALLBACK_KEY].index
+    for key in await _app[STORAGE_KEY].cached_keys():
+        index.add_key(key=key)
+
+
+async def close_storage(_app: web.Application) -> None:
+    storage = _app.get(STORAGE_KEY, None)
+    if storage is not None:
+        await storage.close()
 
 
 async def close_redis_client(_app: web.Application) -> None:
+    client_cache = _app.get(CLIENT_CACHE_KEY, None)
+    if client_cache is not None:
+        await client_cache.stop()
     redis_client = _app.get(REDIS_CLIENT_KEY, None)
     if redis_client is not None:
         await redis_client.aclose()
-        await redis_client.connection_pool.disconnect()
+        await settings.redis.close_pool()
+
+
+async def start_loop_monitor(_app: web.Application) -> None:
+    _app[LOOP_MONITOR_KEY].start()
+
+
+async def stop_loop_monitor(_app: web.Application) -> None:
+    await _app[LOOP_MONITOR_KEY].stop()
+
+
+async def start_profiler(_app: web.Application) -> None:
+    _app[PROFILER_KEY].start()
+
+
+async def stop_profiler(_app: web.Application) -> None:
+    await asyncio.to_thread(_app[PROFILER_KEY].stop)
+
+
+async def start_memory_tracer(_app: web.Application) -> None:
+    _app[MEMORY_TRACER_KEY].start()
+
+
+async def stop_memory_tracer(_app: web.Application) -> None:
+    _app[MEMORY_TRACER_KEY].stop()
+
+
+async def start_capture(_app: web.Application) -> None:
+    _app[CAPTURE_KEY].start()
+
+
+async def close_capture(_app: web.Application) -> None:
+    await _app[CAPTURE_KEY].close()
+
+
+async def close_rate_updates(_app: web.Application) -> None:
+    await _app[BROADCASTER_KEY].close()
+
+
+def snapshot_cache(storage: CacheStorage) -> MemoryCache | None:
+    # Redis only invalidates the keys a tracking client has read since tracking was turned on, so
+    # restored copies of Redis keys could be stale for good.
+    if isinstance(storage, RedisStorage):
+        return None
+    return storage.local_cache
+
+
+async def restore_snapshot(_app: web.Application) -> None:
+    await _app[SNAPSHOT_KEY].restore(
+        local_cache=snapshot_cache(storage=_app[STORAGE_KEY]),
+        registry=check_currency,
+    )
+
+
+async def save_snapshot(_app: web.Application) -> None:
+    await _app[SNAPSHOT_KEY].save(
+        local_cache=snapshot_cache(storage=_app[STORAGE_KEY]),
+        registry=check_currency,
+    )
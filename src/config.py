@@ -1,3 +1,4 @@
+import datetime
 import os
 from dataclasses import (
     dataclass,
@@ -9,10 +10,19 @@ from typing import Final
 
 from redis.asyncio import Redis
 
+from src.lib.redis_pool import InstrumentedConnectionPool
+
 BASE_DIR: Final[Path] = Path(__file__).resolve().parent
 ENV_FILE_DEFAULT = BASE_DIR / ".env"
 
 
+def env_flag(name: str, *, default: bool = False) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in {"1", "true", "yes", "on"}
+
+
 @dataclass
 class ApplicationConfig:
     """Application configuration."""
@@ -39,8 +49,98 @@ class ApplicationConfig:
             "https://cdn.jsdelivr.net/npm/@fawazahmed0/currency-api@{date}/v1/currencies/{currency}.json",
         )
     )
+    COVERAGE_START: datetime.date = field(
+        default_factory=lambda: datetime.date.fromisoformat(os.getenv("RATES_COVERAGE_START", "2024-03-02"))
+    )
+    """Earliest date upstream is known to publish rates for, refined at runtime from upstream answers."""
+    RATE_PROVIDERS: tuple[str, ...] = field(
+        default_factory=lambda: tuple(
+            name.strip().lower() for name in os.getenv("RATE_PROVIDERS", "jsdelivr").split(",") if name.strip()
+        )
+    )
+    """Rate providers (``jsdelivr``, ``dataset``) asked for rates, several ones race each other."""
+    RATES_DATASET_DIR: Path | None = field(
+        default_factory=lambda: Path(dataset_dir) if (dataset_dir := os.getenv("RATES_DATASET_DIR")) else None
+    )
+    """Directory of the local dump read by the ``dataset`` provider, laid out as ``{date}/{currency}.json``."""
+    UPSTREAM_TIMEOUT: float = field(default_factory=lambda: float(os.getenv("UPSTREAM_TIMEOUT", "10")))
+    """Length of time (in seconds) an upstream request may take before it fails."""
+    UPSTREAM_LIMIT_ENABLED: bool = field(default_factory=lambda: env_flag("UPSTREAM_LIMIT"))
+    """Cap concurrent upstream requests with a limit adapted to upstream latency and errors."""
+    UPSTREAM_LIMIT_INITIAL: int = field(default_factory=lambda: int(os.getenv("UPSTREAM_LIMIT_INITIAL", "16")))
+    """Number of concurrent upstream requests allowed before the limit adapts."""
+    UPSTREAM_LIMIT_MAX: int = field(default_factory=lambda: int(os.getenv("UPSTREAM_LIMIT_MAX", "128")))
+    """Maximum number of concurrent upstream requests."""
+    UPSTREAM_LATENCY_TARGET: float = field(default_factory=lambda: float(os.getenv("UPSTREAM_LATENCY_TARGET", "1")))
+    """Upstream response time (in seconds) above which the limit is lowered."""
+    UPSTREAM_QUEUE_TIMEOUT: float = field(default_factory=lambda: float(os.getenv("UPSTREAM_QUEUE_TIMEOUT", "5")))
+    """Length of time (in seconds) a request waits for an upstream slot before failing with 503."""
+    STALE_FALLBACK_ENABLED: bool = field(default_factory=lambda: env_flag("STALE_FALLBACK"))
+    """Answer with the nearest earlier cached rates when the requested ones cannot be fetched."""
+    DEGRADED_MODE: bool = field(default_factory=lambda: env_flag("DEGRADED_MODE"))
+    """Never wait on upstream for a miss that has earlier cached rates, e.g. during a known outage."""
+    DEGRADED_COOLDOWN: float = field(default_factory=lambda: float(os.getenv("DEGRADED_COOLDOWN", "30")))
+    """Length of time (in seconds) misses are answered with earlier rates after an upstream failure."""
     DEFAULT_LOG_FORMAT: str = "[%(asctime)s.%(msecs)03d] %(module)s:%(lineno)d %(levelname)s - %(message)s"
+    LOG_JSON: bool = field(default_factory=lambda: env_flag("LOG_JSON"))
+    """Write logs as JSON lines instead of ``DEFAULT_LOG_FORMAT`` lines."""
+    ACCESS_LOG_SAMPLE_RATE: float = field(default_factory=lambda: float(os.getenv("ACCESS_LOG_SAMPLE_RATE", "1")))
+    """Share of the successful, fast requests written to the access log, errors and slow ones always are."""
+    ACCESS_LOG_SLOW_MS: float = field(default_factory=lambda: float(os.getenv("ACCESS_LOG_SLOW_MS", "500")))
+    """Response time (in milliseconds) from which a request is always written to the access log."""
     STORAGE_TYPE: str = field(default_factory=lambda: os.getenv("STORAGE_TYPE", "redis"))
+    FILE_EXPIRE_SECONDS: float = field(default_factory=lambda: float(os.getenv("FILE_EXPIRE_SECONDS", "3600")))
+    """Length of time (in seconds) a file of today's rates stays valid, past dates and ``0`` never expire."""
+    FILE_CACHE_MAX_BYTES: int = field(default_factory=lambda: int(os.getenv("FILE_CACHE_MAX_BYTES", "268435456")))
+    """Size of the cache directory above which the oldest files are removed, ``0`` disables the limit."""
+    FILE_JANITOR_INTERVAL: float = 60.0
+    """Length of time (in seconds) between two cleanups of the cache directory."""
+    SENDFILE_ENABLED: bool = field(default_factory=lambda: env_flag("SENDFILE"))
+    """Answer file storage hits with the cached file itself, copied to the socket by the kernel."""
+    SENDFILE_MIN_BYTES: int = field(default_factory=lambda: int(os.getenv("SENDFILE_MIN_BYTES", "524288")))
+    """Size from which a cached file is sent with ``sendfile``, smaller ones are cheaper to read into memory."""
+    MEMORY_CACHE_SIZE: int = field(default_factory=lambda: int(os.getenv("MEMORY_CACHE_SIZE", "0")))
+    """Number of entries the file storage keeps in process memory, ``0`` disables the in-process copy."""
+    SNAPSHOT_ENABLED: bool = field(default_factory=lambda: env_flag("CACHE_SNAPSHOT"))
+    """Save the hottest in-process entries on shutdown and restore them on startup."""
+    SNAPSHOT_MAX_ENTRIES: int = field(default_factory=lambda: int(os.getenv("CACHE_SNAPSHOT_MAX_ENTRIES", "1000")))
+    """Maximum number of entries written to the snapshot."""
+    SNAPSHOT_CURRENCIES_TTL: int = field(
+        default_factory=lambda: int(os.getenv("CACHE_SNAPSHOT_CURRENCIES_TTL", "86400"))
+    )
+    """Length of time (in seconds) the currency list saved in a snapshot is used before it is fetched again."""
+    SINGLE_FLIGHT_ENABLED: bool = field(default_factory=lambda: env_flag("SINGLE_FLIGHT"))
+    """Share one upstream fetch between concurrent misses of a key, across instances with Redis storage."""
+    WRITE_BEHIND_ENABLED: bool = field(default_factory=lambda: env_flag("WRITE_BEHIND"))
+    """Answer misses before their rates are written to the storage, writes are flushed in the background."""
+    WRITE_BEHIND_MAX_PENDING: int = field(default_factory=lambda: int(os.getenv("WRITE_BEHIND_MAX_PENDING", "1000")))
+    """Maximum number of entries waiting to be written, writers wait for a flush beyond it."""
+    WRITE_BEHIND_BATCH_SIZE: int = field(default_factory=lambda: int(os.getenv("WRITE_BEHIND_BATCH_SIZE", "100")))
+    """Maximum number of entries written to the storage at once."""
+    WRITE_BEHIND_FLUSH_INTERVAL: float = field(
+        default_factory=lambda: float(os.getenv("WRITE_BEHIND_FLUSH_INTERVAL", "0.05"))
+    )
+    """Length of time (in seconds) between two flushes of a partial batch."""
+    WRITE_BEHIND_PUT_TIMEOUT: float = field(
+        default_factory=lambda: float(os.getenv("WRITE_BEHIND_PUT_TIMEOUT", "1"))
+    )
+    """Length of time (in seconds) a writer waits for room in a full queue before its entry is dropped."""
+    STREAM_POLL_INTERVAL: float = field(default_factory=lambda: float(os.getenv("RATES_STREAM_INTERVAL", "5")))
+    """Length of time (in seconds) between two checks of the rates pushed to stream subscribers."""
+    STREAM_HEARTBEAT_INTERVAL: float = 15.0
+    """Length of time (in seconds) without updates after which a keep-alive comment is sent to subscribers."""
+    TIMESERIES_ENABLED: bool = field(default_factory=lambda: env_flag("TIMESERIES_ENABLED"))
+    """Record cached rates in per-pair arrays and serve range statistics from them."""
+    UVLOOP_ENABLED: bool = field(default_factory=lambda: env_flag("UVLOOP"))
+    """Run the server on uvloop instead of the default asyncio event loop, needs the ``uvloop`` extra."""
+
+    @property
+    def snapshot_path(self) -> Path:
+        return self.CACHE_DIR / ".warm-start.msgpack"
+
+    @property
+    def timeseries_dir(self) -> Path:
+        return self.CACHE_DIR / "timeseries"
 
     @property
     def key_template(self) -> str:
@@ -63,28 +163,125 @@ class RedisConfig:
     """Length of time to wait (in seconds) before testing connection health."""
     SOCKET_KEEPALIVE: bool = True
     """Length of time to wait (in seconds) between keepalive commands."""
+    MAX_CONNECTIONS: int = field(default_factory=lambda: int(os.getenv("REDIS_MAX_CONNECTIONS", "50")))
+    """Maximum number of connections in the process-wide pool."""
+    POOL_TIMEOUT: float = field(default_factory=lambda: float(os.getenv("REDIS_POOL_TIMEOUT", "5")))
+    """Length of time to wait (in seconds) for a free connection when the pool is exhausted."""
     KEY_EXPIRE_SECONDS: int = 60
+    HISTORY_EXPIRE_SECONDS: int = field(default_factory=lambda: int(os.getenv("REDIS_HISTORY_EXPIRE_SECONDS", "0")))
+    """Length of time (in seconds) the rates of past dates are kept, ``0`` keeps them until Redis evicts them."""
+    LAYOUT: str = field(default_factory=lambda: os.getenv("REDIS_LAYOUT", "string"))
+    """``string`` keeps a key per date and currency, ``hash`` a hash per date with a field per currency."""
+    HASH_PREFIX: str = "rates:"
+    """Prefix of the per-date hash names of the ``hash`` layout."""
+    DUAL_READ: bool = field(default_factory=lambda: env_flag("REDIS_DUAL_READ"))
+    """With the ``hash`` layout, fall back to the string keys of the ``string`` layout and copy them into hashes."""
+    COMPRESSION: bool = field(default_factory=lambda: env_flag("REDIS_COMPRESSION"))
+    """Store values compressed with zlib, values stored uncompressed stay readable."""
+    COMPRESSION_MIN_BYTES: int = field(default_factory=lambda: int(os.getenv("REDIS_COMPRESSION_MIN_BYTES", "128")))
+    """Size from which values are compressed, smaller ones are stored as is."""
+    COMPRESSION_LEVEL: int = 6
+    """zlib compression level."""
+    LEASE_SECONDS: float = field(default_factory=lambda: float(os.getenv("REDIS_LEASE_SECONDS", "3")))
+    """Lifetime of the lease of the instance fetching a missed key, bounds the wait when its holder crashes."""
+    LEASE_WAIT_TIMEOUT: float = field(default_factory=lambda: float(os.getenv("REDIS_LEASE_WAIT_TIMEOUT", "10")))
+    """Length of time (in seconds) an instance waits on another's fetch before fetching on its own."""
+    CLIENT_TRACKING: bool = field(default_factory=lambda: env_flag("REDIS_CLIENT_TRACKING"))
+    """Keep hot keys in process memory, invalidated by Redis ``CLIENT TRACKING`` push messages (RESP3)."""
+    CLIENT_CACHE_SIZE: int = field(default_factory=lambda: int(os.getenv("REDIS_CLIENT_CACHE_SIZE", "1024")))
+    """Number of keys kept in process memory when client tracking is on."""
+
+    _pool: InstrumentedConnectionPool | None = field(default=None, init=False, repr=False)
 
     @property
     def client(self) -> Redis:
         return self.get_client()
 
+    @property
+    def pool(self) -> InstrumentedConnectionPool:
+        if self._pool is None:
+            self._pool = InstrumentedConnectionPool.from_url(
+                url=self.URL,
+                max_connections=self.MAX_CONNECTIONS,
+                timeout=self.POOL_TIMEOUT,
+                encoding="utf-8",
+                decode_responses=False,
+                socket_connect_timeout=self.SOCKET_CONNECT_TIMEOUT,
+                socket_keepalive=self.SOCKET_KEEPALIVE,
+                health_check_interval=self.HEALTH_CHECK_INTERVAL,
+            )
+        return self._pool
+
     def get_client(self) -> Redis:
-        redis: Redis = Redis.from_url(
-            url=self.URL,
-            encoding="utf-8",
-            decode_responses=False,
-            socket_connect_timeout=self.SOCKET_CONNECT_TIMEOUT,
-            socket_keepalive=self.SOCKET_KEEPALIVE,
-            health_check_interval=self.HEALTH_CHECK_INTERVAL,
-        )
-        return redis
+        """Return a client bound to the process-wide connection pool."""
+        return Redis(connection_pool=self.pool)
+
+    async def close_pool(self) -> None:
+        if self._pool is not None:
+            await self._pool.disconnect()
+            self._pool = None
+
+
+@dataclass
+class AdmissionConfig:
+    """Inbound admission control configuration."""
+
+    ENABLED: bool = field(default_factory=lambda: env_flag("ADMISSION_ENABLED"))
+    """Install the admission control middleware."""
+    CLIENT_RATE: float = field(default_factory=lambda: float(os.getenv("ADMISSION_CLIENT_RATE", "20")))
+    """Number of requests per second refilled into each client's token bucket."""
+    CLIENT_BURST: int = field(default_factory=lambda: int(os.getenv("ADMISSION_CLIENT_BURST", "40")))
+    """Capacity of each client's token bucket."""
+    MAX_TRACKED_CLIENTS: int = 10_000
+    """Number of client buckets kept in memory, the least recently seen ones are dropped first."""
+    MAX_IN_FLIGHT: int = field(default_factory=lambda: int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "512")))
+    """Number of requests processed concurrently before new ones are shed with 503."""
+    MAX_PENDING_MISSES: int = field(default_factory=lambda: int(os.getenv("ADMISSION_MAX_PENDING_MISSES", "64")))
+    """Number of concurrent cache misses waiting on upstream before new misses are shed with 503."""
+    MAX_LOOP_LAG_MS: float = field(default_factory=lambda: float(os.getenv("ADMISSION_MAX_LOOP_LAG_MS", "250")))
+    """Event loop lag (in milliseconds) above which cache misses are shed with 503."""
+
+
+@dataclass
+class DebugConfig:
+    """Diagnostics configuration."""
+
+    TOKEN: str | None = field(default_factory=lambda: os.getenv("DEBUG_TOKEN") or None)
+    """Bearer token required by the ``/debug`` endpoints, which are not served when it is unset."""
+    PROFILER_ENABLED: bool = field(default_factory=lambda: env_flag("PROFILER_ENABLED"))
+    """Sample the stacks of rate requests and keep those of the slow ones."""
+    PROFILER_THRESHOLD_MS: float = field(default_factory=lambda: float(os.getenv("PROFILER_THRESHOLD_MS", "250")))
+    """Request latency (in milliseconds) from which the samples of a request are kept."""
+    PROFILER_INTERVAL_MS: float = field(default_factory=lambda: float(os.getenv("PROFILER_INTERVAL_MS", "5")))
+    """Length of time (in milliseconds) between two stack samples while requests are in flight."""
+    HOT_KEYS_ENABLED: bool = field(default_factory=lambda: env_flag("HOT_KEYS"))
+    """Count rate requests per (currency, date) in a count-min sketch and track the most requested ones."""
+    HOT_KEYS_TOP_K: int = field(default_factory=lambda: int(os.getenv("HOT_KEYS_TOP_K", "32")))
+    """Number of most requested (currency, date) pairs tracked."""
+    MEMORY_TRACE_ENABLED: bool = field(default_factory=lambda: env_flag("MEMORY_TRACE"))
+    """Trace allocations with tracemalloc and report the largest allocation sites."""
+    MEMORY_TRACE_FRAMES: int = field(default_factory=lambda: int(os.getenv("MEMORY_TRACE_FRAMES", "1")))
+    """Number of frames stored per traced allocation, more frames cost more memory and CPU."""
+    MEMORY_SAMPLE_RATE: float = field(default_factory=lambda: float(os.getenv("MEMORY_SAMPLE_RATE", "0.01")))
+    """Share of the rate requests whose retained memory is measured while tracing allocations."""
+    CAPTURE_PATH: Path | None = field(
+        default_factory=lambda: Path(path) if (path := os.getenv("TRAFFIC_CAPTURE_PATH")) else None,
+    )
+    """File the rate requests are appended to, as ``timestamp, currency, date`` lines for ``benchmarks.replay``."""
+    LOOP_MONITOR_ENABLED: bool = field(default_factory=lambda: env_flag("LOOP_MONITOR"))
+    """Measure event loop lag and log callbacks blocking the loop, always on with admission control."""
+    LOOP_LAG_INTERVAL_MS: float = 100
+    """Length of time (in milliseconds) between event loop lag measurements."""
+    LOOP_BLOCK_THRESHOLD_MS: float = field(default_factory=lambda: float(os.getenv("LOOP_BLOCK_THRESHOLD_MS", "100")))
+    """Length of time (in milliseconds) the loop has to be stalled for the blocking stack to be logged."""
 
 
 @dataclass
 class Settings:
     api: ApplicationConfig = field(default_factory=ApplicationConfig)
     redis: RedisConfig = field(default_factory=RedisConfig)
+    admission: AdmissionConfig = field(default_factory=AdmissionConfig)
+    debug: DebugConfig = field(default_factory=DebugConfig)
 
     @classmethod
     def from_env(cls, env_file: Path = ENV_FILE_DEFAULT) -> "Settings":
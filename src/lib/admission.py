@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import math
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import (
+    dataclass,
+    field,
+)
+from typing import TYPE_CHECKING
+
+from aiohttp import web
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator
+
+    from aiohttp.typedefs import (
+        Handler,
+        Middleware,
+    )
+
+    from src.config import AdmissionConfig
+    from src.lib.loop_monitor import LoopLagMonitor
+
+__all__ = (
+    "STREAM_ROUTE_NAME",
+    "AdmissionController",
+    "TokenBucket",
+    "admission_middleware",
+)
+
+OVERLOAD_RETRY_AFTER = "1"
+STREAM_ROUTE_NAME = "rates-stream"
+"""Name of the long-lived subscription route, which is rate limited but not held against the in-flight cap."""
+
+
+@dataclass
+class TokenBucket:
+    rate: float
+    capacity: float
+    tokens: float = field(init=False)
+    updated: float = field(default_factory=time.monotonic)
+
+    def __post_init__(self) -> None:
+        self.tokens = self.capacity
+
+    def take(self, now: float) -> bool:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def retry_after(self) -> int:
+        return max(1, math.ceil((1 - self.tokens) / self.rate))
+
+
+class AdmissionController:
+    """Decides whether an inbound request is served or shed.
+
+    Every request has to get a token from its client's bucket (429 otherwise) and fit under
+    the global in-flight cap (503 otherwise). Requests that miss the cache additionally need
+    a miss slot, which is refused while too many misses already wait on upstream or the event
+    loop is lagging, so cache hits keep being served when upstream work piles up.
+    """
+
+    def __init__(
+        self,
+        config: AdmissionConfig,
+        loop_monitor: LoopLagMonitor | None = None,
+    ) -> None:
+        self._config = config
+        self._loop_monitor = loop_monitor
+        self._buckets: OrderedDict[str, TokenBucket] = OrderedDict()
+        self.in_flight = 0
+        self.pending_misses = 0
+        self.rejected_rate_limited = 0
+        self.rejected_overloaded = 0
+        self.rejected_misses = 0
+
+    def get_bucket(self, client: str) -> TokenBucket:
+        bucket = self._buckets.get(client)
+        if bucket is None:
+            bucket = TokenBucket(rate=self._config.CLIENT_RATE, capacity=self._config.CLIENT_BURST)
+            self._buckets[client] = bucket
+            if len(self._buckets) > self._config.MAX_TRACKED_CLIENTS:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(client)
+        return bucket
+
+    def check_client(self, client: str) -> None:
+        bucket = self.get_bucket(client=client)
+        if not bucket.take(now=time.monotonic()):
+            self.rejected_rate_limited += 1
+            raise web.HTTPTooManyRequests(
+                reason="Too many requests, slow down",
+                headers={"Retry-After": str(bucket.retry_after())},
+            )
+
+    def is_loop_lagging(self) -> bool:
+        if self._loop_monitor is None:
+            return False
+        return self._loop_monitor.lag_ms > self._config.MAX_LOOP_LAG_MS
+
+    @asynccontextmanager
+    async def request_slot(self, client: str, *, long_lived: bool = False) -> AsyncIterator[None]:
+        self.check_client(client=client)
+        if long_lived:
+            yield
+            return
+        if self.in_flight >= self._config.MAX_IN_FLIGHT:
+            self.rejected_overloaded += 1
+            raise web.HTTPServiceUnavailable(
+                reason="Server is overloaded, try again later",
+                headers={"Retry-After": OVERLOAD_RETRY_AFTER},
+            )
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+
+    @asynccontextmanager
+    async def miss_slot(self) -> AsyncIterator[None]:
+        if self.pending_misses >= self._config.MAX_PENDING_MISSES or self.is_loop_lagging():
+            self.rejected_misses += 1
+            raise web.HTTPServiceUnavailable(
+                reason="Exchange rates are not cached and the server is overloaded, try again later",
+                headers={"Retry-After": OVERLOAD_RETRY_AFTER},
+            )
+        self.pending_misses += 1
+        try:
+            yield
+        finally:
+            self.pending_misses -= 1
+
+    def stats(self) -> dict[str, int | float]:
+        return {
+            "in_flight": self.in_flight,
+            "pending_misses": self.pending_misses,
+            "loop_lag_ms": self._loop_monitor.lag_ms if self._loop_monitor is not None else 0.0,
+            "rejected_rate_limited": self.rejected_rate_limited,
+            "rejected_overloaded": self.rejected_overloaded,
+            "rejected_misses": self.rejected_misses,
+        }
+
+
+def admission_middleware(controller: AdmissionController) -> Middleware:
+    @web.middleware
+    async def middleware(request: web.Request, handler: Handler) -> web.StreamResponse:
+        async with controller.request_slot(
+            client=request.remote or "unknown",
+            long_lived=request.match_info.route.name == STREAM_ROUTE_NAME,
+        ):
+            return await handler(request)
+
+    return middleware
@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import asyncio
+import datetime
+import logging
+import time
+from dataclasses import (
+    dataclass,
+    field,
+)
+from typing import TYPE_CHECKING
+
+import aiofiles
+from aiohttp import web
+
+from src.lib.coders import json_encoder
+from src.lib.currency_rates_getter import CurrencyRatesGetter
+
+if TYPE_CHECKING:
+    from collections.abc import (
+        Iterable,
+        Iterator,
+    )
+    from pathlib import Path
+
+    from src.lib.cache_storage import CacheStorage
+    from src.lib.timeseries import TimeSeriesStore
+
+__all__ = (
+    "Backfill",
+    "BackfillProgress",
+)
+
+log = logging.getLogger(__name__)
+
+BackfillItem = tuple[str, datetime.date]
+
+
+@dataclass
+class BackfillProgress:
+    total: int
+    done: int = 0
+    skipped: int = 0
+    missing: int = 0
+    failed: int = 0
+    started: float = field(default_factory=time.perf_counter)
+
+    @property
+    def processed(self) -> int:
+        return self.done + self.missing + self.failed
+
+    @property
+    def throughput(self) -> float:
+        elapsed = time.perf_counter() - self.started
+        return self.processed / elapsed if elapsed > 0 else 0.0
+
+    def report(self) -> None:
+        remaining = self.total - self.skipped - self.processed
+        throughput = self.throughput
+        log.info(
+            "Backfill %d/%d (%.1f%%): %d cached, %d skipped, %d not published, %d failed, %.1f items/s, ETA %.0fs",
+            self.skipped + self.processed,
+            self.total,
+            (self.skipped + self.processed) / self.total * 100 if self.total else 100.0,
+            self.done,
+            self.skipped,
+            self.missing,
+            self.failed,
+            throughput,
+            remaining / throughput if throughput else 0.0,
+        )
+
+
+class Backfill:
+    """Pre-populates the storage with historical rates.
+
+    Rates are requested from upstream with bounded concurrency and written to the storage batch by batch.
+    After each batch the completed items are appended to the checkpoint file, so a rerun with the same
+    checkpoint skips them. Failed items are not recorded and are retried by the next run.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        currencies: Iterable[str],
+        start: datetime.date,
+        end: datetime.date,
+        storage: CacheStorage,
+        *,
+        checkpoint_path: Path,
+        concurrency: int = 8,
+        batch_size: int = 100,
+        timeseries: TimeSeriesStore | None = None,
+    ) -> None:
+        self._currencies = tuple(currency.lower() for currency in currencies)
+        self._start = start
+        self._end = end
+        self._storage = storage
+        self._checkpoint_path = checkpoint_path
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._batch_size = batch_size
+        self._timeseries = timeseries
+
+    @staticmethod
+    def checkpoint_line(currency: str, for_date: datetime.date) -> str:
+        return f"{for_date.isoformat()} {currency}\n"
+
+    def iter_items(self) -> Iterator[BackfillItem]:
+        for offset in range((self._end - self._start).days + 1):
+            for_date = self._start + datetime.timedelta(days=offset)
+            for currency in self._currencies:
+                yield currency, for_date
+
+    async def read_checkpoint(self) -> set[str]:
+        try:
+            async with aiofiles.open(self._checkpoint_path) as checkpoint:
+                return set(await checkpoint.readlines())
+        except FileNotFoundError:
+            return set()
+
+    async def write_checkpoint(self, items: Iterable[BackfillItem]) -> None:
+        lines = "".join(self.checkpoint_line(currency=currency, for_date=for_date) for currency, for_date in items)
+        if lines:
+            async with aiofiles.open(self._checkpoint_path, "a") as checkpoint:
+                await checkpoint.write(lines)
+
+    async def fetch(self, item: BackfillItem) -> tuple[str, bytes]:
+        currency, for_date = item
+        rates_getter = CurrencyRatesGetter(
+            currency=currency,
+            for_date=for_date,
+            storage=self._storage,
+        )
+        async with self._semaphore:
+            currency_info = await rates_getter.read_currency_info_for_date()
+        if self._timeseries is not None:
+            await self._timeseries.record(info=currency_info)
+        key = rates_getter.get_cache_key(for_date=currency_info.date, currency=currency_info.currency)
+        return key, json_encoder.encode(currency_info)
+
+    async def run_batch(self, batch: list[BackfillItem], progress: BackfillProgress) -> None:
+        results = await asyncio.gather(*(self.fetch(item=item) for item in batch), return_exceptions=True)
+        entries: dict[str, bytes] = {}
+        completed: list[BackfillItem] = []
+        for item, result in zip(batch, results, strict=True):
+            if isinstance(result, web.HTTPNotFound):
+                progress.missing += 1
+                completed.append(item)
+            elif isinstance(result, BaseException):
+                progress.failed += 1
+                log.warning("Backfill of %s for %s failed: %r", item[0], item[1], result)
+            else:
+                key, value = result
+                entries[key] = value
+                completed.append(item)
+        await self._storage.cache_encoded_many(entries=entries)
+        progress.done += len(entries)
+        await self.write_checkpoint(items=completed)
+
+    async def run(self) -> BackfillProgress:
+        checkpoint = await self.read_checkpoint()
+        items = list(self.iter_items())
+        progress = BackfillProgress(total=len(items))
+        pending = [
+            item for item in items if self.checkpoint_line(currency=item[0], for_date=item[1]) not in checkpoint
+        ]
+        progress.skipped = len(items) - len(pending)
+        for batch_start in range(0, len(pending), self._batch_size):
+            await self.run_batch(batch=pending[batch_start : batch_start + self._batch_size], progress=progress)
+            progress.report()
+        if not pending:
+            progress.report()
+        return progress
@@ -1,97 +1,526 @@
 from __future__ import annotations
 
+import asyncio
+import contextlib
+import datetime
+import logging
+import os
+import tempfile
+import time
 from abc import (
     ABC,
     abstractmethod,
 )
-from dataclasses import asdict
+from dataclasses import dataclass
+from pathlib import Path
 from typing import TYPE_CHECKING
 
-import aiofiles
-
 from src.config import get_settings
 from src.lib.coders import json_encoder
+from src.lib.compression import get_value_codec
 
 if TYPE_CHECKING:
-    from pathlib import Path
+    from collections.abc import Mapping
 
+    import msgspec
     from redis.asyncio import Redis
+    from redis.asyncio.client import Pipeline
 
+    from src.lib.compression import ValueCodec
+    from src.lib.memory_cache import MemoryCache
+    from src.lib.redis_tracking import ClientSideCache
     from src.lib.types import CurrencyInfo
 
 __all__ = (
     "CacheStorage",
+    "CachedFile",
     "FileStorage",
+    "RedisHashStorage",
     "RedisStorage",
     "storage_getter",
 )
 
 settings = get_settings()
+log = logging.getLogger(__name__)
+
+DATE_LENGTH = len("YYYY-MM-DD")
+DATE_PATTERN = "????-??-??"
+KEY_PATTERN = f"{DATE_PATTERN}-*"
+SCAN_COUNT = 1000
+HASH_LAYOUT = "hash"
+
+
+def is_past_date(key: str) -> bool:
+    """Whether ``key`` starts with a date before today (UTC), whose rates no longer change."""
+    try:
+        for_date = datetime.date.fromisoformat(key[:DATE_LENGTH])
+    except ValueError:
+        return False
+    return for_date < datetime.datetime.now(tz=datetime.UTC).date()
+
+
+@dataclass(frozen=True)
+class CachedFile:
+    path: Path
+    ttl: float | None
+    """Remaining lifetime (in seconds) of the entry, ``None`` if it does not expire."""
 
 
 class CacheStorage(ABC):
+    @property
+    def local_cache(self) -> MemoryCache | None:
+        """In-process copy of the hottest entries, if the storage keeps one."""
+        return None
+
+    async def cache_currency_info(
+        self,
+        info: CurrencyInfo,
+        key: str,
+        encoder: msgspec.json.Encoder | msgspec.msgpack.Encoder = json_encoder,
+    ) -> bytes:
+        currency_info_bytes: bytes = encoder.encode(info)
+        await self.cache_encoded(key=key, value=currency_info_bytes)
+
+        return currency_info_bytes
+
     @abstractmethod
-    async def cache_currency_info(self, info: CurrencyInfo, key: str) -> bytes:
+    async def cache_encoded(self, key: str, value: bytes) -> None:
         pass
 
+    async def cache_encoded_many(self, entries: Mapping[str, bytes]) -> None:
+        await asyncio.gather(*(self.cache_encoded(key=key, value=value) for key, value in entries.items()))
+
     @abstractmethod
     async def read_currency_info(self, key: str) -> bytes | None:
         pass
 
+    async def locate_currency_info(self, key: str, min_size: int = 0) -> CachedFile | None:  # noqa: ARG002
+        """Return the file holding the entry if it has at least ``min_size`` bytes, for ``sendfile``."""
+        return None
+
+    async def read_stale_currency_info(self, key: str) -> bytes | None:
+        """Read an entry even if it has expired, for storages that keep expired entries."""
+        return await self.read_currency_info(key=key)
+
+    @abstractmethod
+    async def cached_keys(self) -> list[str]:
+        pass
+
+    async def close(self) -> None:  # noqa: B027
+        """Stop the background work of the storage, if any."""
+
 
 class FileStorage(CacheStorage):
+    """Keeps each entry in a file named after its key in ``cache_dir``.
+
+    An entry for today or a later date expires ``expire`` seconds after the modification time of
+    its file, so a single ``fstat`` of the open file tells whether it is still valid. The rates of
+    past dates do not change, so their entries, such as those written by a backfill, never expire;
+    entries whose key does not start with a date always do. Files are written under a temporary
+    name and renamed into place, so readers never see a partially written entry. All file system
+    calls of a read or a write run in one worker thread hop.
+
+    The janitor removes expired files, unless ``keep_expired`` keeps them for stale reads, and,
+    while the directory is larger than ``max_size`` bytes, the oldest ones. Dotfiles and
+    subdirectories (temporary files, snapshots, checkpoints, time series) are left alone.
+    """
+
     def __init__(
         self,
         cache_dir: Path = settings.api.CACHE_DIR,
+        memory_cache: MemoryCache | None = None,
+        *,
+        expire: float = settings.api.FILE_EXPIRE_SECONDS,
+        max_size: int = settings.api.FILE_CACHE_MAX_BYTES,
+        keep_expired: bool = False,
     ) -> None:
         self._cache_dir = cache_dir
+        self._memory_cache = memory_cache
+        self._expire = expire
+        self._max_size = max_size
+        self._keep_expired = keep_expired
+        self._janitor: asyncio.Task[None] | None = None
+        self.files = 0
+        self.size_bytes = 0
+        self.expired = 0
+        self.evicted = 0
 
-    async def cache_currency_info(self, info: CurrencyInfo, key: str) -> bytes:
-        filepath = self._cache_dir / key
-        currency_info_bytes: bytes = json_encoder.encode(asdict(info))
-        async with aiofiles.open(filepath, "wb") as in_f:
-            await in_f.write(currency_info_bytes)
+    @property
+    def local_cache(self) -> MemoryCache | None:
+        return self._memory_cache
 
-        return currency_info_bytes
+    def _write_file(self, key: str, value: bytes) -> None:
+        fd, temp_name = tempfile.mkstemp(dir=self._cache_dir, prefix=f".{key}.", suffix=".tmp")
+        temp_path = Path(temp_name)
+        try:
+            with os.fdopen(fd, "wb") as temp_file:
+                temp_file.write(value)
+            temp_path.replace(self._cache_dir / key)
+        except BaseException:
+            temp_path.unlink(missing_ok=True)
+            raise
+
+    def _expires(self, key: str) -> bool:
+        return bool(self._expire) and not is_past_date(key=key)
+
+    def _lifetime(self, key: str) -> float | None:
+        return self._expire if self._expires(key=key) else None
+
+    def _ttl(self, key: str, modified: float) -> float | None:
+        return modified + self._expire - time.time() if self._expires(key=key) else None
+
+    def _read_file(self, key: str, *, stale: bool = False) -> tuple[bytes, float | None] | None:
+        try:
+            with (self._cache_dir / key).open("rb") as cached_file:
+                ttl = self._ttl(key=key, modified=os.fstat(cached_file.fileno()).st_mtime)
+                if ttl is not None and ttl <= 0 and not stale:
+                    return None
+                return cached_file.read(), ttl
+        except FileNotFoundError:
+            return None
+
+    def _list_keys(self) -> list[str]:
+        with os.scandir(self._cache_dir) as entries:
+            return [
+                entry.name
+                for entry in entries
+                if not entry.name.startswith(".") and entry.is_file(follow_symlinks=False)
+            ]
+
+    def _locate_file(self, key: str, min_size: int) -> CachedFile | None:
+        path = self._cache_dir / key
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return None
+        ttl = self._ttl(key=key, modified=stat.st_mtime)
+        if stat.st_size < min_size or (ttl is not None and ttl <= 0):
+            return None
+        return CachedFile(path=path, ttl=ttl)
+
+    async def cache_encoded(self, key: str, value: bytes) -> None:
+        await asyncio.to_thread(self._write_file, key, value)
+        if self._memory_cache is not None:
+            self._memory_cache.set(key=key, value=value, ttl=self._lifetime(key=key))
+
+    def _write_files(self, entries: Mapping[str, bytes]) -> None:
+        for key, value in entries.items():
+            self._write_file(key, value)
+
+    async def cache_encoded_many(self, entries: Mapping[str, bytes]) -> None:
+        await asyncio.to_thread(self._write_files, entries)
+        if self._memory_cache is not None:
+            for key, value in entries.items():
+                self._memory_cache.set(key=key, value=value, ttl=self._lifetime(key=key))
 
     async def read_currency_info(self, key: str) -> bytes | None:
-        filepath = self._cache_dir / key
-        if filepath.exists():
-            async with aiofiles.open(filepath, "rb") as out_f:
-                return await out_f.read()
+        if self._memory_cache is not None:
+            cached_currency = self._memory_cache.get(key=key)
+            if cached_currency is not None:
+                return cached_currency
 
-        return None
+        cached_file = await asyncio.to_thread(self._read_file, key)
+        if cached_file is None:
+            return None
+        cached_currency, ttl = cached_file
+        if self._memory_cache is not None:
+            self._memory_cache.set(key=key, value=cached_currency, ttl=ttl)
+        return cached_currency
+
+    async def read_stale_currency_info(self, key: str) -> bytes | None:
+        cached_file = await asyncio.to_thread(self._read_file, key, stale=True)
+        return cached_file[0] if cached_file is not None else None
+
+    async def cached_keys(self) -> list[str]:
+        try:
+            return await asyncio.to_thread(self._list_keys)
+        except FileNotFoundError:
+            return []
+
+    async def locate_currency_info(self, key: str, min_size: int = 0) -> CachedFile | None:
+        if self._memory_cache is not None and key in self._memory_cache:
+            return None
+        return await asyncio.to_thread(self._locate_file, key, min_size)
+
+    def _sweep(self) -> list[str]:
+        expired_before = time.time() - self._expire
+        removed: list[str] = []
+        live: list[tuple[float, int, str]] = []
+        with os.scandir(self._cache_dir) as entries:
+            for entry in entries:
+                if entry.name.startswith(".") or not entry.is_file(follow_symlinks=False):
+                    continue
+                stat = entry.stat(follow_symlinks=False)
+                expired = stat.st_mtime <= expired_before and self._expires(key=entry.name)
+                if expired and not self._keep_expired:
+                    Path(entry.path).unlink(missing_ok=True)
+                    removed.append(entry.name)
+                    self.expired += 1
+                else:
+                    live.append((stat.st_mtime, stat.st_size, entry.name))
+        size = sum(file_size for _, file_size, _ in live)
+        if self._max_size and size > self._max_size:
+            live.sort()
+            while live and size > self._max_size:
+                _, file_size, name = live.pop(0)
+                (self._cache_dir / name).unlink(missing_ok=True)
+                removed.append(name)
+                size -= file_size
+                self.evicted += 1
+        self.files = len(live)
+        self.size_bytes = size
+        return removed
+
+    async def sweep(self) -> None:
+        """Remove expired files and the oldest ones beyond the size limit."""
+        removed = await asyncio.to_thread(self._sweep)
+        if self._memory_cache is not None:
+            for key in removed:
+                self._memory_cache.invalidate(key=key)
+        if removed:
+            log.info("Removed %d files from the cache directory, %d bytes left", len(removed), self.size_bytes)
+
+    async def _run_janitor(self, interval: float) -> None:
+        while True:
+            try:
+                await self.sweep()
+            except OSError as exc:
+                log.warning("Cache directory cleanup failed: %r", exc)
+            await asyncio.sleep(interval)
+
+    def start_janitor(self, interval: float) -> None:
+        if self._janitor is None:
+            self._janitor = asyncio.create_task(self._run_janitor(interval=interval))
+
+    async def close(self) -> None:
+        if self._janitor is not None:
+            self._janitor.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._janitor
+            self._janitor = None
+
+    def stats(self) -> dict[str, int | float]:
+        return {
+            "files": self.files,
+            "size_bytes": self.size_bytes,
+            "expired": self.expired,
+            "evicted": self.evicted,
+        }
 
 
 class RedisStorage(CacheStorage):
+    """Keeps each entry in a Redis string key, compressed by ``codec`` if one is given.
+
+    Entries expire ``expire`` seconds after they were written, except those of past dates, whose
+    rates do not change, such as the ones written by a backfill: they expire after ``history_expire``
+    seconds, or never if it is ``0``. Values written without compression stay readable once it is
+    turned on, and the other way round as long as the codec is set.
+    """
+
     def __init__(
         self,
         redis_client: Redis | None = None,
         expire: int = settings.redis.KEY_EXPIRE_SECONDS,
+        client_cache: ClientSideCache | None = None,
+        *,
+        codec: ValueCodec | None = None,
+        history_expire: int = settings.redis.HISTORY_EXPIRE_SECONDS,
     ) -> None:
         self._redis_client = redis_client or settings.redis.client
         self._expire = expire
+        self._history_expire = history_expire
+        self._client_cache = client_cache
+        self._codec = codec
+
+    def _lifetime(self, key: str) -> int | None:
+        if not is_past_date(key=key):
+            return self._expire
+        return self._history_expire or None
+
+    def _encode(self, value: bytes) -> bytes:
+        return self._codec.encode(value) if self._codec is not None else value
+
+    def _decode(self, value: bytes) -> bytes:
+        return self._codec.decode(value) if self._codec is not None else value
+
+    @property
+    def local_cache(self) -> MemoryCache | None:
+        return self._client_cache.local if self._client_cache is not None else None
 
-    async def cache_currency_info(self, info: CurrencyInfo, key: str) -> bytes:
-        currency_info_bytes: bytes = json_encoder.encode(asdict(info))
-        await self._redis_client.setex(
+    async def cache_encoded(self, key: str, value: bytes) -> None:
+        await self._redis_client.set(
             name=key,
-            time=self._expire,
-            value=currency_info_bytes,
+            value=self._encode(value),
+            ex=self._lifetime(key=key),
         )
-        return currency_info_bytes
+
+    async def cache_encoded_many(self, entries: Mapping[str, bytes]) -> None:
+        if not entries:
+            return
+        async with self._redis_client.pipeline(transaction=False) as pipe:
+            for key, value in entries.items():
+                pipe.set(name=key, value=self._encode(value), ex=self._lifetime(key=key))
+            await pipe.execute()
 
     async def read_currency_info(self, key: str) -> bytes | None:
+        if self._client_cache is None:
+            return await self._read_from_redis(key=key)
+
+        cached_currency = self._client_cache.get(key=key)
+        if cached_currency is not None:
+            return cached_currency
+        token = self._client_cache.begin_read()
+        cached_currency = await self._read_from_redis(key=key)
+        if cached_currency is not None:
+            self._client_cache.store(key=key, value=cached_currency, token=token)
+        return cached_currency
+
+    async def _scan_keys(self, match: str) -> list[str]:
+        return [
+            key.decode() if isinstance(key, bytes) else key
+            async for key in self._redis_client.scan_iter(match=match, count=SCAN_COUNT)
+        ]
+
+    async def cached_keys(self) -> list[str]:
+        return await self._scan_keys(match=KEY_PATTERN)
+
+    async def read_day(self, for_date: datetime.date) -> dict[str, bytes]:
+        """Return every entry cached for ``for_date`` by key."""
+        keys = await self._scan_keys(match=f"{for_date.isoformat()}-*")
+        if not keys:
+            return {}
+        values: list[bytes | None] = await self._redis_client.mget(keys)
+        return {key: self._decode(value) for key, value in zip(keys, values, strict=True) if value is not None}
+
+    async def invalidate_day(self, for_date: datetime.date) -> None:
+        """Remove every entry cached for ``for_date``."""
+        keys = await self._scan_keys(match=f"{for_date.isoformat()}-*")
+        if keys:
+            await self._redis_client.unlink(*keys)
+
+    async def _read_from_redis(self, key: str) -> bytes | None:
         cached_currency: bytes = await self._redis_client.get(name=key)
         if cached_currency:
-            return cached_currency
+            return self._decode(cached_currency)
 
         return None
 
 
+class RedisHashStorage(RedisStorage):
+    """Keeps the entries of a date in one Redis hash, ``{prefix}{date}``, with a field per currency.
+
+    Keys are still ``{for_date}-{currency}`` (plus the format suffix), the date part names the hash
+    and the rest the field. A date expires as a whole, ``expire`` seconds (``history_expire`` for a
+    past date) after its first entry was written, and is read or invalidated with a single command.
+    With ``dual_read``, an entry missing from its hash is looked up under its string key of
+    :class:`RedisStorage` and copied into the hash, so the layout can be switched on a live cache;
+    :meth:`migrate` moves all string keys at once.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        redis_client: Redis | None = None,
+        expire: int = settings.redis.KEY_EXPIRE_SECONDS,
+        client_cache: ClientSideCache | None = None,
+        *,
+        codec: ValueCodec | None = None,
+        prefix: str = settings.redis.HASH_PREFIX,
+        dual_read: bool = settings.redis.DUAL_READ,
+        history_expire: int = settings.redis.HISTORY_EXPIRE_SECONDS,
+    ) -> None:
+        if client_cache is not None:
+            message = "Client-side caching tracks string keys and cannot be used with the hash layout"
+            raise ValueError(message)
+        super().__init__(
+            redis_client=redis_client,
+            expire=expire,
+            codec=codec,
+            history_expire=history_expire,
+        )
+        self._prefix = prefix
+        self._dual_read = dual_read
+        self.legacy_reads = 0
+
+    def _location(self, key: str) -> tuple[str, str]:
+        return f"{self._prefix}{key[:DATE_LENGTH]}", key[DATE_LENGTH + 1 :]
+
+    def _write(self, pipe: Pipeline, key: str, value: bytes, expire: int | None = None) -> None:
+        name, field = self._location(key=key)
+        pipe.hset(name=name, key=field, value=self._encode(value))  # type: ignore[arg-type]
+        expire = expire or self._lifetime(key=key)
+        if expire is not None:
+            pipe.expire(name=name, time=expire, nx=True)
+
+    async def cache_encoded(self, key: str, value: bytes) -> None:
+        await self.cache_encoded_many(entries={key: value})
+
+    async def cache_encoded_many(self, entries: Mapping[str, bytes]) -> None:
+        if not entries:
+            return
+        async with self._redis_client.pipeline(transaction=False) as pipe:
+            for key, value in entries.items():
+                self._write(pipe=pipe, key=key, value=value)
+            await pipe.execute()
+
+    async def _read_from_redis(self, key: str) -> bytes | None:
+        name, field = self._location(key=key)
+        cached_currency: bytes | None = await self._redis_client.hget(name=name, key=field)  # type: ignore[misc]
+        if cached_currency:
+            return self._decode(cached_currency)
+        if not self._dual_read:
+            return None
+
+        cached_currency = await super()._read_from_redis(key=key)
+        if cached_currency is not None:
+            self.legacy_reads += 1
+            await self.cache_encoded(key=key, value=cached_currency)
+        return cached_currency
+
+    async def cached_keys(self) -> list[str]:
+        names = await self._scan_keys(match=f"{self._prefix}{DATE_PATTERN}")
+        keys: list[str] = []
+        for name in names:
+            for_date = name.removeprefix(self._prefix)
+            fields: list[bytes] = await self._redis_client.hkeys(name)  # type: ignore[misc]
+            keys.extend(f"{for_date}-{field.decode()}" for field in fields)
+        if self._dual_read:
+            keys.extend(await super().cached_keys())
+        return list(dict.fromkeys(keys))
+
+    async def read_day(self, for_date: datetime.date) -> dict[str, bytes]:
+        name = f"{self._prefix}{for_date.isoformat()}"
+        entries: dict[bytes, bytes] = await self._redis_client.hgetall(name)  # type: ignore[misc]
+        return {f"{for_date.isoformat()}-{field.decode()}": self._decode(value) for field, value in entries.items()}
+
+    async def invalidate_day(self, for_date: datetime.date) -> None:
+        await self._redis_client.unlink(f"{self._prefix}{for_date.isoformat()}")
+        if self._dual_read:
+            await super().invalidate_day(for_date=for_date)
+
+    async def migrate(self, batch_size: int = 500) -> int:
+        """Move the string keys of :class:`RedisStorage` into the date hashes, keeping their expiry."""
+        keys = await super().cached_keys()
+        for start in range(0, len(keys), batch_size):
+            batch = keys[start : start + batch_size]
+            async with self._redis_client.pipeline(transaction=False) as pipe:
+                for key in batch:
+                    pipe.get(key)
+                    pipe.ttl(key)
+                replies = await pipe.execute()
+            async with self._redis_client.pipeline(transaction=False) as pipe:
+                for key, value, ttl in zip(batch, replies[::2], replies[1::2], strict=True):
+                    if value is not None:
+                        self._write(pipe=pipe, key=key, value=value, expire=ttl if ttl > 0 else None)
+                pipe.unlink(*batch)
+                await pipe.execute()
+        return len(keys)
+
+
 def storage_getter(storage_type: str = settings.api.STORAGE_TYPE) -> CacheStorage:
+    if storage_type == "redis":
+        redis_storage = RedisHashStorage if settings.redis.LAYOUT == HASH_LAYOUT else RedisStorage
+        return redis_storage(codec=get_value_codec())
     storages: dict[str, type[CacheStorage]] = {
         "file": FileStorage,
-        "redis": RedisStorage,
     }
     return storages[storage_type]()
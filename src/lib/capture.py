@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import time
+from typing import (
+    TYPE_CHECKING,
+    NamedTuple,
+)
+
+from aiohttp import web
+
+if TYPE_CHECKING:
+    from collections.abc import (
+        Collection,
+        Iterator,
+    )
+    from pathlib import Path
+
+    from aiohttp.typedefs import (
+        Handler,
+        Middleware,
+    )
+
+__all__ = (
+    "CapturedRequest",
+    "TrafficCapture",
+    "capture_middleware",
+    "read_capture",
+)
+
+
+class CapturedRequest(NamedTuple):
+    timestamp: float
+    currency: str
+    date: str
+    """The date as requested, empty for the latest rates."""
+
+    def to_line(self) -> str:
+        return f"{self.timestamp:.3f}\t{self.currency}\t{self.date}\n"
+
+    @classmethod
+    def from_line(cls, line: str) -> CapturedRequest:
+        timestamp, currency, date = line.rstrip("\n").split("\t")
+        return cls(timestamp=float(timestamp), currency=currency, date=date)
+
+
+def read_capture(path: Path) -> Iterator[CapturedRequest]:
+    """Read a capture log in the order it was written, skipping malformed lines."""
+    with path.open(encoding="utf-8") as file:
+        for line in file:
+            with contextlib.suppress(ValueError):
+                yield CapturedRequest.from_line(line)
+
+
+class TrafficCapture:
+    """Appends rate requests to a tab-separated log of ``timestamp, currency, date`` lines.
+
+    Lines are buffered on the event loop and appended to ``path`` from a worker thread every
+    ``flush_interval`` seconds, or as soon as ``batch_size`` lines are waiting. While a write is
+    slow, at most ``max_pending`` lines are buffered and later requests are not captured.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        *,
+        batch_size: int = 1000,
+        flush_interval: float = 1.0,
+        max_pending: int = 100_000,
+    ) -> None:
+        self._path = path
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._max_pending = max_pending
+        self._pending: list[str] = []
+        self._lock = asyncio.Lock()
+        self._task: asyncio.Task[None] | None = None
+        self._flushing: set[asyncio.Task[None]] = set()
+        self.captured = 0
+        self.dropped = 0
+        self.written = 0
+        self.flushes = 0
+
+    def start(self) -> None:
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        self._task = asyncio.create_task(self._run())
+
+    def record(self, currency: str, date: str, timestamp: float | None = None) -> None:
+        if len(self._pending) >= self._max_pending:
+            self.dropped += 1
+            return
+        request = CapturedRequest(
+            timestamp=time.time() if timestamp is None else timestamp,
+            currency=currency,
+            date=date,
+        )
+        self._pending.append(request.to_line())
+        self.captured += 1
+        if len(self._pending) >= self._batch_size and not self._lock.locked():
+            task = asyncio.create_task(self.flush())
+            self._flushing.add(task)
+            task.add_done_callback(self._flushing.discard)
+
+    def _write(self, lines: list[str]) -> None:
+        with self._path.open("a", encoding="utf-8") as file:
+            file.writelines(lines)
+
+    async def flush(self) -> None:
+        async with self._lock:
+            if not self._pending:
+                return
+            lines, self._pending = self._pending, []
+            await asyncio.to_thread(self._write, lines)
+            self.written += len(lines)
+            self.flushes += 1
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self._flush_interval)
+            await self.flush()
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        if self._flushing:
+            await asyncio.gather(*self._flushing)
+        await self.flush()
+
+    def stats(self) -> dict[str, int | float]:
+        return {
+            "captured": self.captured,
+            "dropped": self.dropped,
+            "written": self.written,
+            "pending": len(self._pending),
+            "flushes": self.flushes,
+        }
+
+
+def capture_middleware(capture: TrafficCapture, handlers: Collection[Handler]) -> Middleware:
+    """Capture the requests routed to ``handlers``, whatever their response."""
+
+    @web.middleware
+    async def middleware(request: web.Request, handler: Handler) -> web.StreamResponse:
+        if request.match_info.handler in handlers:
+            capture.record(
+                currency=request.match_info.get("currency", "").lower(),
+                date=request.match_info.get("date", ""),
+            )
+        return await handler(request)
+
+    return middleware
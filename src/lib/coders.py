@@ -1,7 +1,11 @@
+from dataclasses import dataclass
 from decimal import Decimal
+from functools import lru_cache
 
 import msgspec
 
+from src.lib.types import CurrencyInfo
+
 encoder = msgspec.json.Encoder()
 
 decoder = msgspec.json.Decoder()
@@ -10,3 +14,66 @@ decoder = msgspec.json.Decoder()
 json_encoder = encoder
 
 json_decoder_decimal = msgspec.json.Decoder(float_hook=Decimal)
+
+msgpack_encoder = msgspec.msgpack.Encoder()
+
+currency_info_json_decoder = msgspec.json.Decoder(CurrencyInfo)
+
+currency_info_msgpack_decoder = msgspec.msgpack.Decoder(CurrencyInfo)
+
+
+@dataclass(frozen=True)
+class MediaFormat:
+    content_type: str
+    extension: str
+    encoder: msgspec.json.Encoder | msgspec.msgpack.Encoder
+
+    def variant_key(self, key: str) -> str:
+        """Return the cache key of this encoding for the cache key of the JSON document."""
+        if self is JSON_FORMAT:
+            return key
+        return key.removesuffix(JSON_FORMAT.extension) + self.extension
+
+
+JSON_FORMAT = MediaFormat(content_type="application/json", extension=".json", encoder=json_encoder)
+
+MSGPACK_FORMAT = MediaFormat(content_type="application/msgpack", extension=".msgpack", encoder=msgpack_encoder)
+
+MEDIA_FORMATS: dict[str, MediaFormat] = {
+    "application/json": JSON_FORMAT,
+    "application/msgpack": MSGPACK_FORMAT,
+    "application/x-msgpack": MSGPACK_FORMAT,
+}
+
+
+def quality(media_range: str) -> float:
+    """Return the ``q`` parameter of an ``Accept`` media range, ``0`` if it is malformed."""
+    for parameter in media_range.split(";")[1:]:
+        name, _, value = parameter.partition("=")
+        if name.strip().lower() == "q":
+            try:
+                return float(value.strip())
+            except ValueError:
+                return 0.0
+    return 1.0
+
+
+@lru_cache(maxsize=64)
+def negotiate_media_format(accept: str | None) -> MediaFormat:
+    """Pick the supported media type of the ``Accept`` header with the highest ``q``, JSON by default.
+
+    Media types of equal ``q`` are preferred in the order they are listed, and ``q=0`` ones are refused.
+    """
+    if accept:
+        ranked = sorted(
+            ((quality(media_range), media_range) for media_range in accept.split(",")),
+            reverse=True,
+            key=lambda item: item[0],
+        )
+        for media_quality, media_range in ranked:
+            if media_quality <= 0:
+                break
+            media_format = MEDIA_FORMATS.get(media_range.split(";", 1)[0].strip().lower())
+            if media_format is not None:
+                return media_format
+    return JSON_FORMAT
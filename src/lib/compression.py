@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import zlib
+from functools import lru_cache
+
+from src.config import get_settings
+
+__all__ = (
+    "COMPRESSED_FLAG",
+    "ValueCodec",
+    "get_value_codec",
+)
+
+settings = get_settings()
+
+COMPRESSED_FLAG = b"\x01"
+"""First byte of a compressed value. JSON documents start with ``{`` and msgpack ones with a map
+header, so a value without it is stored as is and read back unchanged."""
+
+
+class ValueCodec:
+    """Compresses stored values with zlib, behind a flag byte.
+
+    Values shorter than ``min_size`` bytes are stored as is, since the few bytes zlib saves on them
+    are not worth a decompression per read, and so are values that do not shrink by at least
+    ``min_saving``. Run ``benchmarks.redis_compression`` to weigh the savings against the CPU time.
+    """
+
+    def __init__(self, min_size: int = 128, level: int = 6, min_saving: float = 0.1) -> None:
+        self._min_size = min_size
+        self._level = level
+        self._min_saving = min_saving
+        self.compressed = 0
+        self.stored_raw = 0
+        self.raw_bytes = 0
+        self.stored_bytes = 0
+        self.decompressed = 0
+
+    def encode(self, value: bytes) -> bytes:
+        self.raw_bytes += len(value)
+        if len(value) >= self._min_size and not value.startswith(COMPRESSED_FLAG):
+            compressed = COMPRESSED_FLAG + zlib.compress(value, self._level)
+            if len(compressed) <= len(value) * (1 - self._min_saving):
+                self.compressed += 1
+                self.stored_bytes += len(compressed)
+                return compressed
+        self.stored_raw += 1
+        self.stored_bytes += len(value)
+        return value
+
+    def decode(self, value: bytes) -> bytes:
+        if not value.startswith(COMPRESSED_FLAG):
+            return value
+        self.decompressed += 1
+        return zlib.decompress(value[1:])
+
+    def stats(self) -> dict[str, int | float]:
+        return {
+            "compressed": self.compressed,
+            "stored_raw": self.stored_raw,
+            "decompressed": self.decompressed,
+            "saved_bytes": self.raw_bytes - self.stored_bytes,
+            "ratio": round(self.stored_bytes / self.raw_bytes, 4) if self.raw_bytes else 1.0,
+        }
+
+
+@lru_cache(maxsize=1)
+def get_value_codec() -> ValueCodec | None:
+    if not settings.redis.COMPRESSION:
+        return None
+    return ValueCodec(min_size=settings.redis.COMPRESSION_MIN_BYTES, level=settings.redis.COMPRESSION_LEVEL)
@@ -1,32 +1,38 @@
+import time
+from collections.abc import Iterable
 from dataclasses import (
     dataclass,
     field,
 )
 
-import aiohttp
-
-from src.config import get_settings
+from src.lib.providers import get_provider
 
 __all__ = ("check_currency",)
 
-settings = get_settings()
-
 
 @dataclass
 class CheckCurrencyExists:
     cached_currencies: set[str] = field(default_factory=set)
+    expires_at: float | None = None
+    """Wall clock time after which the currencies are fetched again, ``None`` to keep them."""
 
     @classmethod
     async def get_all_currencies(cls) -> dict[str, str]:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(settings.api.CURRENCIES_API_LIST_URL) as response:
-                result: dict[str, str] = await response.json()
-                return result
+        return await get_provider().currencies()
+
+    def restore(self, currencies: Iterable[str], expires_at: float) -> bool:
+        """Use previously fetched currencies until ``expires_at``, unless they were fetched already."""
+        if self.cached_currencies or expires_at <= time.time():
+            return False
+        self.cached_currencies.update(currencies)
+        self.expires_at = expires_at
+        return True
 
     async def is_currency_exists(self, currency: str) -> bool:
-        if not self.cached_currencies:
+        if not self.cached_currencies or (self.expires_at is not None and self.expires_at <= time.time()):
             all_currencies: dict[str, str] = await self.get_all_currencies()
-            self.cached_currencies.update(set(all_currencies))
+            self.cached_currencies = set(all_currencies)
+            self.expires_at = None
         return currency in self.cached_currencies
 
 
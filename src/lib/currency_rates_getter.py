@@ -1,43 +1,62 @@
 from __future__ import annotations
 
 import datetime
-from typing import (
-    TYPE_CHECKING,
-    cast,
-)
+from typing import TYPE_CHECKING
 
 from aiohttp import (
-    ClientSession,
+    ClientError,
     web,
 )
 
 from src.config import get_settings
 from src.lib.cache_storage import storage_getter
 from src.lib.coders import (
-    json_decoder_decimal,
+    JSON_FORMAT,
+    currency_info_json_decoder,
+)
+from src.lib.limiter import UpstreamSaturatedError
+from src.lib.providers import (
+    UpstreamStatusError,
+    get_provider,
 )
 from src.lib.types import CurrencyInfo
+from src.lib.validators import coverage_window
 
 if TYPE_CHECKING:
     from collections.abc import Iterable
-    from decimal import Decimal
 
-    from src.lib.cache_storage import CacheStorage
-    from src.lib.types import ResponseCurrency, ResponseType
+    from src.lib.admission import AdmissionController
+    from src.lib.cache_storage import (
+        CachedFile,
+        CacheStorage,
+    )
+    from src.lib.coders import MediaFormat
+    from src.lib.providers import RateProvider
+    from src.lib.single_flight import SingleFlight
+    from src.lib.stale_fallback import StaleFallback
+    from src.lib.timeseries import TimeSeriesStore
 
 
 settings = get_settings()
-SUCCESS_STATUS_CODE = 200
+MAX_STALE_ATTEMPTS = 3
+UPSTREAM_ERRORS = (ClientError, TimeoutError, UpstreamSaturatedError, UpstreamStatusError)
 
 
 class CurrencyRatesGetter:
-    def __init__(
+    def __init__(  # noqa: PLR0913
         self,
         currency: str,
         to_currencies: Iterable[str] = settings.api.TARGET_CURRENCIES,
         for_date: datetime.date | None = None,
         storage: CacheStorage | None = None,
         key_template: str = settings.api.key_template,
+        *,
+        admission: AdmissionController | None = None,
+        media_format: MediaFormat = JSON_FORMAT,
+        timeseries: TimeSeriesStore | None = None,
+        fallback: StaleFallback | None = None,
+        provider: RateProvider | None = None,
+        single_flight: SingleFlight | None = None,
     ) -> None:
         self.currency = currency.lower()
         self.target_currencies = set(map(str.lower, to_currencies))
@@ -45,6 +64,13 @@ class CurrencyRatesGetter:
         self.selected_date = self.for_date.isoformat()
         self._storage = storage or storage_getter()
         self._key_template = key_template
+        self._admission = admission
+        self._media_format = media_format
+        self._timeseries = timeseries
+        self._fallback = fallback
+        self._provider = provider or get_provider()
+        self._single_flight = single_flight
+        self.stale_date: datetime.date | None = None
 
     def get_cache_key(
         self,
@@ -53,30 +79,13 @@ class CurrencyRatesGetter:
     ) -> str:
         return self._key_template.format(for_date=for_date.isoformat(), currency=currency)
 
-    @classmethod
-    async def request_currency_info(cls, url: str) -> ResponseCurrency:
-        async with ClientSession() as session:
-            async with session.get(url) as response:
-                if response.status == SUCCESS_STATUS_CODE:
-                    result: ResponseCurrency = await response.json(
-                        loads=json_decoder_decimal.decode,
-                    )
-                    return result
-                message = "No results were found for your request"
-                raise web.HTTPNotFound(
-                    reason=message,
-                )
-
     async def read_currency_info_for_date(self) -> CurrencyInfo:
-        url = settings.api.CURRENCY_API_WITH_DATE_URL.format(
-            date=self.selected_date,
-            currency=self.currency,
-        )
-        response_data = await self.request_currency_info(url=url)
-        data: ResponseType = {
-            "date": cast("str", response_data["date"]),
-            "values": cast("dict[str, int | Decimal]", response_data[self.currency]),
-        }
+        try:
+            data = await self._provider.fetch(currency=self.currency, for_date=self.for_date)
+        except web.HTTPNotFound:
+            coverage_window.observe(for_date=self.for_date, found=False)
+            raise
+        coverage_window.observe(for_date=self.for_date, found=True)
         return CurrencyInfo.get_currency_info_response(
             info=data,
             source_currency=self.currency,
@@ -85,6 +94,10 @@ class CurrencyRatesGetter:
 
     async def get_and_cache_currency_info(self) -> bytes:
         currency_info = await self.read_currency_info_for_date()
+        if self._timeseries is not None:
+            await self._timeseries.record(info=currency_info)
+        if self._fallback is not None:
+            self._fallback.index.add(currency=currency_info.currency, for_date=currency_info.date)
         key = self.get_cache_key(
             for_date=currency_info.date,
             currency=currency_info.currency,
@@ -93,20 +106,111 @@ class CurrencyRatesGetter:
             info=currency_info,
             key=key,
         )
-        return currency_info_bytes
+        if self._media_format is JSON_FORMAT:
+            return currency_info_bytes
+
+        return await self._storage.cache_currency_info(
+            info=currency_info,
+            key=self._media_format.variant_key(key),
+            encoder=self._media_format.encoder,
+        )
 
     async def get_currency_info_from_cache(self) -> bytes | None:
         key = self.get_cache_key(
             for_date=self.for_date,
             currency=self.currency,
         )
-        currency_info: bytes | None = await self._storage.read_currency_info(key=key)
+        variant_key = self._media_format.variant_key(key)
+        currency_info: bytes | None = await self._storage.read_currency_info(key=variant_key)
+        if currency_info is not None or variant_key == key:
+            return currency_info
+
+        return await self.transcode_cached_currency_info(key=key, variant_key=variant_key)
+
+    async def get_cached_file(self, min_size: int = 0) -> CachedFile | None:
+        """Locate the cached document in the requested format, if the storage keeps it in a large enough file."""
+        key = self.get_cache_key(
+            for_date=self.for_date,
+            currency=self.currency,
+        )
+        return await self._storage.locate_currency_info(key=self._media_format.variant_key(key), min_size=min_size)
+
+    async def transcode_cached_currency_info(self, key: str, variant_key: str) -> bytes | None:
+        """Encode a cached JSON document in the requested format once and cache the result."""
+        currency_info_json = await self._storage.read_currency_info(key=key)
+        if currency_info_json is None:
+            return None
+
+        return await self._storage.cache_currency_info(
+            info=currency_info_json_decoder.decode(currency_info_json),
+            key=variant_key,
+            encoder=self._media_format.encoder,
+        )
+
+    async def get_stale_currency_info(self) -> bytes | None:
+        """Read the nearest earlier cached rates, whether they have expired or not."""
+        if self._fallback is None:
+            return None
+        for stale_date in self._fallback.index.earlier(
+            currency=self.currency,
+            for_date=self.for_date,
+            limit=MAX_STALE_ATTEMPTS,
+        ):
+            currency_info = await self._storage.read_stale_currency_info(
+                key=self.get_cache_key(for_date=stale_date, currency=self.currency),
+            )
+            if currency_info is None:
+                self._fallback.index.discard(currency=self.currency, for_date=stale_date)
+                continue
+            self.stale_date = stale_date
+            self._fallback.served_stale += 1
+            if self._media_format is JSON_FORMAT:
+                return currency_info
+            return self._media_format.encoder.encode(currency_info_json_decoder.decode(currency_info))
+        return None
+
+    async def admit_and_fetch_currency_info(self) -> bytes:
+        if self._admission is None:
+            return await self.get_and_cache_currency_info()
+        async with self._admission.miss_slot():
+            return await self.get_and_cache_currency_info()
+
+    async def fetch_currency_info(self) -> bytes:
+        if self._single_flight is None:
+            return await self.admit_and_fetch_currency_info()
+        key = self.get_cache_key(
+            for_date=self.for_date,
+            currency=self.currency,
+        )
+        return await self._single_flight.do(
+            key=self._media_format.variant_key(key),
+            fetch=self.admit_and_fetch_currency_info,
+            read=self.get_currency_info_from_cache,
+        )
 
-        return currency_info
+    async def fetch_or_fallback(self, fallback: StaleFallback) -> bytes:
+        if fallback.is_degraded():
+            stale = await self.get_stale_currency_info()
+            if stale is not None:
+                return stale
+        try:
+            return await self.fetch_currency_info()
+        except (*UPSTREAM_ERRORS, web.HTTPNotFound) as exc:
+            if not isinstance(exc, web.HTTPNotFound):
+                fallback.trip()
+            elif self.for_date < datetime.datetime.now(tz=datetime.UTC).date():
+                # Only today's rates may be missing because they are not published yet.
+                raise
+            stale = await self.get_stale_currency_info()
+            if stale is None:
+                raise
+            return stale
 
     async def get_currency_info(self) -> bytes:
         cache = await self.get_currency_info_from_cache()
         if cache is not None:
             return cache
 
-        return await self.get_and_cache_currency_info()
+        if self._fallback is None:
+            return await self.fetch_currency_info()
+        return await self.fetch_or_fallback(fallback=self._fallback)
@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+import hmac
+
+from aiohttp import (
+    hdrs,
+    web,
+)
+
+__all__ = ("check_debug_token",)
+
+BEARER_PREFIX = "Bearer "
+
+
+def check_debug_token(request: web.Request, token: str) -> None:
+    """Reject requests to the debug endpoints that do not carry ``Authorization: Bearer <token>``."""
+    authorization = request.headers.get(hdrs.AUTHORIZATION, "")
+    if not authorization.startswith(BEARER_PREFIX):
+        raise web.HTTPUnauthorized(
+            reason="Debug token required",
+            headers={hdrs.WWW_AUTHENTICATE: "Bearer"},
+        )
+    if not hmac.compare_digest(authorization.removeprefix(BEARER_PREFIX).encode(), token.encode()):
+        raise web.HTTPForbidden(reason="Invalid debug token")
@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import asyncio
+import collections
+import time
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING
+
+from aiohttp import web
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator
+
+__all__ = (
+    "AdaptiveLimiter",
+    "UpstreamSaturatedError",
+)
+
+SATURATED_RETRY_AFTER = "1"
+
+
+class UpstreamSaturatedError(web.HTTPServiceUnavailable):
+    """No upstream call slot became free before the deadline of the queued call."""
+
+    def __init__(self) -> None:
+        super().__init__(
+            reason="Exchange rates provider is saturated, try again later",
+            headers={"Retry-After": SATURATED_RETRY_AFTER},
+        )
+
+
+class AdaptiveLimiter:
+    """Caps concurrent calls to a remote service, with a cap adjusted by AIMD.
+
+    Each call that completes within ``latency_target`` seconds while the cap is at least half used
+    raises the cap by ``1 / limit``, about one more call per round trip; a failure or a slower
+    call multiplies it by ``backoff``. Calls that started before the last decrease do not decrease
+    it again, so a burst of slow calls counts once. Calls over the cap wait in a FIFO queue of at
+    most ``queue_size`` calls, for ``queue_timeout`` seconds at most, and fail with
+    :class:`UpstreamSaturatedError` otherwise.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        *,
+        initial: int = 16,
+        min_limit: int = 1,
+        max_limit: int = 128,
+        latency_target: float = 1.0,
+        backoff: float = 0.75,
+        queue_size: int = 256,
+        queue_timeout: float = 5.0,
+        failures: tuple[type[BaseException], ...] = (TimeoutError, ConnectionError),
+    ) -> None:
+        self._min_limit = min_limit
+        self._max_limit = max_limit
+        self._latency_target = latency_target
+        self._backoff = backoff
+        self._queue_size = queue_size
+        self._queue_timeout = queue_timeout
+        self._failures = failures
+        self._waiters: collections.deque[asyncio.Future[None]] = collections.deque()
+        self._decreased_at = 0.0
+        self.limit = float(initial)
+        self.in_flight = 0
+        self.calls = 0
+        self.failed = 0
+        self.slow = 0
+        self.decreases = 0
+        self.queued = 0
+        self.rejected = 0
+        self.expired = 0
+
+    @property
+    def capacity(self) -> int:
+        return int(self.limit)
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        await self._acquire()
+        started = time.monotonic()
+        try:
+            yield
+        except BaseException as exc:
+            if isinstance(exc, self._failures):
+                self.failed += 1
+                self._decrease(started=started)
+            raise
+        else:
+            self._observe(started=started, latency=time.monotonic() - started)
+        finally:
+            self.calls += 1
+            self._release()
+
+    async def _acquire(self) -> None:
+        if self.in_flight < self.capacity and not self._waiters:
+            self.in_flight += 1
+            return
+        if len(self._waiters) >= self._queue_size:
+            self.rejected += 1
+            raise UpstreamSaturatedError
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.queued += 1
+        try:
+            await asyncio.wait_for(waiter, timeout=self._queue_timeout)
+        except TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                return
+            self.expired += 1
+            raise UpstreamSaturatedError from None
+        except BaseException:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over as the caller was cancelled
+                self._release()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+    def _release(self) -> None:
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        while self._waiters and self.in_flight < self.capacity:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def _observe(self, started: float, latency: float) -> None:
+        if latency > self._latency_target:
+            self.slow += 1
+            self._decrease(started=started)
+        elif self.in_flight * 2 >= self.limit:
+            self.limit = min(self.limit + 1 / self.limit, float(self._max_limit))
+
+    def _decrease(self, started: float) -> None:
+        if started < self._decreased_at:
+            return
+        self.limit = max(self.limit * self._backoff, float(self._min_limit))
+        self._decreased_at = time.monotonic()
+        self.decreases += 1
+
+    def stats(self) -> dict[str, int | float]:
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "waiting": len(self._waiters),
+            "calls": self.calls,
+            "failed": self.failed,
+            "slow": self.slow,
+            "decreases": self.decreases,
+            "queued": self.queued,
+            "rejected": self.rejected,
+            "expired": self.expired,
+        }
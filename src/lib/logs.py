@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import copy
+import datetime
+import logging
+import queue
+import random
+import sys
+from logging.handlers import (
+    QueueHandler,
+    QueueListener,
+)
+from typing import (
+    TYPE_CHECKING,
+    Any,
+)
+
+from aiohttp.abc import AbstractAccessLogger
+
+from src.config import get_settings
+from src.lib.coders import json_encoder
+
+if TYPE_CHECKING:
+    from aiohttp.web import (
+        BaseRequest,
+        StreamResponse,
+    )
+
+__all__ = (
+    "JsonFormatter",
+    "SampledAccessLogger",
+    "setup_logging",
+)
+
+settings = get_settings()
+
+ERROR_STATUS = 400
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats a record as a JSON object on one line, with the ``fields`` passed in ``extra``."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: dict[str, Any] = {
+            "time": datetime.datetime.fromtimestamp(record.created, tz=datetime.UTC).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        fields = getattr(record, "fields", None)
+        if isinstance(fields, dict):
+            entry.update(fields)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json_encoder.encode(entry).decode()
+
+
+class LogQueueHandler(QueueHandler):
+    """Hands records over to the listener thread with their message and traceback rendered.
+
+    Unlike :class:`QueueHandler`, the traceback is kept apart from the message so that the
+    listener's formatter can still place it.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def setup_logging(*, json_lines: bool = False, level: int = logging.INFO) -> QueueListener:
+    """Route the records of every logger through a queue to a stdout writer thread.
+
+    Emitting a record then only costs the event loop a queue put; call ``stop`` on the returned
+    listener before exiting to write out the remaining records.
+    """
+    handler = logging.StreamHandler(stream=sys.stdout)
+    if json_lines:
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter(fmt=settings.api.DEFAULT_LOG_FORMAT, datefmt="%Y:%m:%d %H:%M:%S"))
+    log_queue: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.handlers[:] = [LogQueueHandler(log_queue)]
+    root.setLevel(level)
+    listener = QueueListener(log_queue, handler, respect_handler_level=True)
+    listener.start()
+    return listener
+
+
+class SampledAccessLogger(AbstractAccessLogger):
+    """Logs errors and slow requests, and a ``ACCESS_LOG_SAMPLE_RATE`` share of the other ones.
+
+    Entries carry their sample rate, so that counts can be scaled back to the request volume.
+    """
+
+    sample_rate = settings.api.ACCESS_LOG_SAMPLE_RATE
+    slow_threshold = settings.api.ACCESS_LOG_SLOW_MS / 1000
+
+    def log(self, request: BaseRequest, response: StreamResponse, time: float) -> None:
+        error = response.status >= ERROR_STATUS
+        slow = time >= self.slow_threshold
+        if not error and not slow and random.random() >= self.sample_rate:  # noqa: S311
+            return
+        self.logger.info(
+            '%s "%s %s" %s %.1f ms',
+            request.remote,
+            request.method,
+            request.path_qs,
+            response.status,
+            time * 1000,
+            extra={
+                "fields": {
+                    "remote": request.remote,
+                    "method": request.method,
+                    "path": request.path_qs,
+                    "status": response.status,
+                    "duration_ms": round(time * 1000, 3),
+                    "size": response.body_length,
+                    "user_agent": request.headers.get("User-Agent"),
+                    "sample_rate": 1.0 if error or slow else self.sample_rate,
+                },
+            },
+        )
@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import asyncio
+import bisect
+import contextlib
+import logging
+import sys
+import threading
+import time
+import traceback
+
+__all__ = ("LoopLagMonitor",)
+
+log = logging.getLogger(__name__)
+
+LAG_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000)
+BLOCKED_STACK_LIMIT = 20
+
+
+class LoopLagMonitor:
+    """Measures how late the event loop wakes up a periodic sleeper.
+
+    Every measurement is counted in a histogram with ``LAG_BUCKETS_MS`` upper bounds. With a
+    ``block_threshold``, a watchdog thread also checks that the sleeper keeps running; when it has
+    not run for longer than the threshold, the stack of the loop thread, which is the callback
+    blocking the loop, is logged once per stall.
+    """
+
+    def __init__(self, interval: float = 0.1, block_threshold: float | None = None) -> None:
+        self._interval = interval
+        self._block_threshold = block_threshold
+        self._task: asyncio.Task[None] | None = None
+        self._watchdog: threading.Thread | None = None
+        self._stopped = threading.Event()
+        self._loop_thread_id: int | None = None
+        self._heartbeat = time.monotonic()
+        self.lag: float = 0.0
+        self.max_lag: float = 0.0
+        self.samples = 0
+        self.blocked = 0
+        self.histogram = [0] * (len(LAG_BUCKETS_MS) + 1)
+
+    @property
+    def lag_ms(self) -> float:
+        return self.lag * 1000
+
+    def start(self) -> None:
+        if self._task is not None:
+            return
+        self._heartbeat = time.monotonic()
+        self._task = asyncio.create_task(self._run())
+        if self._block_threshold is not None:
+            self._loop_thread_id = threading.get_ident()
+            self._stopped.clear()
+            self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+            self._watchdog.start()
+
+    async def stop(self) -> None:
+        if self._watchdog is not None:
+            self._stopped.set()
+            self._watchdog.join()
+            self._watchdog = None
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    def record(self, lag: float) -> None:
+        self.lag = max(lag, 0.0)
+        self.max_lag = max(self.max_lag, self.lag)
+        self.samples += 1
+        self.histogram[bisect.bisect_left(LAG_BUCKETS_MS, self.lag * 1000)] += 1
+
+    async def _run(self) -> None:
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self._interval)
+            self._heartbeat = time.monotonic()
+            self.record(time.perf_counter() - started - self._interval)
+
+    def _watch(self) -> None:
+        if self._block_threshold is None:
+            return
+        reported: float | None = None
+        while not self._stopped.wait(self._block_threshold / 2):
+            heartbeat = self._heartbeat
+            stalled = time.monotonic() - heartbeat - self._interval
+            if stalled >= self._block_threshold and reported != heartbeat:
+                reported = heartbeat
+                self.report_blocked(stalled=stalled)
+
+    def report_blocked(self, stalled: float) -> None:
+        self.blocked += 1
+        frame = sys._current_frames().get(self._loop_thread_id or 0)  # noqa: SLF001
+        stack = "".join(traceback.format_stack(frame, limit=BLOCKED_STACK_LIMIT)) if frame is not None else ""
+        log.warning("Event loop blocked for %.0f ms, the loop thread is running:\n%s", stalled * 1000, stack)
+
+    def stats(self) -> dict[str, int | float]:
+        stats: dict[str, int | float] = {
+            "lag_ms": self.lag_ms,
+            "max_lag_ms": self.max_lag * 1000,
+            "samples": self.samples,
+            "blocked": self.blocked,
+        }
+        for bound, count in zip(LAG_BUCKETS_MS, self.histogram, strict=False):
+            stats[f"lag_le_{bound}ms"] = count
+        stats[f"lag_gt_{LAG_BUCKETS_MS[-1]}ms"] = self.histogram[-1]
+        return stats
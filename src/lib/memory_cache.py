@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+
+__all__ = ("MemoryCache",)
+
+
+class MemoryCache:
+    """In-process LRU cache of encoded values with hit/miss accounting."""
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl: float | None = None,
+    ) -> None:
+        self._max_entries = max_entries
+        self._ttl = ttl
+        self._entries: OrderedDict[str, tuple[bytes, float]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def get(self, key: str) -> bytes | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        value, expires_at = entry
+        if expires_at and expires_at <= time.monotonic():
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: bytes, ttl: float | None = None) -> None:
+        ttl = self._ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl else 0.0
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+    def hottest(self, limit: int) -> list[tuple[str, bytes, float | None]]:
+        """Return up to ``limit`` live entries, most recently used first, with their remaining ttl."""
+        now = time.monotonic()
+        entries: list[tuple[str, bytes, float | None]] = []
+        for key, (value, expires_at) in reversed(self._entries.items()):
+            if len(entries) >= limit:
+                break
+            if not expires_at:
+                entries.append((key, value, None))
+            elif expires_at > now:
+                entries.append((key, value, expires_at - now))
+        return entries
+
+    def invalidate(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> dict[str, int | float]:
+        return {
+            "entries": len(self._entries),
+            "size_bytes": sum(len(value) for value, _ in self._entries.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hit_rate, 4),
+        }
@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import random
+import sys
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from typing import (
+    TYPE_CHECKING,
+    Any,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+__all__ = (
+    "GROUP_BY",
+    "MemoryTracer",
+)
+
+GROUP_BY = ("lineno", "filename", "traceback")
+
+IGNORED_FILES = (
+    tracemalloc.__file__,
+    "<frozen importlib._bootstrap>",
+    "<frozen importlib._bootstrap_external>",
+    "<unknown>",
+)
+
+
+class MemoryTracer:
+    """Traces allocations with :mod:`tracemalloc` and reports the largest allocation sites.
+
+    Sites are reported either for the current heap or as the difference with a baseline snapshot,
+    taken on :meth:`start` and moved forward with ``reset``, which shows what the caches retained
+    in between. Each frame kept per allocation (``frames``) adds to the tracing overhead, one is
+    enough to group by line, a few are needed to see through the storage and coder layers.
+
+    A ``sample_rate`` share of the requests also records the net number of memory blocks and
+    bytes they left allocated. Only one sampled request is measured at a time, but the figures still
+    include whatever other requests allocated meanwhile, so they are best read as averages.
+    """
+
+    def __init__(self, frames: int = 1, sample_rate: float = 0.01) -> None:
+        self._frames = frames
+        self._sample_rate = sample_rate
+        self._started_tracing = False
+        self._baseline: tracemalloc.Snapshot | None = None
+        self._lock = threading.Lock()
+        self._measuring = False
+        self.snapshots = 0
+        self.sampled_requests = 0
+        self.net_blocks = 0
+        self.retained_bytes = 0
+        self.max_retained_bytes = 0
+
+    def start(self) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self._frames)
+            self._started_tracing = True
+        self._baseline = self.snapshot()
+
+    def stop(self) -> None:
+        self._baseline = None
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def snapshot(self) -> tracemalloc.Snapshot:
+        self.snapshots += 1
+        return tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(inclusive=False, filename_pattern=filename) for filename in IGNORED_FILES],
+        )
+
+    def report(
+        self,
+        *,
+        group_by: str = "lineno",
+        limit: int = 20,
+        diff: bool = False,
+        reset: bool = False,
+    ) -> dict[str, Any]:
+        """Return the traced memory and the ``limit`` largest allocation sites grouped by ``group_by``.
+
+        With ``diff``, sites are sorted by their growth since the baseline snapshot, which ``reset``
+        replaces with the snapshot just taken.
+        """
+        if group_by not in GROUP_BY:
+            msg = f"group_by must be one of {', '.join(GROUP_BY)}"
+            raise ValueError(msg)
+        if not tracemalloc.is_tracing():
+            msg = "tracemalloc is not tracing"
+            raise RuntimeError(msg)
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot = self.snapshot()
+        with self._lock:
+            baseline = self._baseline
+            if reset:
+                self._baseline = snapshot
+        if diff and baseline is not None:
+            sites = [
+                {
+                    "site": self.site(traceback=stat.traceback, group_by=group_by),
+                    "size": stat.size,
+                    "count": stat.count,
+                    "size_diff": stat.size_diff,
+                    "count_diff": stat.count_diff,
+                }
+                for stat in snapshot.compare_to(baseline, key_type=group_by)[:limit]
+            ]
+        else:
+            sites = [
+                {
+                    "site": self.site(traceback=stat.traceback, group_by=group_by),
+                    "size": stat.size,
+                    "count": stat.count,
+                }
+                for stat in snapshot.statistics(key_type=group_by)[:limit]
+            ]
+        return {
+            "traced_bytes": current,
+            "peak_bytes": peak,
+            "tracemalloc_bytes": tracemalloc.get_tracemalloc_memory(),
+            "group_by": group_by,
+            "diff": diff and baseline is not None,
+            "sites": sites,
+        }
+
+    @staticmethod
+    def site(traceback: tracemalloc.Traceback, group_by: str) -> str:
+        if group_by == "filename":
+            return traceback[0].filename
+        return ";".join(f"{frame.filename}:{frame.lineno}" for frame in reversed(traceback))
+
+    @contextmanager
+    def measure(self) -> Iterator[None]:
+        """Record the allocations of the enclosed request, if sampled and no other one is measured."""
+        if self._measuring or not tracemalloc.is_tracing() or random.random() >= self._sample_rate:  # noqa: S311
+            yield
+            return
+        self._measuring = True
+        blocks = sys.getallocatedblocks()
+        traced, _ = tracemalloc.get_traced_memory()
+        try:
+            yield
+        finally:
+            self._measuring = False
+            retained = tracemalloc.get_traced_memory()[0] - traced
+            self.sampled_requests += 1
+            self.net_blocks += sys.getallocatedblocks() - blocks
+            self.retained_bytes += retained
+            self.max_retained_bytes = max(self.max_retained_bytes, retained)
+
+    def stats(self) -> dict[str, int | float]:
+        current, peak = tracemalloc.get_traced_memory()
+        sampled = self.sampled_requests
+        return {
+            "traced_bytes": current,
+            "peak_bytes": peak,
+            "snapshots": self.snapshots,
+            "sampled_requests": sampled,
+            "avg_net_blocks": round(self.net_blocks / sampled, 1) if sampled else 0,
+            "avg_retained_bytes": round(self.retained_bytes / sampled, 1) if sampled else 0,
+            "max_retained_bytes": self.max_retained_bytes,
+        }
@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+from collections.abc import (
+    Callable,
+    Mapping,
+)
+
+__all__ = (
+    "MetricsRegistry",
+    "StatsProvider",
+)
+
+StatsProvider = Callable[[], Mapping[str, int | float]]
+
+
+class MetricsRegistry:
+    """Collects the ``stats()`` of the components registered by the application."""
+
+    def __init__(self) -> None:
+        self._providers: dict[str, StatsProvider] = {}
+
+    def register(self, name: str, provider: StatsProvider) -> None:
+        self._providers[name] = provider
+
+    def collect(self) -> dict[str, Mapping[str, int | float]]:
+        return {name: provider() for name, provider in self._providers.items()}
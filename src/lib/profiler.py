@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import asyncio
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from types import (
+        CodeType,
+        FrameType,
+    )
+
+__all__ = ("SlowRequestProfiler",)
+
+MAX_STACK_DEPTH = 128
+
+
+class SlowRequestProfiler:
+    """Samples the event loop stack during requests and keeps the samples of the slow ones.
+
+    While at least one request is profiled, a daemon thread reads the loop thread's current frame
+    every ``interval`` seconds and attributes the stack to the task the loop is running at that
+    moment. When a request takes ``threshold`` seconds or longer, its samples are folded into
+    collapsed stacks (``outer;inner count`` lines, as read by flamegraph tools), otherwise they are
+    dropped. With nothing in flight the sampler thread sleeps on an event.
+    """
+
+    def __init__(self, threshold: float, interval: float = 0.005, max_stacks: int = 10_000) -> None:
+        self._threshold = threshold
+        self._interval = interval
+        self._max_stacks = max_stacks
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread_id: int | None = None
+        self._thread: threading.Thread | None = None
+        self._active = threading.Event()
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+        self._tasks: dict[asyncio.Task[object], Counter[str]] = {}
+        self._stacks: Counter[str] = Counter()
+        self._labels: dict[CodeType, str] = {}
+        self.profiled_requests = 0
+        self.slow_requests = 0
+        self.samples = 0
+        self.dropped_samples = 0
+
+    def start(self) -> None:
+        """Start sampling the running event loop, must be called from the loop thread."""
+        if self._thread is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="slow-request-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stopped.set()
+        self._active.set()
+        self._thread.join()
+        self._thread = None
+
+    @contextmanager
+    def profile(self) -> Iterator[None]:
+        task = asyncio.current_task()
+        if task is None or self._thread is None:
+            yield
+            return
+        samples: Counter[str] = Counter()
+        with self._lock:
+            self._tasks[task] = samples
+            self._active.set()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                del self._tasks[task]
+                if not self._tasks:
+                    self._active.clear()
+                self.profiled_requests += 1
+                if time.perf_counter() - started >= self._threshold:
+                    self.slow_requests += 1
+                    self._merge(samples=samples)
+
+    def _merge(self, samples: Counter[str]) -> None:
+        for stack, count in samples.items():
+            if stack in self._stacks or len(self._stacks) < self._max_stacks:
+                self._stacks[stack] += count
+            else:
+                self.dropped_samples += count
+
+    def label(self, code: CodeType) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = f"{code.co_qualname} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+            self._labels[code] = label
+        return label
+
+    def fold(self, frame: FrameType | None) -> str:
+        labels: list[str] = []
+        while frame is not None and len(labels) < MAX_STACK_DEPTH:
+            labels.append(self.label(code=frame.f_code))
+            frame = frame.f_back
+        return ";".join(reversed(labels))
+
+    def sample(self) -> None:
+        if self._loop_thread_id is None or self._loop is None:
+            return
+        frame = sys._current_frames().get(self._loop_thread_id)  # noqa: SLF001
+        task = asyncio.current_task(self._loop)
+        with self._lock:
+            samples = self._tasks.get(task) if task is not None else None
+            if samples is not None:
+                samples[self.fold(frame=frame)] += 1
+                self.samples += 1
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            self._active.wait()
+            while self._active.is_set() and not self._stopped.is_set():
+                self.sample()
+                time.sleep(self._interval)
+
+    def collapsed(self, *, reset: bool = False) -> str:
+        with self._lock:
+            lines = [f"{stack} {count}" for stack, count in self._stacks.most_common()]
+            if reset:
+                self._stacks.clear()
+        return "\n".join(lines) + "\n" if lines else ""
+
+    def stats(self) -> dict[str, int | float]:
+        return {
+            "profiled_requests": self.profiled_requests,
+            "slow_requests": self.slow_requests,
+            "samples": self.samples,
+            "dropped_samples": self.dropped_samples,
+            "stacks": len(self._stacks),
+        }
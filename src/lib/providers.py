@@ -0,0 +1,260 @@
+from __future__ import annotations
+
+import asyncio
+from abc import (
+    ABC,
+    abstractmethod,
+)
+from functools import lru_cache
+from typing import (
+    TYPE_CHECKING,
+    cast,
+)
+
+from aiohttp import (
+    ClientError,
+    ClientSession,
+    ClientTimeout,
+    web,
+)
+
+from src.config import get_settings
+from src.lib.coders import (
+    decoder,
+    json_decoder_decimal,
+)
+from src.lib.limiter import AdaptiveLimiter
+
+if TYPE_CHECKING:
+    import datetime
+    from collections.abc import (
+        Awaitable,
+        Callable,
+        Sequence,
+    )
+    from decimal import Decimal
+    from pathlib import Path
+
+    from src.lib.types import (
+        ResponseCurrency,
+        ResponseType,
+    )
+
+__all__ = (
+    "DatasetProvider",
+    "JsDelivrProvider",
+    "RacingProvider",
+    "RateProvider",
+    "UpstreamStatusError",
+    "get_provider",
+    "get_upstream_limiter",
+)
+
+settings = get_settings()
+SUCCESS_STATUS_CODE = 200
+NOT_FOUND_STATUS_CODE = 404
+NOT_FOUND_MESSAGE = "No results were found for your request"
+
+
+class UpstreamStatusError(web.HTTPBadGateway):
+    """Upstream answered with a status other than ``200`` or ``404``.
+
+    Unlike ``HTTPNotFound``, it says nothing about the dates upstream publishes: the request may
+    succeed later, and meanwhile the earlier cached rates can be served.
+    """
+
+    def __init__(self, status: int) -> None:
+        super().__init__(reason=f"Exchange rates provider answered with status {status}")
+        self.upstream_status = status
+
+
+class RateProvider(ABC):
+    """Source of the daily rates of a currency."""
+
+    name: str
+
+    @abstractmethod
+    async def fetch(self, currency: str, for_date: datetime.date) -> ResponseType:
+        """Return the rates of ``currency`` published for ``for_date``, raise ``HTTPNotFound`` if there are none."""
+
+    @abstractmethod
+    async def currencies(self) -> dict[str, str]:
+        """Return the names of the known currencies by code."""
+
+    @staticmethod
+    def to_response(currency: str, response_data: ResponseCurrency) -> ResponseType:
+        return {
+            "date": cast("str", response_data["date"]),
+            "values": cast("dict[str, int | Decimal]", response_data[currency]),
+        }
+
+
+class JsDelivrProvider(RateProvider):
+    """Rates of the ``@fawazahmed0/currency-api`` package served by jsDelivr."""
+
+    name = "jsdelivr"
+
+    def __init__(self, url_template: str | None = None, limiter: AdaptiveLimiter | None = None) -> None:
+        self._url_template = url_template
+        self._limiter = limiter
+
+    @classmethod
+    async def request_currency_info(cls, url: str) -> ResponseCurrency:
+        async with ClientSession(timeout=ClientTimeout(total=settings.api.UPSTREAM_TIMEOUT)) as session:
+            async with session.get(url) as response:
+                if response.status == SUCCESS_STATUS_CODE:
+                    result: ResponseCurrency = await response.json(
+                        loads=json_decoder_decimal.decode,
+                    )
+                    return result
+                if response.status == NOT_FOUND_STATUS_CODE:
+                    raise web.HTTPNotFound(
+                        reason=NOT_FOUND_MESSAGE,
+                    )
+                raise UpstreamStatusError(status=response.status)
+
+    async def fetch(self, currency: str, for_date: datetime.date) -> ResponseType:
+        url_template = self._url_template or settings.api.CURRENCY_API_WITH_DATE_URL
+        url = url_template.format(
+            date=for_date.isoformat(),
+            currency=currency,
+        )
+        if self._limiter is None:
+            response_data = await self.request_currency_info(url=url)
+        else:
+            async with self._limiter.slot():
+                response_data = await self.request_currency_info(url=url)
+        return self.to_response(currency=currency, response_data=response_data)
+
+    async def currencies(self) -> dict[str, str]:
+        async with ClientSession(timeout=ClientTimeout(total=settings.api.UPSTREAM_TIMEOUT)) as session:
+            async with session.get(settings.api.CURRENCIES_API_LIST_URL) as response:
+                result: dict[str, str] = await response.json()
+                return result
+
+
+class DatasetProvider(RateProvider):
+    """Rates read from a local dump laid out as ``{root}/{date}/{currency}.json``.
+
+    Each file holds the document upstream serves for that date and currency, and
+    ``{root}/currencies.json`` the list of currencies, so a dump is made by mirroring the upstream
+    files, and no network is needed to serve or backfill the dumped dates.
+    """
+
+    name = "dataset"
+
+    def __init__(self, root: Path) -> None:
+        self._root = root
+
+    def path(self, currency: str, for_date: datetime.date) -> Path:
+        return self._root / for_date.isoformat() / f"{currency}.json"
+
+    @property
+    def currencies_path(self) -> Path:
+        return self._root / "currencies.json"
+
+    def _read(self, path: Path) -> bytes | None:
+        try:
+            return path.read_bytes()
+        except FileNotFoundError:
+            return None
+
+    async def fetch(self, currency: str, for_date: datetime.date) -> ResponseType:
+        document = await asyncio.to_thread(self._read, self.path(currency=currency, for_date=for_date))
+        if document is None:
+            raise web.HTTPNotFound(
+                reason=NOT_FOUND_MESSAGE,
+            )
+        response_data: ResponseCurrency = json_decoder_decimal.decode(document)
+        return self.to_response(currency=currency, response_data=response_data)
+
+    async def currencies(self) -> dict[str, str]:
+        document = await asyncio.to_thread(self._read, self.currencies_path)
+        if document is None:
+            message = f"The rates dataset has no currency list at {self.currencies_path}"
+            raise FileNotFoundError(message)
+        result: dict[str, str] = decoder.decode(document)
+        return result
+
+
+class RacingProvider(RateProvider):
+    """Asks every provider at once and returns the first rates found, cancelling the other requests.
+
+    When no provider has the rates, a failure other than ``HTTPNotFound`` is raised in priority,
+    since the rates may exist at a provider that is down.
+    """
+
+    name = "race"
+
+    def __init__(self, providers: Sequence[RateProvider]) -> None:
+        self._providers = providers
+        self.wins: dict[str, int] = {provider.name: 0 for provider in providers}
+
+    async def _race[T](self, call: Callable[[RateProvider], Awaitable[T]]) -> tuple[str, T]:
+        """Return the name of the first provider whose ``call`` succeeded and its result."""
+
+        async def run(provider: RateProvider) -> T:
+            return await call(provider)
+
+        pending = {asyncio.create_task(run(provider)): provider.name for provider in self._providers}
+        errors: list[BaseException] = []
+        try:
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    name = pending.pop(task)
+                    error = task.exception()
+                    if error is None:
+                        return name, task.result()
+                    errors.append(error)
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        raise next((error for error in errors if not isinstance(error, web.HTTPNotFound)), errors[0])
+
+    async def fetch(self, currency: str, for_date: datetime.date) -> ResponseType:
+        name, result = await self._race(lambda provider: provider.fetch(currency=currency, for_date=for_date))
+        self.wins[name] += 1
+        return result
+
+    async def currencies(self) -> dict[str, str]:
+        _, result = await self._race(lambda provider: provider.currencies())
+        return result
+
+    def stats(self) -> dict[str, int | float]:
+        return {f"{name}_wins": wins for name, wins in self.wins.items()}
+
+
+def create_provider(name: str) -> RateProvider:
+    if name == JsDelivrProvider.name:
+        return JsDelivrProvider(limiter=get_upstream_limiter())
+    if name == DatasetProvider.name:
+        if settings.api.RATES_DATASET_DIR is None:
+            message = "RATES_DATASET_DIR must be set to use the dataset rate provider"
+            raise ValueError(message)
+        return DatasetProvider(root=settings.api.RATES_DATASET_DIR)
+    message = f"Unknown rate provider {name!r}"
+    raise ValueError(message)
+
+
+@lru_cache(maxsize=1)
+def get_upstream_limiter() -> AdaptiveLimiter | None:
+    if not settings.api.UPSTREAM_LIMIT_ENABLED:
+        return None
+    return AdaptiveLimiter(
+        initial=settings.api.UPSTREAM_LIMIT_INITIAL,
+        max_limit=settings.api.UPSTREAM_LIMIT_MAX,
+        latency_target=settings.api.UPSTREAM_LATENCY_TARGET,
+        queue_timeout=settings.api.UPSTREAM_QUEUE_TIMEOUT,
+        failures=(ClientError, TimeoutError, UpstreamStatusError),
+    )
+
+
+@lru_cache(maxsize=1)
+def get_provider() -> RateProvider:
+    """Build the providers listed in ``RATE_PROVIDERS``, racing each other when there are several."""
+    providers = [create_provider(name=name) for name in settings.api.RATE_PROVIDERS]
+    if len(providers) == 1:
+        return providers[0]
+    return RacingProvider(providers=providers)
@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING
+
+from aiohttp import web
+
+if TYPE_CHECKING:
+    from collections.abc import (
+        AsyncIterator,
+        Awaitable,
+        Callable,
+    )
+
+__all__ = (
+    "RateBroadcaster",
+    "encode_event",
+)
+
+log = logging.getLogger(__name__)
+
+CLOSED = b""
+
+
+def encode_event(data: bytes, event: str = "rates") -> bytes:
+    """Encode a single-line document as a Server-Sent Events frame."""
+    return b"event: " + event.encode() + b"\ndata: " + data + b"\n\n"
+
+
+class RateBroadcaster:
+    """Fans out changes of the cached rates to Server-Sent Events subscribers.
+
+    There is one poller per base currency with at least one subscriber, however many clients
+    subscribe. It checks the rates every ``interval`` seconds and, when the document changed,
+    encodes the event frame once and hands the same bytes to every subscriber queue. A subscriber
+    that does not keep up only loses the intermediate frames, the latest one is always delivered.
+    """
+
+    def __init__(
+        self,
+        poll: Callable[[str], Awaitable[bytes]],
+        interval: float = 5.0,
+        max_queue_size: int = 4,
+    ) -> None:
+        self._poll = poll
+        self._interval = interval
+        self._max_queue_size = max_queue_size
+        self._subscribers: dict[str, set[asyncio.Queue[bytes]]] = {}
+        self._pollers: dict[str, asyncio.Task[None]] = {}
+        self._latest: dict[str, bytes] = {}
+        self.polls = 0
+        self.frames_sent = 0
+        self.frames_dropped = 0
+
+    @asynccontextmanager
+    async def subscribe(self, currency: str) -> AsyncIterator[asyncio.Queue[bytes]]:
+        queue: asyncio.Queue[bytes] = asyncio.Queue(maxsize=self._max_queue_size)
+        latest = self._latest.get(currency)
+        if latest is not None:
+            queue.put_nowait(latest)
+        self._subscribers.setdefault(currency, set()).add(queue)
+        if currency not in self._pollers:
+            started = asyncio.create_task(self._run_poller(currency=currency))
+            started.add_done_callback(lambda task: self._forget_poller(currency=currency, task=task))
+            self._pollers[currency] = started
+        try:
+            yield queue
+        finally:
+            subscribers = self._subscribers.get(currency, set())
+            subscribers.discard(queue)
+            if not subscribers:
+                self._subscribers.pop(currency, None)
+                self._latest.pop(currency, None)
+                poller = self._pollers.pop(currency, None)
+                if poller is not None:
+                    poller.cancel()
+
+    def publish(self, currency: str, frame: bytes) -> None:
+        self._latest[currency] = frame
+        for queue in self._subscribers.get(currency, ()):
+            if queue.full():
+                queue.get_nowait()
+                self.frames_dropped += 1
+            queue.put_nowait(frame)
+            self.frames_sent += 1
+
+    async def poll_once(self, currency: str, previous: bytes | None) -> bytes | None:
+        self.polls += 1
+        try:
+            data = await self._poll(currency)
+        except (web.HTTPException, OSError, TimeoutError) as exc:
+            log.warning("Polling %s rates failed: %r", currency, exc)
+            return previous
+        except Exception:
+            log.exception("Polling %s rates failed", currency)
+            return previous
+        if data != previous:
+            self.publish(currency=currency, frame=encode_event(data=data))
+        return data
+
+    async def _run_poller(self, currency: str) -> None:
+        previous: bytes | None = None
+        while True:
+            previous = await self.poll_once(currency=currency, previous=previous)
+            await asyncio.sleep(self._interval)
+
+    def _forget_poller(self, currency: str, task: asyncio.Task[None]) -> None:
+        """Drop a poller that stopped on its own, so that the next subscriber starts a new one."""
+        if self._pollers.get(currency) is task:
+            del self._pollers[currency]
+        if not task.cancelled() and task.exception() is not None:
+            log.error("Poller of %s rates stopped", currency, exc_info=task.exception())
+
+    async def close(self) -> None:
+        for currency in list(self._subscribers):
+            self.publish(currency=currency, frame=CLOSED)
+        pollers = list(self._pollers.values())
+        self._pollers.clear()
+        for poller in pollers:
+            poller.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await poller
+
+    def stats(self) -> dict[str, int | float]:
+        return {
+            "currencies": len(self._pollers),
+            "subscribers": sum(len(queues) for queues in self._subscribers.values()),
+            "polls": self.polls,
+            "frames_sent": self.frames_sent,
+            "frames_dropped": self.frames_dropped,
+        }
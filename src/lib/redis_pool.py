@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import (
+    TYPE_CHECKING,
+    Any,
+)
+
+from redis.asyncio import BlockingConnectionPool
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+if TYPE_CHECKING:
+    from redis.asyncio.connection import AbstractConnection
+
+__all__ = ("InstrumentedConnectionPool",)
+
+SLOW_ACQUIRE_SECONDS = 0.001
+
+
+class InstrumentedConnectionPool(BlockingConnectionPool):
+    """Blocking connection pool that records usage and acquire wait times.
+
+    Callers block up to ``timeout`` seconds for a free connection once ``max_connections`` are in use,
+    instead of opening more connections or failing right away. Only the wait for a free connection is
+    timed and counted as a timeout, connecting it to Redis is not, and its failures are counted apart.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:  # noqa: ANN401
+        super().__init__(*args, **kwargs)
+        self.acquired = 0
+        self.waiting = 0
+        self.slow_acquires = 0
+        self.timeouts = 0
+        self.connect_errors = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    async def get_connection(
+        self,
+        command_name: str | None = None,  # noqa: ARG002
+        *keys: Any,  # noqa: ARG002, ANN401
+        **options: Any,  # noqa: ARG002, ANN401
+    ) -> AbstractConnection:
+        connection = await self._wait_for_connection()
+        try:
+            await self.ensure_connection(connection)
+        except BaseException as exc:
+            if isinstance(exc, Exception):
+                self.connect_errors += 1
+            await self.release(connection)
+            raise
+        return connection
+
+    async def _wait_for_connection(self) -> AbstractConnection:
+        started = time.perf_counter()
+        self.waiting += 1
+        try:
+            async with self._condition, asyncio.timeout(self.timeout):
+                await self._condition.wait_for(self.can_get_connection)
+                connection: AbstractConnection = self.get_available_connection()  # type: ignore[no-untyped-call]
+        except TimeoutError as exc:
+            self.timeouts += 1
+            message = "No connection available."
+            raise RedisConnectionError(message) from exc
+        finally:
+            self.waiting -= 1
+        waited = time.perf_counter() - started
+        self.acquired += 1
+        self.wait_seconds_total += waited
+        self.wait_seconds_max = max(self.wait_seconds_max, waited)
+        if waited > SLOW_ACQUIRE_SECONDS:
+            self.slow_acquires += 1
+        return connection
+
+    def stats(self) -> dict[str, int | float]:
+        in_use = len(self._in_use_connections)
+        return {
+            "max_connections": self.max_connections,
+            "created": in_use + len(self._available_connections),
+            "in_use": in_use,
+            "waiting": self.waiting,
+            "acquired": self.acquired,
+            "slow_acquires": self.slow_acquires,
+            "timeouts": self.timeouts,
+            "connect_errors": self.connect_errors,
+            "wait_ms_avg": round(self.wait_seconds_total / self.acquired * 1000, 3) if self.acquired else 0.0,
+            "wait_ms_max": round(self.wait_seconds_max * 1000, 3),
+        }
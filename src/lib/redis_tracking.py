@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+from typing import (
+    TYPE_CHECKING,
+    Any,
+)
+
+from redis.asyncio import ConnectionPool
+from redis.exceptions import RedisError
+
+from src.lib.memory_cache import MemoryCache
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from redis.asyncio.connection import AbstractConnection
+
+__all__ = ("ClientSideCache",)
+
+log = logging.getLogger(__name__)
+
+RECONNECT_DELAY_SECONDS = 1.0
+MAX_REMEMBERED_INVALIDATIONS = 65_536
+
+
+class ClientSideCache:
+    """Process-local copy of hot Redis keys kept coherent by server-assisted invalidation.
+
+    A dedicated RESP3 connection enables ``CLIENT TRACKING`` in broadcasting mode, Redis then pushes
+    an ``invalidate`` message whenever a tracked key is modified, expires or is evicted, and the local
+    copy of that key is dropped. While the tracking connection is down the local copy is flushed and
+    bypassed, since invalidations could have been missed. It is flushed again when tracking turns on,
+    as Redis only invalidates the keys read once tracking is on.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        max_entries: int = 1024,
+        ttl: float | None = None,
+        prefixes: Iterable[str] = (),
+    ) -> None:
+        self._url = url
+        self._prefixes = tuple(prefixes)
+        self._local = MemoryCache(max_entries=max_entries, ttl=ttl)
+        self._pool: ConnectionPool | None = None
+        self._task: asyncio.Task[None] | None = None
+        self._tracking = False
+        self._generation = 0
+        self._flushed_at = 0
+        self._invalidated_at: dict[str, int] = {}
+        self.invalidations = 0
+        self.reconnects = 0
+
+    @property
+    def is_tracking(self) -> bool:
+        return self._tracking
+
+    @property
+    def local(self) -> MemoryCache:
+        return self._local
+
+    def begin_read(self) -> int:
+        """Return a token to pass to :meth:`store` after the value was read from Redis."""
+        return self._generation
+
+    def get(self, key: str) -> bytes | None:
+        if not self.is_tracking:
+            return None
+        return self._local.get(key)
+
+    def store(self, key: str, value: bytes, token: int) -> None:
+        """Keep a value read from Redis unless it was invalidated while the read was in flight."""
+        if not self.is_tracking or self._flushed_at > token or self._invalidated_at.get(key, -1) > token:
+            return
+        self._local.set(key, value)
+
+    def invalidate(self, keys: Iterable[str] | None) -> None:
+        self._generation += 1
+        if keys is None:
+            self.flush()
+            return
+        for key in keys:
+            self._local.invalidate(key)
+            self._invalidated_at[key] = self._generation
+            self.invalidations += 1
+        if len(self._invalidated_at) > MAX_REMEMBERED_INVALIDATIONS:
+            self.flush()
+
+    def flush(self) -> None:
+        self._generation += 1
+        self._flushed_at = self._generation
+        self._invalidated_at.clear()
+        self._local.clear()
+
+    async def handle_push_message(self, response: list[Any]) -> None:
+        _kind, keys = response
+        if keys is None:
+            self.invalidate(None)
+        else:
+            self.invalidate(key.decode() if isinstance(key, bytes) else key for key in keys)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        if self._pool is not None:
+            await self._pool.disconnect()
+            self._pool = None
+
+    async def _connect(self) -> AbstractConnection:
+        if self._pool is None:
+            self._pool = ConnectionPool.from_url(url=self._url, protocol=3, max_connections=1)
+        connection: AbstractConnection = await self._pool.get_connection()  # type: ignore[no-untyped-call]
+        try:
+            await self._enable_tracking(connection=connection)
+        except BaseException:
+            await self._release(connection=connection)
+            raise
+        return connection
+
+    async def _enable_tracking(self, connection: AbstractConnection) -> None:
+        connection._parser.set_invalidation_push_handler(self.handle_push_message)  # type: ignore[attr-defined]  # noqa: SLF001
+        prefixes = [arg for prefix in self._prefixes for arg in ("PREFIX", prefix)]
+        await connection.send_command("CLIENT", "TRACKING", "ON", "BCAST", *prefixes)
+        response = await connection.read_response()
+        if isinstance(response, RedisError):
+            raise response
+
+    async def _release(self, connection: AbstractConnection) -> None:
+        """Close the tracking connection and give its slot back, so that the next attempt can connect."""
+        try:
+            await connection.disconnect()
+        finally:
+            if self._pool is not None:
+                await self._pool.release(connection)
+
+    async def _listen(self, connection: AbstractConnection) -> None:
+        self.flush()
+        self._tracking = True
+        log.info("Redis client-side cache tracking is on")
+        while True:
+            await connection.read_response(push_request=True)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                connection = await self._connect()
+                try:
+                    await self._listen(connection=connection)
+                finally:
+                    await self._release(connection=connection)
+            except (RedisError, OSError) as exc:
+                log.warning("Redis client-side cache tracking is off: %s", exc)
+            except Exception:
+                log.exception("Redis client-side cache tracking failed")
+            finally:
+                self._tracking = False
+                self.flush()
+            self.reconnects += 1
+            await asyncio.sleep(RECONNECT_DELAY_SECONDS)
+
+    def stats(self) -> dict[str, int | float]:
+        return {
+            **self._local.stats(),
+            "tracking": int(self.is_tracking),
+            "invalidations": self.invalidations,
+            "reconnects": self.reconnects,
+        }
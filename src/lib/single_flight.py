@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import functools
+import time
+import uuid
+from typing import TYPE_CHECKING
+
+from redis.exceptions import WatchError
+
+if TYPE_CHECKING:
+    from collections.abc import (
+        Awaitable,
+        Callable,
+    )
+
+    from redis.asyncio import Redis
+
+__all__ = ("SingleFlight",)
+
+MAX_POLL_INTERVAL = 0.5
+
+
+class SingleFlight:
+    """Makes concurrent misses of a key share one upstream fetch.
+
+    Within the process, the first miss fetches and the others await its result. With a Redis
+    client, the instances of a cluster coordinate too: the fetching instance holds a lease,
+    ``SET {prefix}{key} NX PX lease``, while the others poll the cache until the rates show up. The
+    lease is released as soon as the fetch fails, and otherwise kept until it expires, so that it
+    still covers the cache write when it lands later, e.g. with write-behind. A waiter that finds
+    neither the rates nor a lease, because the holder failed or crashed, takes the lease over, and
+    one that waits longer than ``wait_timeout`` seconds fetches on its own.
+    """
+
+    def __init__(
+        self,
+        redis_client: Redis | None = None,
+        *,
+        lease: float = 3.0,
+        poll_interval: float = 0.05,
+        wait_timeout: float = 10.0,
+        prefix: str = "lease:",
+    ) -> None:
+        self._redis_client = redis_client
+        self._lease_ms = int(lease * 1000)
+        self._poll_interval = poll_interval
+        self._wait_timeout = wait_timeout
+        self._prefix = prefix
+        self._flights: dict[str, asyncio.Task[bytes]] = {}
+        self.fetches = 0
+        self.local_shared = 0
+        self.remote_shared = 0
+        self.takeovers = 0
+        self.timeouts = 0
+
+    @property
+    def saved(self) -> int:
+        """Upstream fetches avoided, in this process and in the others."""
+        return self.local_shared + self.remote_shared
+
+    async def do(
+        self,
+        key: str,
+        fetch: Callable[[], Awaitable[bytes]],
+        read: Callable[[], Awaitable[bytes | None]],
+    ) -> bytes:
+        """Return the value of ``key``, fetched once for all concurrent callers.
+
+        ``read`` looks the key up in the shared cache, which ``fetch`` fills.
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            # The fetch runs in its own task so that a cancelled caller does not fail the others
+            flight = asyncio.create_task(self._fetch_once(key=key, fetch=fetch, read=read))
+            self._flights[key] = flight
+            flight.add_done_callback(functools.partial(self._land, key))
+        else:
+            self.local_shared += 1
+        return await asyncio.shield(flight)
+
+    def _land(self, key: str, flight: asyncio.Task[bytes]) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        if not flight.cancelled():
+            # Retrieved here in case every caller was cancelled
+            flight.exception()
+
+    async def _fetch_once(
+        self,
+        key: str,
+        fetch: Callable[[], Awaitable[bytes]],
+        read: Callable[[], Awaitable[bytes | None]],
+    ) -> bytes:
+        if self._redis_client is None:
+            return await self._fetch(fetch=fetch)
+
+        lease_key = f"{self._prefix}{key}"
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + self._wait_timeout
+        takeover = False
+        while True:
+            if await self._redis_client.set(lease_key, token, nx=True, px=self._lease_ms):
+                self.takeovers += takeover
+                return await self._fetch_with_lease(fetch=fetch, lease_key=lease_key, token=token)
+            value = await self._wait(lease_key=lease_key, read=read, deadline=deadline)
+            if value is not None:
+                self.remote_shared += 1
+                return value
+            if time.monotonic() >= deadline:
+                self.timeouts += 1
+                return await self._fetch(fetch=fetch)
+            takeover = True
+
+    async def _fetch(self, fetch: Callable[[], Awaitable[bytes]]) -> bytes:
+        self.fetches += 1
+        return await fetch()
+
+    async def _fetch_with_lease(self, fetch: Callable[[], Awaitable[bytes]], lease_key: str, token: str) -> bytes:
+        try:
+            return await self._fetch(fetch=fetch)
+        except BaseException:
+            await self._release(lease_key=lease_key, token=token)
+            raise
+
+    async def _wait(
+        self,
+        lease_key: str,
+        read: Callable[[], Awaitable[bytes | None]],
+        deadline: float,
+    ) -> bytes | None:
+        """Poll the cache until the value shows up, the lease is gone or the deadline passes."""
+        if self._redis_client is None:
+            return None
+        interval = self._poll_interval
+        while time.monotonic() < deadline:
+            await asyncio.sleep(interval)
+            value = await read()
+            if value is not None:
+                return value
+            if not await self._redis_client.exists(lease_key):
+                return await read()
+            interval = min(interval * 2, MAX_POLL_INTERVAL)
+        return None
+
+    async def _release(self, lease_key: str, token: str) -> None:
+        """Delete the lease unless it expired and was taken by another instance meanwhile."""
+        if self._redis_client is None:
+            return
+        with contextlib.suppress(WatchError):
+            async with self._redis_client.pipeline(transaction=True) as pipe:
+                await pipe.watch(lease_key)
+                holder = await pipe.get(lease_key)
+                if holder is not None and holder.decode() == token:
+                    pipe.multi()  # type: ignore[no-untyped-call]
+                    pipe.delete(lease_key)
+                    await pipe.execute()
+
+    def stats(self) -> dict[str, int | float]:
+        return {
+            "in_flight": len(self._flights),
+            "fetches": self.fetches,
+            "saved": self.saved,
+            "local_shared": self.local_shared,
+            "remote_shared": self.remote_shared,
+            "takeovers": self.takeovers,
+            "timeouts": self.timeouts,
+        }
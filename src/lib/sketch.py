@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import hashlib
+from array import array
+
+__all__ = (
+    "CountMinSketch",
+    "HeavyHitters",
+)
+
+ROW_HASH_BYTES = 8
+MAX_DEPTH = hashlib.blake2b.MAX_DIGEST_SIZE // ROW_HASH_BYTES
+
+
+class CountMinSketch:
+    """Approximate frequency counts in ``width * depth`` counters.
+
+    Each row takes its index from its own 8 bytes of a BLAKE2b digest of the key, so that the rows
+    hash independently, up to ``MAX_DEPTH`` of them. Estimates never undercount; with the default
+    2048 x 4 table they overcount by at most ``total / 2048 * e`` with 98% probability, whatever the
+    number of distinct keys.
+    """
+
+    def __init__(self, width: int = 2048, depth: int = 4) -> None:
+        if not 0 < depth <= MAX_DEPTH:
+            message = f"depth must be between 1 and {MAX_DEPTH}"
+            raise ValueError(message)
+        self._width = width
+        self._depth = depth
+        self._rows = [array("Q", bytes(8 * width)) for _ in range(depth)]
+        self.total = 0
+
+    def _indexes(self, key: str) -> list[int]:
+        digest = hashlib.blake2b(key.encode(), digest_size=ROW_HASH_BYTES * self._depth).digest()
+        return [row_hash % self._width for row_hash in array("Q", digest)]
+
+    def add(self, key: str, count: int = 1) -> int:
+        """Count ``key`` and return its updated estimate."""
+        self.total += count
+        estimate = -1
+        for row, index in zip(self._rows, self._indexes(key=key), strict=True):
+            row[index] += count
+            estimate = row[index] if estimate < 0 else min(estimate, row[index])
+        return estimate
+
+    def estimate(self, key: str) -> int:
+        return min(row[index] for row, index in zip(self._rows, self._indexes(key=key), strict=True))
+
+    def clear(self) -> None:
+        for row in self._rows:
+            row[:] = array("Q", bytes(8 * self._width))
+        self.total = 0
+
+
+class HeavyHitters:
+    """The ``k`` most frequent keys of a stream, estimated with a count-min sketch.
+
+    Memory does not depend on the number of distinct keys: the sketch has a fixed size and only
+    the current top ``k`` keys are remembered. A key enters the top once its estimate exceeds the
+    smallest one in it, which then leaves.
+    """
+
+    def __init__(self, k: int = 32, width: int = 2048, depth: int = 4) -> None:
+        self._k = k
+        self._sketch = CountMinSketch(width=width, depth=depth)
+        self._top: dict[str, int] = {}
+        self._min_key: str | None = None
+
+    def add(self, key: str, count: int = 1) -> int:
+        estimate = self._sketch.add(key=key, count=count)
+        if key in self._top:
+            self._top[key] = estimate
+            if key == self._min_key:
+                self._min_key = min(self._top, key=self._top.__getitem__)
+        elif len(self._top) < self._k:
+            self._top[key] = estimate
+            if self._min_key is None or estimate < self._top[self._min_key]:
+                self._min_key = key
+        elif self._min_key is not None and estimate > self._top[self._min_key]:
+            del self._top[self._min_key]
+            self._top[key] = estimate
+            self._min_key = min(self._top, key=self._top.__getitem__)
+        return estimate
+
+    def estimate(self, key: str) -> int:
+        return self._sketch.estimate(key=key)
+
+    def top(self, limit: int | None = None) -> list[tuple[str, int]]:
+        """Return the tracked keys with their estimated counts, most frequent first."""
+        return sorted(self._top.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+    def clear(self) -> None:
+        self._sketch.clear()
+        self._top.clear()
+        self._min_key = None
+
+    def stats(self) -> dict[str, int | float]:
+        return {
+            "total": self._sketch.total,
+            "tracked": len(self._top),
+        }
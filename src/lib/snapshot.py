@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from typing import TYPE_CHECKING
+
+import msgspec
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from src.lib.currency_check_exists import CheckCurrencyExists
+    from src.lib.memory_cache import MemoryCache
+
+__all__ = (
+    "CacheSnapshot",
+    "SnapshotEntry",
+)
+
+log = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 2
+
+
+class SnapshotEntry(msgspec.Struct, array_like=True):
+    key: str
+    value: bytes
+    expires_at: float | None
+    """Wall clock time the entry expires at, ``None`` if it never does."""
+
+
+class SnapshotData(msgspec.Struct, array_like=True):
+    version: int
+    created_at: float
+    currencies: list[str]
+    currencies_expire_at: float
+    """Wall clock time after which the currencies are fetched again instead of restored."""
+    entries: list[SnapshotEntry]
+
+
+class CacheSnapshot:
+    """Compact MessagePack dump of the hottest in-process entries and the currency registry.
+
+    The registry is saved with the time it expires at, ``currencies_ttl`` seconds after it was last
+    fetched, so that a restored list is refreshed in time, however often the process restarts.
+    """
+
+    def __init__(self, path: Path, max_entries: int = 1000, currencies_ttl: float = 86400) -> None:
+        self._path = path
+        self._max_entries = max_entries
+        self._currencies_ttl = currencies_ttl
+        self._encoder = msgspec.msgpack.Encoder()
+        self._decoder = msgspec.msgpack.Decoder(SnapshotData)
+
+    def build(self, local_cache: MemoryCache | None, registry: CheckCurrencyExists) -> SnapshotData:
+        now = time.time()
+        entries = [
+            SnapshotEntry(key=key, value=value, expires_at=None if ttl is None else now + ttl)
+            for key, value, ttl in (local_cache.hottest(limit=self._max_entries) if local_cache is not None else [])
+        ]
+        return SnapshotData(
+            version=SNAPSHOT_VERSION,
+            created_at=now,
+            currencies=sorted(registry.cached_currencies),
+            currencies_expire_at=now + self._currencies_ttl if registry.expires_at is None else registry.expires_at,
+            entries=entries,
+        )
+
+    def write(self, data: SnapshotData) -> None:
+        tmp_path = self._path.with_name(f".{self._path.name}.{os.getpid()}.tmp")
+        tmp_path.write_bytes(self._encoder.encode(data))
+        tmp_path.replace(self._path)
+
+    def read(self) -> SnapshotData | None:
+        try:
+            data = self._decoder.decode(self._path.read_bytes())
+        except FileNotFoundError:
+            return None
+        except msgspec.DecodeError:
+            log.warning("Ignoring unreadable cache snapshot %s", self._path)
+            return None
+        if data.version != SNAPSHOT_VERSION:
+            return None
+        return data
+
+    async def save(self, local_cache: MemoryCache | None, registry: CheckCurrencyExists) -> None:
+        data = self.build(local_cache=local_cache, registry=registry)
+        await asyncio.to_thread(self.write, data)
+        log.info("Saved %d cache entries to snapshot %s", len(data.entries), self._path)
+
+    async def restore(self, local_cache: MemoryCache | None, registry: CheckCurrencyExists) -> int:
+        started = time.perf_counter()
+        data = await asyncio.to_thread(self.read)
+        restored = currencies = 0
+        if data is not None:
+            if registry.restore(currencies=data.currencies, expires_at=data.currencies_expire_at):
+                currencies = len(data.currencies)
+            if local_cache is not None:
+                restored = self.restore_entries(local_cache=local_cache, entries=data.entries)
+        log.info(
+            "Restored %d cache entries and %d currencies from snapshot in %.1f ms",
+            restored,
+            currencies,
+            (time.perf_counter() - started) * 1000,
+        )
+        return restored
+
+    @staticmethod
+    def restore_entries(local_cache: MemoryCache, entries: list[SnapshotEntry]) -> int:
+        now = time.time()
+        restored = 0
+        # Entries are stored hottest first, insert them coldest first to keep the LRU order.
+        for entry in reversed(entries):
+            if entry.expires_at is None:
+                local_cache.set(key=entry.key, value=entry.value)
+            elif entry.expires_at > now:
+                local_cache.set(key=entry.key, value=entry.value, ttl=entry.expires_at - now)
+            else:
+                continue
+            restored += 1
+        return restored
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import bisect
+import datetime
+import time
+
+__all__ = (
+    "DateIndex",
+    "StaleFallback",
+)
+
+
+class DateIndex:
+    """Sorted dates with a cached document, per source currency."""
+
+    def __init__(self) -> None:
+        self._dates: dict[str, list[datetime.date]] = {}
+
+    def __len__(self) -> int:
+        return sum(len(dates) for dates in self._dates.values())
+
+    def add(self, currency: str, for_date: datetime.date) -> None:
+        dates = self._dates.setdefault(currency, [])
+        index = bisect.bisect_left(dates, for_date)
+        if index == len(dates) or dates[index] != for_date:
+            dates.insert(index, for_date)
+
+    def add_key(self, key: str) -> None:
+        """Index a storage key made from the ``{for_date}-{currency}`` key templates."""
+        try:
+            for_date = datetime.date.fromisoformat(key[:10])
+        except ValueError:
+            return
+        currency = key[11:].partition(".")[0]
+        if currency:
+            self.add(currency=currency, for_date=for_date)
+
+    def discard(self, currency: str, for_date: datetime.date) -> None:
+        dates = self._dates.get(currency, [])
+        index = bisect.bisect_left(dates, for_date)
+        if index < len(dates) and dates[index] == for_date:
+            del dates[index]
+
+    def earlier(self, currency: str, for_date: datetime.date, limit: int) -> list[datetime.date]:
+        """Return up to ``limit`` indexed dates before ``for_date``, nearest first."""
+        dates = self._dates.get(currency, [])
+        index = bisect.bisect_left(dates, for_date)
+        return dates[max(index - limit, 0) : index][::-1]
+
+
+class StaleFallback:
+    """Serves the nearest earlier cached rates when the requested ones cannot be fetched.
+
+    A failed upstream request trips the degraded mode for ``cooldown`` seconds, during which misses
+    are answered from the index right away instead of waiting on upstream again. With ``forced`` the
+    service stays degraded, e.g. while upstream is known to be down.
+    """
+
+    def __init__(self, cooldown: float, *, forced: bool = False) -> None:
+        self.index = DateIndex()
+        self._cooldown = cooldown
+        self._forced = forced
+        self._degraded_until = 0.0
+        self.trips = 0
+        self.served_stale = 0
+
+    def is_degraded(self) -> bool:
+        return self._forced or time.monotonic() < self._degraded_until
+
+    def trip(self) -> None:
+        if not self.is_degraded():
+            self.trips += 1
+        self._degraded_until = time.monotonic() + self._cooldown
+
+    def stats(self) -> dict[str, int | float]:
+        return {
+            "degraded": int(self.is_degraded()),
+            "trips": self.trips,
+            "served_stale": self.served_stale,
+            "indexed_dates": len(self.index),
+        }
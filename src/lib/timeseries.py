@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import asyncio
+import datetime
+import math
+import mmap
+import operator
+import os
+import statistics
+import struct
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+    from pathlib import Path
+
+    from src.lib.types import CurrencyInfo
+
+__all__ = ("TimeSeriesStore",)
+
+EPOCH = datetime.date(2000, 1, 1)
+VALUE = struct.Struct("d")
+
+
+class TimeSeriesStore:
+    """Array-backed daily rates, one memory-mappable file per (base, target) pair.
+
+    Each file is a flat array of doubles indexed by the number of days since ``EPOCH``. Days without
+    a rate are holes in a sparse file and read back as ``0.0``, which is never a valid rate, so
+    aggregation only has to drop zeros. Aggregates run over a ``memoryview`` of the mapped window
+    with builtins implemented in C instead of decoding a JSON document per day.
+
+    :meth:`record` and :meth:`stats` run the file access in a worker thread, :meth:`window` blocks
+    and is meant to be called from one.
+    """
+
+    def __init__(self, root: Path) -> None:
+        self._root = root
+
+    def path(self, base: str, target: str) -> Path:
+        return self._root / f"{base}-{target}.f64"
+
+    @staticmethod
+    def index(for_date: datetime.date) -> int:
+        return (for_date - EPOCH).days
+
+    async def record(self, info: CurrencyInfo) -> None:
+        await asyncio.to_thread(self._write, info)
+
+    def _write(self, info: CurrencyInfo) -> None:
+        index = self.index(for_date=info.date)
+        if index < 0:
+            return
+        self._root.mkdir(parents=True, exist_ok=True)
+        for currency_value in info.values:
+            fd = os.open(self.path(base=info.currency, target=currency_value.currency), os.O_RDWR | os.O_CREAT)
+            try:
+                os.pwrite(fd, VALUE.pack(float(currency_value.value)), index * VALUE.size)
+            finally:
+                os.close(fd)
+
+    def window(self, base: str, target: str, start: datetime.date, end: datetime.date) -> list[float]:
+        """Return the known rates between ``start`` and ``end`` inclusive, in date order."""
+        try:
+            with self.path(base=base, target=target).open("rb") as series_file:
+                size = os.fstat(series_file.fileno()).st_size
+                first = max(self.index(for_date=start), 0) * VALUE.size
+                last = min((self.index(for_date=end) + 1) * VALUE.size, size)
+                if last <= first:
+                    return []
+                with mmap.mmap(series_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    view = memoryview(mapped)[first:last].cast("d")
+                    try:
+                        return list(filter(None, view))
+                    finally:
+                        view.release()
+        except FileNotFoundError:
+            return []
+
+    async def stats(
+        self,
+        base: str,
+        targets: Iterable[str],
+        start: datetime.date,
+        end: datetime.date,
+    ) -> dict[str, dict[str, float | int]]:
+        """Return the rate statistics of each of ``targets`` between ``start`` and ``end`` inclusive."""
+        return await asyncio.to_thread(self._stats, base, list(targets), start, end)
+
+    def _stats(
+        self,
+        base: str,
+        targets: list[str],
+        start: datetime.date,
+        end: datetime.date,
+    ) -> dict[str, dict[str, float | int]]:
+        return {target: self._target_stats(base=base, target=target, start=start, end=end) for target in targets}
+
+    def _target_stats(self, base: str, target: str, start: datetime.date, end: datetime.date) -> dict[str, float | int]:
+        values = self.window(base=base, target=target, start=start, end=end)
+        if not values:
+            return {"count": 0}
+        returns = list(map(math.log, map(operator.truediv, values[1:], values[:-1])))
+        return {
+            "count": len(values),
+            "min": min(values),
+            "max": max(values),
+            "mean": math.fsum(values) / len(values),
+            "volatility": statistics.stdev(returns) if len(returns) > 1 else 0.0,
+            "change_percent": (values[-1] / values[0] - 1) * 100,
+        }
@@ -0,0 +1,220 @@
+"""A local stand-in for the currency-api CDN that injects latency and failures.
+
+Documents are generated for any date, deterministically from the date and the currency, so the
+service can be measured against realistic upstream behavior without network access.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import bisect
+import datetime
+import random
+import socket
+import struct
+import zlib
+from dataclasses import (
+    dataclass,
+    field,
+)
+
+from aiohttp import web
+
+from src.lib.coders import json_encoder
+
+__all__ = (
+    "SIMULATOR_KEY",
+    "LatencyDistribution",
+    "SimulatorOptions",
+    "UpstreamSimulator",
+    "create_simulator_app",
+    "simulator_urls",
+)
+
+CURRENCIES_PATH = "/npm/@fawazahmed0/currency-api@latest/v1/currencies.json"
+CURRENCY_PATH = "/npm/@fawazahmed0/currency-api@{date}/v1/currencies/{currency}.json"
+LATEST = "latest"
+KNOWN_CURRENCIES = (
+    "aud", "brl", "byn", "cad", "chf", "cny", "czk", "dkk", "eur", "gbp", "hkd", "huf", "inr", "jpy", "krw",
+    "kzt", "mxn", "nok", "nzd", "pln", "rub", "sek", "sgd", "thb", "try", "uah", "usd", "zar",
+)  # fmt: skip
+ERROR_STATUSES = (500, 502, 503, 504)
+
+
+class LatencyDistribution:
+    """Latency sampled from percentiles, interpolated linearly between them.
+
+    ``points`` maps quantiles in ``(0, 1]`` to latencies in seconds, e.g. ``{0.5: 0.02, 0.99: 0.4}``.
+    Below the first quantile the latency grows from zero, above the last one it stays at its value.
+    """
+
+    def __init__(self, points: dict[float, float]) -> None:
+        ordered = sorted(points.items())
+        self._quantiles = [0.0] + [quantile for quantile, _ in ordered]
+        self._latencies = [0.0] + [latency for _, latency in ordered]
+
+    @classmethod
+    def parse(cls, value: str) -> LatencyDistribution:
+        """Parse ``p50=20,p99=400`` with latencies in milliseconds."""
+        points: dict[float, float] = {}
+        for item in filter(None, (part.strip() for part in value.split(","))):
+            name, _, latency = item.partition("=")
+            quantile = float(name.strip().removeprefix("p")) / 100
+            if not 0 < quantile <= 1:
+                message = f"Percentile out of range: {name!r}"
+                raise ValueError(message)
+            points[quantile] = float(latency) / 1000
+        return cls(points=points)
+
+    def sample(self, rng: random.Random) -> float:
+        quantile = rng.random()
+        index = bisect.bisect_right(self._quantiles, quantile)
+        if index == len(self._quantiles):
+            return self._latencies[-1]
+        low, high = self._quantiles[index - 1], self._quantiles[index]
+        share = (quantile - low) / (high - low)
+        return self._latencies[index - 1] + share * (self._latencies[index] - self._latencies[index - 1])
+
+
+@dataclass(frozen=True)
+class SimulatorOptions:
+    latency: LatencyDistribution | None = None
+    """Time to the response headers."""
+    error_rate: float = 0.0
+    """Share of requests answered with a 5xx status."""
+    not_found_rate: float = 0.0
+    """Share of requests answered with ``404``, as for dates not published yet."""
+    reset_rate: float = 0.0
+    """Share of requests whose connection is reset halfway through the body."""
+    slow_body_rate: float = 0.0
+    """Share of requests whose body is streamed in ``chunk_size`` chunks, ``chunk_delay`` seconds apart."""
+    chunk_size: int = 1024
+    chunk_delay: float = 0.05
+    currencies: int = len(KNOWN_CURRENCIES)
+    """Rates per document, synthetic currency codes are added past the known ones."""
+    seed: int | None = None
+    latest: datetime.date = field(default_factory=lambda: datetime.datetime.now(tz=datetime.UTC).date())
+    """Last published date, later dates are not found."""
+
+
+def currency_codes(count: int) -> list[str]:
+    codes = list(KNOWN_CURRENCIES[:count])
+    index = 0
+    while len(codes) < count:
+        code = f"x{chr(97 + index // 26 % 26)}{chr(97 + index % 26)}"
+        if index >= 26 * 26:
+            code = f"{code}{index // (26 * 26)}"
+        codes.append(code)
+        index += 1
+    return codes
+
+
+class UpstreamSimulator:
+    def __init__(self, options: SimulatorOptions) -> None:
+        self._options = options
+        self._rng = random.Random(options.seed)  # noqa: S311
+        self._codes = currency_codes(count=options.currencies)
+        self.outcomes: dict[str, int] = dict.fromkeys(("ok", "slow", "error", "not_found", "reset"), 0)
+        self.currency_lists = 0
+
+    def currencies(self) -> bytes:
+        return json_encoder.encode({code: code.upper() for code in self._codes})
+
+    def document(self, currency: str, for_date: datetime.date) -> bytes:
+        """Rates of ``currency`` on ``for_date``, the same on every call."""
+        rng = random.Random(zlib.crc32(f"{for_date.isoformat()}/{currency}".encode()))  # noqa: S311
+        rates = {code: 1 if code == currency else round(rng.lognormvariate(0, 2), 8) for code in self._codes}
+        return json_encoder.encode({"date": for_date.isoformat(), currency: rates})
+
+    def _roll(self, rate: float) -> bool:
+        return rate > 0 and self._rng.random() < rate
+
+    async def _delay(self) -> None:
+        if self._options.latency is not None:
+            await asyncio.sleep(self._options.latency.sample(rng=self._rng))
+
+    async def get_currencies(self, _request: web.Request) -> web.Response:
+        await self._delay()
+        self.currency_lists += 1
+        return web.Response(body=self.currencies(), content_type="application/json")
+
+    async def get_currency(self, request: web.Request) -> web.StreamResponse:
+        await self._delay()
+        options = self._options
+        currency = request.match_info["currency"]
+        raw_date = request.match_info["date"]
+        try:
+            for_date = options.latest if raw_date == LATEST else datetime.date.fromisoformat(raw_date)
+        except ValueError:
+            for_date = None
+        published = for_date is not None and for_date <= options.latest and currency in self._codes
+        if for_date is None or not published or self._roll(options.not_found_rate):
+            self.outcomes["not_found"] += 1
+            raise web.HTTPNotFound
+        if self._roll(options.error_rate):
+            self.outcomes["error"] += 1
+            return web.Response(status=self._rng.choice(ERROR_STATUSES), text="Simulated upstream error")
+        body = self.document(currency=currency, for_date=for_date)
+        if self._roll(options.reset_rate):
+            self.outcomes["reset"] += 1
+            return await self._reset(request=request, body=body)
+        if self._roll(options.slow_body_rate):
+            self.outcomes["slow"] += 1
+            return await self._stream(request=request, body=body)
+        self.outcomes["ok"] += 1
+        return web.Response(body=body, content_type="application/json")
+
+    async def _stream(self, request: web.Request, body: bytes) -> web.StreamResponse:
+        response = web.StreamResponse(headers={"Content-Type": "application/json"})
+        response.content_length = len(body)
+        await response.prepare(request)
+        for start in range(0, len(body), self._options.chunk_size):
+            if start:
+                await asyncio.sleep(self._options.chunk_delay)
+            await response.write(body[start : start + self._options.chunk_size])
+        await response.write_eof()
+        return response
+
+    async def _reset(self, request: web.Request, body: bytes) -> web.StreamResponse:
+        response = web.StreamResponse(headers={"Content-Type": "application/json"})
+        response.content_length = len(body)
+        await response.prepare(request)
+        await response.write(body[: len(body) // 2])
+        transport = request.transport
+        if transport is not None:
+            sock = transport.get_extra_info("socket")
+            if sock is not None:
+                # A zero linger time makes the close send an RST instead of a FIN
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+            transport.abort()
+        return response
+
+    @property
+    def documents(self) -> int:
+        """Number of rate documents requested, whatever their outcome."""
+        return sum(self.outcomes.values())
+
+    def stats(self) -> dict[str, int]:
+        return {**self.outcomes, "currency_lists": self.currency_lists}
+
+    async def get_stats(self, _request: web.Request) -> web.Response:
+        return web.json_response(self.stats())
+
+
+SIMULATOR_KEY: web.AppKey[UpstreamSimulator] = web.AppKey("simulator")
+
+
+def create_simulator_app(options: SimulatorOptions) -> web.Application:
+    simulator = UpstreamSimulator(options=options)
+    app = web.Application()
+    app[SIMULATOR_KEY] = simulator
+    app.router.add_get(CURRENCIES_PATH, simulator.get_currencies)
+    app.router.add_get(CURRENCY_PATH, simulator.get_currency)
+    app.router.add_get("/stats", simulator.get_stats)
+    return app
+
+
+def simulator_urls(host: str, port: int) -> tuple[str, str]:
+    """The ``CURRENCIES_API_LIST_URL`` and ``CURRENCY_API_WITH_DATE_URL`` settings that point at the simulator."""
+    base = f"http://{host}:{port}"
+    return f"{base}{CURRENCIES_PATH}", f"{base}{CURRENCY_PATH}"
@@ -2,8 +2,62 @@ import datetime
 
 from aiohttp import web
 
+from src.config import get_settings
 from src.lib.currency_check_exists import check_currency
 
+settings = get_settings()
+
+MAX_LEARNED_STEP = datetime.timedelta(days=7)
+
+
+class CoverageWindow:
+    """Dates upstream publishes rates for, from ``start`` up to today (UTC).
+
+    ``start`` is configured and then refined from upstream answers: rates found for an earlier date
+    move it back, a date not found shortly after it, and before any date found, moves it forward.
+    Dates outside the window are rejected without an upstream request.
+    """
+
+    def __init__(self, start: datetime.date) -> None:
+        self.start = start
+        self._earliest_found: datetime.date | None = None
+        self.rejected = 0
+        self.learned = 0
+
+    def observe(self, for_date: datetime.date, *, found: bool) -> None:
+        if found:
+            if self._earliest_found is None or for_date < self._earliest_found:
+                self._earliest_found = for_date
+            if for_date < self.start:
+                self.start = for_date
+                self.learned += 1
+        elif (
+            self.start <= for_date < self.start + MAX_LEARNED_STEP
+            and self._earliest_found is not None
+            and for_date < self._earliest_found
+        ):
+            self.start = for_date + datetime.timedelta(days=1)
+            self.learned += 1
+
+    def check(self, for_date: datetime.date) -> None:
+        today = datetime.datetime.now(tz=datetime.UTC).date()
+        if self.start <= for_date <= today:
+            return
+        self.rejected += 1
+        message = f"No exchange rates are published for {for_date}, try a date from {self.start} to {today}"
+        raise web.HTTPNotFound(
+            reason=message,
+        )
+
+    def stats(self) -> dict[str, int | float]:
+        return {
+            "rejected": self.rejected,
+            "learned": self.learned,
+        }
+
+
+coverage_window = CoverageWindow(start=settings.api.COVERAGE_START)
+
 
 async def validate_currency(currency: str) -> str:
     if await check_currency.is_currency_exists(currency=currency):
@@ -34,5 +88,37 @@ async def get_currency_and_date(request: web.Request) -> tuple[str, datetime.dat
     selected_date: datetime.date = validate_provided_date(
         provided_date=request.match_info.get("date"),
     )
+    coverage_window.check(for_date=selected_date)
 
     return currency, selected_date
+
+
+def validate_date_range(
+    start: str | None,
+    end: str | None,
+    default_days: int = 30,
+) -> tuple[datetime.date, datetime.date]:
+    end_date = validate_provided_date(provided_date=end)
+    start_date = (
+        validate_provided_date(provided_date=start)
+        if start is not None
+        else end_date - datetime.timedelta(days=default_days)
+    )
+    if start_date > end_date:
+        message = "The start date must not be after the end date"
+        raise web.HTTPUnprocessableEntity(
+            reason=message,
+        )
+    return start_date, end_date
+
+
+async def get_currency_and_date_range(request: web.Request) -> tuple[str, datetime.date, datetime.date]:
+    currency: str = await validate_currency(
+        currency=request.match_info["currency"].lower(),
+    )
+    start_date, end_date = validate_date_range(
+        start=request.query.get("from"),
+        end=request.query.get("to"),
+    )
+
+    return currency, start_date, end_date
@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import time
+from typing import TYPE_CHECKING
+
+from src.lib.cache_storage import CacheStorage
+
+if TYPE_CHECKING:
+    from collections.abc import Mapping
+
+    from src.lib.cache_storage import CachedFile
+    from src.lib.memory_cache import MemoryCache
+
+__all__ = ("WriteBehindStorage",)
+
+log = logging.getLogger(__name__)
+
+
+class WriteBehindStorage(CacheStorage):
+    """Queues the writes to ``storage`` and flushes them in batches from a background task.
+
+    Writing returns as soon as the entry is queued, so a cache miss is answered without waiting on
+    Redis or the disk. Queued entries are served to readers until they are written, and a key
+    written again before its flush is only written once. At most ``max_pending`` entries are
+    queued: a writer then waits up to ``put_timeout`` seconds for a flush to make room, after
+    which the entry is dropped, the next miss of the key fetching it again.
+
+    Until ``start`` is called, and after ``close``, writes go straight to ``storage``.
+    """
+
+    def __init__(
+        self,
+        storage: CacheStorage,
+        *,
+        max_pending: int = 1000,
+        batch_size: int = 100,
+        flush_interval: float = 0.05,
+        put_timeout: float = 1.0,
+    ) -> None:
+        self._storage = storage
+        self._max_pending = max_pending
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._put_timeout = put_timeout
+        self._pending: dict[str, tuple[bytes, float]] = {}
+        self._inflight: dict[str, bytes] = {}
+        self._wakeup = asyncio.Event()
+        self._space = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+        self._stopping = False
+        self.written = 0
+        self.batches = 0
+        self.coalesced = 0
+        self.delayed = 0
+        self.dropped = 0
+        self.failed = 0
+        self.max_delay = 0.0
+
+    @property
+    def local_cache(self) -> MemoryCache | None:
+        return self._storage.local_cache
+
+    def start(self) -> None:
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+
+    def _queued(self, key: str) -> bytes | None:
+        pending = self._pending.get(key)
+        if pending is not None:
+            return pending[0]
+        return self._inflight.get(key)
+
+    async def _wait_for_space(self) -> None:
+        while len(self._pending) >= self._max_pending:
+            self._space.clear()
+            self._wakeup.set()
+            await self._space.wait()
+
+    async def cache_encoded(self, key: str, value: bytes) -> None:
+        if self._task is None:
+            await self._storage.cache_encoded(key=key, value=value)
+            return
+        if key in self._pending:
+            self.coalesced += 1
+            self._pending[key] = (value, self._pending[key][1])
+            return
+        if len(self._pending) >= self._max_pending:
+            self.delayed += 1
+            try:
+                await asyncio.wait_for(self._wait_for_space(), timeout=self._put_timeout)
+            except TimeoutError:
+                self.dropped += 1
+                return
+        self._pending[key] = (value, time.monotonic())
+        if len(self._pending) >= self._batch_size:
+            self._wakeup.set()
+
+    async def cache_encoded_many(self, entries: Mapping[str, bytes]) -> None:
+        for key, value in entries.items():
+            await self.cache_encoded(key=key, value=value)
+
+    async def read_currency_info(self, key: str) -> bytes | None:
+        queued = self._queued(key=key)
+        if queued is not None:
+            return queued
+        return await self._storage.read_currency_info(key=key)
+
+    async def read_stale_currency_info(self, key: str) -> bytes | None:
+        queued = self._queued(key=key)
+        if queued is not None:
+            return queued
+        return await self._storage.read_stale_currency_info(key=key)
+
+    async def locate_currency_info(self, key: str, min_size: int = 0) -> CachedFile | None:
+        if self._queued(key=key) is not None:
+            return None
+        return await self._storage.locate_currency_info(key=key, min_size=min_size)
+
+    async def cached_keys(self) -> list[str]:
+        keys = await self._storage.cached_keys()
+        return list(dict.fromkeys([*keys, *self._inflight, *self._pending]))
+
+    async def flush(self) -> None:
+        """Write every queued entry, ``batch_size`` entries at a time."""
+        while self._pending:
+            keys = list(self._pending)[: self._batch_size]
+            now = time.monotonic()
+            batch: dict[str, bytes] = {}
+            for key in keys:
+                value, queued_at = self._pending.pop(key)
+                batch[key] = value
+                self.max_delay = max(self.max_delay, now - queued_at)
+            self._space.set()
+            self._inflight.update(batch)
+            try:
+                await self._storage.cache_encoded_many(entries=batch)
+            except Exception:
+                self.failed += len(batch)
+                log.exception("Failed to write %d cache entries", len(batch))
+            else:
+                self.written += len(batch)
+                self.batches += 1
+            finally:
+                for key in batch:
+                    self._inflight.pop(key, None)
+
+    async def _run(self) -> None:
+        while True:
+            with contextlib.suppress(TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self._flush_interval)
+            self._wakeup.clear()
+            await self.flush()
+            if self._stopping:
+                return
+
+    async def close(self) -> None:
+        """Flush the queued entries, then close the wrapped storage."""
+        if self._task is not None:
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        await self._storage.close()
+
+    def stats(self) -> dict[str, int | float]:
+        return {
+            "pending": len(self._pending) + len(self._inflight),
+            "written": self.written,
+            "batches": self.batches,
+            "coalesced": self.coalesced,
+            "delayed": self.delayed,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "max_delay_ms": self.max_delay * 1000,
+        }
@@ -1,25 +1,171 @@
+import argparse
+import asyncio
+import datetime
 import logging
-import sys
+from collections.abc import Sequence
+from pathlib import Path
 
 from aiohttp import web
 
 from src.app import create_app
 from src.config import get_settings
+from src.lib.backfill import Backfill
+from src.lib.cache_storage import (
+    RedisHashStorage,
+    storage_getter,
+)
+from src.lib.currency_check_exists import check_currency
+from src.lib.logs import (
+    SampledAccessLogger,
+    setup_logging,
+)
+from src.lib.timeseries import TimeSeriesStore
+from src.lib.upstream_sim import (
+    LatencyDistribution,
+    SimulatorOptions,
+    create_simulator_app,
+    simulator_urls,
+)
 
 settings = get_settings()
 
 
-def main() -> None:
+def new_event_loop() -> asyncio.AbstractEventLoop:
+    if not settings.api.UVLOOP_ENABLED:
+        return asyncio.new_event_loop()
+    try:
+        import uvloop  # noqa: PLC0415
+    except ImportError as exc:
+        message = "UVLOOP is set but uvloop is not installed, install the 'uvloop' extra"
+        raise SystemExit(message) from exc
+    return uvloop.new_event_loop()
+
+
+def serve(_args: argparse.Namespace) -> None:
+    web_app = create_app()
+    web.run_app(web_app, loop=new_event_loop(), access_log_class=SampledAccessLogger)
+
+
+async def run_backfill(args: argparse.Namespace) -> None:
+    unknown = [currency for currency in args.currencies if not await check_currency.is_currency_exists(currency)]
+    if unknown:
+        message = f"Unknown currencies: {', '.join(unknown)}"
+        raise SystemExit(message)
+    backfill = Backfill(
+        currencies=args.currencies,
+        start=args.start,
+        end=args.end,
+        storage=storage_getter(),
+        checkpoint_path=args.checkpoint or settings.api.CACHE_DIR / ".backfill-checkpoint",
+        concurrency=args.concurrency,
+        batch_size=args.batch_size,
+        timeseries=TimeSeriesStore(root=settings.api.timeseries_dir) if settings.api.TIMESERIES_ENABLED else None,
+    )
+    try:
+        await backfill.run()
+    finally:
+        await settings.redis.close_pool()
+
+
+def backfill(args: argparse.Namespace) -> None:
+    asyncio.run(run_backfill(args=args))
+
+
+async def run_redis_migration(args: argparse.Namespace) -> None:
+    storage = RedisHashStorage()
+    try:
+        migrated = await storage.migrate(batch_size=args.batch_size)
+    finally:
+        await settings.redis.close_pool()
+    logging.getLogger(__name__).info("Moved %d keys into per-date hashes", migrated)
+
+
+def redis_migrate(args: argparse.Namespace) -> None:
+    asyncio.run(run_redis_migration(args=args))
+
+
+def upstream_sim(args: argparse.Namespace) -> None:
+    options = SimulatorOptions(
+        latency=args.latency,
+        error_rate=args.error_rate,
+        not_found_rate=args.not_found_rate,
+        reset_rate=args.reset_rate,
+        slow_body_rate=args.slow_body_rate,
+        chunk_size=args.chunk_size,
+        chunk_delay=args.chunk_delay,
+        currencies=args.currencies,
+        seed=args.seed,
+    )
+    currencies_url, currency_url = simulator_urls(host=args.host, port=args.port)
+    logging.getLogger(__name__).info(
+        "Point the service at the simulator with CURRENCIES_API_LIST_URL=%s CURRENCY_API_WITH_DATE_URL=%s",
+        currencies_url,
+        currency_url,
+    )
+    web.run_app(create_simulator_app(options=options), host=args.host, port=args.port, loop=new_event_loop())
+
+
+def parse_currencies(value: str) -> list[str]:
+    return [currency.strip().lower() for currency in value.split(",") if currency.strip()]
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="webapp", description="Exchange rate web application")
+    parser.set_defaults(handler=serve)
+    subparsers = parser.add_subparsers(title="commands")
+
+    backfill_parser = subparsers.add_parser("backfill", help="pre-populate the cache with historical rates")
+    backfill_parser.add_argument("--from", dest="start", type=datetime.date.fromisoformat, required=True)
+    backfill_parser.add_argument("--to", dest="end", type=datetime.date.fromisoformat, required=True)
+    backfill_parser.add_argument(
+        "--currencies",
+        type=parse_currencies,
+        default=list(settings.api.TARGET_CURRENCIES),
+        help="comma separated source currencies, the target currencies by default",
+    )
+    backfill_parser.add_argument("--concurrency", type=int, default=8, help="simultaneous upstream requests")
+    backfill_parser.add_argument("--batch-size", type=int, default=100, help="items written to the storage at once")
+    backfill_parser.add_argument("--checkpoint", type=Path, default=None, help="checkpoint file to resume from")
+    backfill_parser.set_defaults(handler=backfill)
+
+    migrate_parser = subparsers.add_parser(
+        "redis-migrate",
+        help="move the cached rates from per-currency Redis keys to per-date hashes",
+    )
+    migrate_parser.add_argument("--batch-size", type=int, default=500, help="keys moved at once")
+    migrate_parser.set_defaults(handler=redis_migrate)
+
+    sim_parser = subparsers.add_parser("upstream-sim", help="serve a local currency-api with injected faults")
+    sim_parser.add_argument("--host", default="127.0.0.1")
+    sim_parser.add_argument("--port", type=int, default=8081)
+    sim_parser.add_argument(
+        "--latency",
+        type=LatencyDistribution.parse,
+        default=None,
+        help="latency percentiles in milliseconds, e.g. p50=20,p90=80,p99=400",
+    )
+    sim_parser.add_argument("--error-rate", type=float, default=0.0, help="share of 5xx responses")
+    sim_parser.add_argument("--not-found-rate", type=float, default=0.0, help="share of 404 responses")
+    sim_parser.add_argument("--reset-rate", type=float, default=0.0, help="share of connections reset mid-body")
+    sim_parser.add_argument("--slow-body-rate", type=float, default=0.0, help="share of bodies streamed slowly")
+    sim_parser.add_argument("--chunk-size", type=int, default=1024, help="bytes per slow body chunk")
+    sim_parser.add_argument("--chunk-delay", type=float, default=0.05, help="seconds between slow body chunks")
+    sim_parser.add_argument("--currencies", type=int, default=28, help="rates per document, sets the payload size")
+    sim_parser.add_argument("--seed", type=int, default=None, help="seed of the fault injection")
+    sim_parser.set_defaults(handler=upstream_sim)
+
+    return parser
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    args = build_parser().parse_args(argv)
     cache_dir = settings.api.CACHE_DIR
     cache_dir.mkdir(exist_ok=True)
-    logging.basicConfig(
-        level=logging.INFO,
-        stream=sys.stdout,
-        datefmt="%Y:%m:%d %H:%M:%S",
-        format=settings.api.DEFAULT_LOG_FORMAT,
-    )
-    web_app = create_app()
-    web.run_app(web_app)
+    listener = setup_logging(json_lines=settings.api.LOG_JSON)
+    try:
+        args.handler(args)
+    finally:
+        listener.stop()
 
 
 if __name__ == "__main__":
@@ -6,6 +6,7 @@ from unittest.mock import patch
 
 from aiohttp.test_utils import AioHTTPTestCase
 
+from src.lib.coders import currency_info_msgpack_decoder
 from tests.helpers import (
     clear_cache_dir,
     override_settings,
@@ -31,7 +32,7 @@ def tearDownModule() -> None:
 
 
 @patch("src.lib.currency_check_exists.CheckCurrencyExists.get_all_currencies")
-@patch("src.lib.currency_rates_getter.CurrencyRatesGetter.request_currency_info")
+@patch("src.lib.providers.JsDelivrProvider.request_currency_info")
 class TestCurrencyRates(AioHTTPTestCase):
     exchange_rate_service: ExchangeRateService
 
@@ -86,6 +87,74 @@ class TestCurrencyRates(AioHTTPTestCase):
         async with self.client.get(f"/rates/{currency}/{date.isoformat()}") as response:
             self.assertEqual(response.status, 404)
 
+    async def test_get_currency_rates_msgpack(
+        self,
+        req_currency_info: AsyncMock,
+        all_currencies: AsyncMock,
+    ) -> None:
+        currency = "eur"
+        date = datetime.date(2024, 2, 3)
+        req_currency_info.return_value = await self.exchange_rate_service.mock_currency_api_url(  # type: ignore[call-arg]
+            currency=currency,
+            date=date,
+        )
+        all_currencies.return_value = await self.exchange_rate_service.mock_all_currencies_api_url()  # type: ignore[call-arg]
+        for _ in range(2):
+            async with self.client.get(
+                f"/rates/{currency}/{date.isoformat()}",
+                headers={"Accept": "application/msgpack"},
+            ) as response:
+                self.assertEqual(response.status, 200)
+                self.assertEqual(response.content_type, "application/msgpack")
+                result = currency_info_msgpack_decoder.decode(await response.read())
+                self.assertEqual(result.date, date)
+                self.assertEqual(result.currency, currency)
+        req_currency_info.assert_called_once()
+
+    async def test_get_currency_rates_cached_file(
+        self,
+        req_currency_info: AsyncMock,
+        all_currencies: AsyncMock,
+    ) -> None:
+        currency = "usd"
+        date = datetime.date(2024, 3, 15)
+        req_currency_info.return_value = await self.exchange_rate_service.mock_currency_api_url(  # type: ignore[call-arg]
+            currency=currency,
+            date=date,
+        )
+        all_currencies.return_value = await self.exchange_rate_service.mock_all_currencies_api_url()  # type: ignore[call-arg]
+        with (
+            patch("src.app.settings.api.SENDFILE_ENABLED", new=True),
+            patch("src.app.settings.api.SENDFILE_MIN_BYTES", new=0),
+        ):
+            async with self.client.get(f"/rates/{currency}/{date.isoformat()}") as response:
+                self.assertEqual(response.status, 200)
+                body = await response.read()
+                self.assertNotIn("ETag", response.headers)
+            async with self.client.get(f"/rates/{currency}/{date.isoformat()}") as response:
+                self.assertEqual(response.status, 200)
+                self.assertEqual(response.content_type, "application/json")
+                self.assertEqual(await response.read(), body)
+                self.assertIn("ETag", response.headers)
+                self.assertTrue(response.headers["Cache-Control"].startswith("max-age="))
+        req_currency_info.assert_called_once()
+
+    async def test_stream_currency_rates(
+        self,
+        req_currency_info: AsyncMock,
+        all_currencies: AsyncMock,
+    ) -> None:
+        currency = "rub"
+        req_currency_info.return_value = await self.exchange_rate_service.mock_currency_api_url(  # type: ignore[call-arg]
+            currency=currency,
+        )
+        all_currencies.return_value = await self.exchange_rate_service.mock_all_currencies_api_url()  # type: ignore[call-arg]
+        async with self.client.get(f"/rates/{currency}/stream") as response:
+            self.assertEqual(response.status, 200)
+            self.assertEqual(response.content_type, "text/event-stream")
+            frame = await response.content.readuntil(b"\n\n")
+            self.assertTrue(frame.startswith(b"event: rates\ndata: {"))
+
     async def test_currency_rates_currency_and_date(
         self,
         req_currency_info: AsyncMock,
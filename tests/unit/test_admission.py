@@ -0,0 +1,77 @@
+from unittest import (
+    IsolatedAsyncioTestCase,
+    TestCase,
+)
+from unittest.mock import MagicMock
+
+from aiohttp.web_exceptions import (
+    HTTPServiceUnavailable,
+    HTTPTooManyRequests,
+)
+
+from src.config import AdmissionConfig
+from src.lib.admission import (
+    AdmissionController,
+    TokenBucket,
+)
+
+
+class TestTokenBucket(TestCase):
+    def test_take(self) -> None:
+        bucket = TokenBucket(rate=1, capacity=2, updated=0)
+        self.assertTrue(bucket.take(now=0))
+        self.assertTrue(bucket.take(now=0))
+        self.assertFalse(bucket.take(now=0))
+        self.assertEqual(bucket.retry_after(), 1)
+        self.assertTrue(bucket.take(now=1))
+
+
+class TestAdmissionController(IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.config = AdmissionConfig(
+            CLIENT_RATE=0.001,
+            CLIENT_BURST=2,
+            MAX_TRACKED_CLIENTS=2,
+            MAX_IN_FLIGHT=1,
+            MAX_PENDING_MISSES=1,
+            MAX_LOOP_LAG_MS=100,
+        )
+        self.loop_monitor = MagicMock(lag_ms=0.0)
+        self.controller = AdmissionController(config=self.config, loop_monitor=self.loop_monitor)
+
+    async def test_rate_limited_client(self) -> None:
+        self.controller.check_client(client="a")
+        self.controller.check_client(client="a")
+        with self.assertRaises(HTTPTooManyRequests) as context:
+            self.controller.check_client(client="a")
+        self.assertIn("Retry-After", context.exception.headers)
+        self.controller.check_client(client="b")
+        self.assertEqual(self.controller.rejected_rate_limited, 1)
+
+    def test_tracked_clients_are_bounded(self) -> None:
+        for client in ("a", "b", "c"):
+            self.controller.get_bucket(client=client)
+        self.assertEqual(len(self.controller._buckets), self.config.MAX_TRACKED_CLIENTS)  # noqa: SLF001
+        self.assertNotIn("a", self.controller._buckets)  # noqa: SLF001
+
+    async def test_request_slot_in_flight_cap(self) -> None:
+        async with self.controller.request_slot(client="a"):
+            self.assertEqual(self.controller.in_flight, 1)
+            with self.assertRaises(HTTPServiceUnavailable):
+                async with self.controller.request_slot(client="b"):
+                    pass
+        self.assertEqual(self.controller.in_flight, 0)
+        self.assertEqual(self.controller.rejected_overloaded, 1)
+
+    async def test_miss_slot(self) -> None:
+        async with self.controller.miss_slot():
+            with self.assertRaises(HTTPServiceUnavailable):
+                async with self.controller.miss_slot():
+                    pass
+        self.assertEqual(self.controller.pending_misses, 0)
+
+        self.loop_monitor.lag_ms = 150.0
+        with self.assertRaises(HTTPServiceUnavailable):
+            async with self.controller.miss_slot():
+                pass
+        self.assertEqual(self.controller.rejected_misses, 2)
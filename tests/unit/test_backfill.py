@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import datetime
+import tempfile
+from pathlib import Path
+from typing import TYPE_CHECKING
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import (
+    AsyncMock,
+    patch,
+)
+
+from aiohttp import ClientError
+from aiohttp.web_exceptions import HTTPNotFound
+from fakeredis import FakeAsyncRedis
+
+from src.lib.backfill import Backfill
+from src.lib.cache_storage import RedisStorage
+from src.lib.currency_rates_getter import CurrencyRatesGetter
+from tests.data import DataHelper
+from tests.helpers import currency_info_response
+
+if TYPE_CHECKING:
+    from src.lib.types import CurrencyInfo
+
+START_DATE = datetime.date(2024, 5, 1)
+END_DATE = datetime.date(2024, 5, 3)
+
+data_helper = DataHelper.get_helper()
+
+
+class TestBackfill(IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.checkpoint_path = Path(self.tmp_dir.name) / "checkpoint"
+        self.storage = AsyncMock()
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def get_backfill(self) -> Backfill:
+        return Backfill(
+            currencies=["RUB", "eur"],
+            start=START_DATE,
+            end=END_DATE,
+            storage=self.storage,
+            checkpoint_path=self.checkpoint_path,
+            concurrency=2,
+            batch_size=4,
+        )
+
+    @staticmethod
+    async def read_currency_info(rates_getter: CurrencyRatesGetter) -> CurrencyInfo:
+        if rates_getter.for_date == START_DATE and rates_getter.currency == "rub":
+            raise HTTPNotFound
+        if rates_getter.for_date == END_DATE and rates_getter.currency == "eur":
+            raise ClientError
+        return currency_info_response(
+            date=rates_getter.for_date,
+            helper=data_helper,
+            target_currencies=("usd",),
+            currency="eur" if rates_getter.currency == "eur" else "rub",
+        )
+
+    async def test_run_and_resume(self) -> None:
+        with patch.object(CurrencyRatesGetter, "read_currency_info_for_date", self.read_currency_info):
+            progress = await self.get_backfill().run()
+        self.assertEqual(progress.total, 6)
+        self.assertEqual(progress.done, 4)
+        self.assertEqual(progress.missing, 1)
+        self.assertEqual(progress.failed, 1)
+        self.assertEqual(self.storage.cache_encoded_many.await_count, 2)
+        entries = self.storage.cache_encoded_many.await_args_list[0].kwargs["entries"]
+        self.assertTrue(any(key.startswith(f"{START_DATE.isoformat()}-eur") for key in entries))
+
+        with patch.object(CurrencyRatesGetter, "read_currency_info_for_date", AsyncMock(side_effect=ClientError)):
+            progress = await self.get_backfill().run()
+        self.assertEqual(progress.skipped, 5)
+        self.assertEqual(progress.failed, 1)
+
+    async def test_redis_keeps_past_dates(self) -> None:
+        redis_client = FakeAsyncRedis()
+
+        async def close() -> None:
+            await redis_client.flushall()
+            await redis_client.connection_pool.disconnect()
+
+        self.addAsyncCleanup(close)
+        self.storage = RedisStorage(redis_client=redis_client, expire=60, history_expire=0)
+        with patch.object(CurrencyRatesGetter, "read_currency_info_for_date", self.read_currency_info):
+            await self.get_backfill().run()
+        keys = await redis_client.keys(f"{START_DATE.isoformat()}-eur*")
+        self.assertTrue(keys)
+        for key in keys:
+            self.assertEqual(await redis_client.ttl(key), -1)
+
+        self.storage = RedisStorage(redis_client=redis_client, expire=60, history_expire=86400)
+        self.checkpoint_path.unlink()
+        with patch.object(CurrencyRatesGetter, "read_currency_info_for_date", self.read_currency_info):
+            await self.get_backfill().run()
+        for key in keys:
+            self.assertIn(await redis_client.ttl(key), {86399, 86400})
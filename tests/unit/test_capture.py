@@ -0,0 +1,72 @@
+import tempfile
+from pathlib import Path
+from unittest import IsolatedAsyncioTestCase
+
+from aiohttp import web
+from aiohttp.test_utils import (
+    TestClient,
+    TestServer,
+)
+
+from src.lib.capture import (
+    CapturedRequest,
+    TrafficCapture,
+    capture_middleware,
+    read_capture,
+)
+
+
+class TestTrafficCapture(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = Path(directory.name) / "capture" / "requests.tsv"
+
+    async def test_record_and_read(self) -> None:
+        capture = TrafficCapture(path=self.path, batch_size=2, flush_interval=60, max_pending=3)
+        capture.start()
+        capture.record(currency="usd", date="", timestamp=1714521600.5)
+        capture.record(currency="eur", date="2024-04-30", timestamp=1714521601)
+        await capture.close()
+        self.assertEqual(
+            list(read_capture(path=self.path)),
+            [
+                CapturedRequest(timestamp=1714521600.5, currency="usd", date=""),
+                CapturedRequest(timestamp=1714521601.0, currency="eur", date="2024-04-30"),
+            ],
+        )
+        self.assertEqual(capture.stats()["written"], 2)
+
+        with self.path.open("a") as file:
+            file.write("not a capture line\n")
+        self.assertEqual(len(list(read_capture(path=self.path))), 2)
+
+    async def test_pending_limit(self) -> None:
+        capture = TrafficCapture(path=self.path, batch_size=10, max_pending=2)
+        self.path.parent.mkdir(parents=True)
+        for currency in ("usd", "eur", "rub"):
+            capture.record(currency=currency, date="")
+        await capture.close()
+        stats = capture.stats()
+        self.assertEqual((stats["captured"], stats["dropped"], stats["written"]), (2, 1, 2))
+
+    async def test_middleware(self) -> None:
+        async def rates(_request: web.Request) -> web.Response:
+            raise web.HTTPNotFound
+
+        async def other(_request: web.Request) -> web.Response:
+            return web.Response()
+
+        capture = TrafficCapture(path=self.path)
+        app = web.Application(middlewares=[capture_middleware(capture=capture, handlers={rates})])
+        app.router.add_get("/rates/{currency}/stats", other)
+        app.router.add_get("/rates/{currency}", rates)
+        app.router.add_get("/rates/{currency}/{date}", rates)
+        async with TestClient(TestServer(app)) as client:
+            for path in ("/rates/USD", "/rates/eur/2024-04-30", "/rates/usd/stats"):
+                async with client.get(path):
+                    pass
+        self.path.parent.mkdir(parents=True)
+        await capture.close()
+        captured = [(request.currency, request.date) for request in read_capture(path=self.path)]
+        self.assertEqual(captured, [("usd", ""), ("eur", "2024-04-30")])
@@ -0,0 +1,47 @@
+import datetime
+from unittest import TestCase
+
+from src.lib.coders import (
+    JSON_FORMAT,
+    MSGPACK_FORMAT,
+    currency_info_msgpack_decoder,
+    negotiate_media_format,
+)
+from tests.data import DataHelper
+from tests.helpers import currency_info_response
+
+data_helper = DataHelper.get_helper()
+
+
+class TestMediaFormat(TestCase):
+    def test_negotiate_media_format(self) -> None:
+        headers = (
+            (None, JSON_FORMAT),
+            ("*/*", JSON_FORMAT),
+            ("application/json", JSON_FORMAT),
+            ("application/msgpack", MSGPACK_FORMAT),
+            ("text/html, application/x-msgpack;q=0.9", MSGPACK_FORMAT),
+            ("application/json, application/msgpack", JSON_FORMAT),
+            ("application/json;q=0.1, application/msgpack", MSGPACK_FORMAT),
+            ("application/msgpack;q=0.5, application/json;q=0.5", MSGPACK_FORMAT),
+            ("application/msgpack;q=0, */*", JSON_FORMAT),
+            ("application/json;q=0, application/msgpack;q=0.2", MSGPACK_FORMAT),
+            ("application/msgpack;q=high", JSON_FORMAT),
+        )
+        for accept, expected in headers:
+            with self.subTest(accept=accept):
+                self.assertIs(negotiate_media_format(accept=accept), expected)
+
+    def test_variant_key(self) -> None:
+        self.assertEqual(JSON_FORMAT.variant_key("2024-01-01-usd.json"), "2024-01-01-usd.json")
+        self.assertEqual(MSGPACK_FORMAT.variant_key("2024-01-01-usd.json"), "2024-01-01-usd.msgpack")
+        self.assertEqual(MSGPACK_FORMAT.variant_key("2024-01-01-usd"), "2024-01-01-usd.msgpack")
+
+    def test_msgpack_round_trip(self) -> None:
+        currency_info = currency_info_response(
+            date=datetime.date(2024, 5, 11),
+            helper=data_helper,
+            target_currencies=("usd", "rub"),
+        )
+        encoded = MSGPACK_FORMAT.encoder.encode(currency_info)
+        self.assertEqual(currency_info_msgpack_decoder.decode(encoded), currency_info)
@@ -0,0 +1,34 @@
+import zlib
+from unittest import TestCase
+
+from src.lib.compression import (
+    COMPRESSED_FLAG,
+    ValueCodec,
+)
+
+
+class TestValueCodec(TestCase):
+    def test_encode(self) -> None:
+        codec = ValueCodec(min_size=64)
+        values = b'{"currency":"eur","value":0.93},' * 20
+        document = b'{"date":"2024-05-01","currency":"usd","values":[' + values + b"]}"
+        compressed = codec.encode(document)
+        self.assertTrue(compressed.startswith(COMPRESSED_FLAG))
+        self.assertLess(len(compressed), len(document) / 2)
+        self.assertEqual(codec.decode(compressed), document)
+        self.assertEqual(codec.encode(compressed), compressed)
+
+        small = b'{"date":"2024-05-01"}'
+        self.assertEqual(codec.encode(small), small)
+        incompressible = bytes(range(256))
+        self.assertEqual(codec.encode(incompressible), incompressible)
+        self.assertEqual(codec.decode(small), small)
+
+        stats = codec.stats()
+        self.assertEqual((stats["compressed"], stats["stored_raw"], stats["decompressed"]), (1, 3, 1))
+        self.assertEqual(stats["saved_bytes"], len(document) - len(compressed))
+
+    def test_legacy_values(self) -> None:
+        codec = ValueCodec()
+        self.assertEqual(codec.decode(COMPRESSED_FLAG + zlib.compress(b"{}")), b"{}")
+        self.assertEqual(codec.decode(b"\x82\xa4date"), b"\x82\xa4date")
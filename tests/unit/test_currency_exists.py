@@ -1,10 +1,14 @@
+import tempfile
+from pathlib import Path
 from unittest import IsolatedAsyncioTestCase
 from unittest.mock import (
     AsyncMock,
     patch,
 )
 
+from src.lib.coders import json_encoder
 from src.lib.currency_check_exists import CheckCurrencyExists
+from src.lib.providers import DatasetProvider
 from tests.data import DataHelper
 
 data_helper = DataHelper.get_helper()
@@ -27,3 +31,13 @@ class TestCurrencyExists(IsolatedAsyncioTestCase):
         self.assertTrue(res_true)
         res_false = await self.check_currency.is_currency_exists(currency="blob")
         self.assertFalse(res_false)
+
+    async def test_currencies_from_dataset(self) -> None:
+        with tempfile.TemporaryDirectory() as root:
+            provider = DatasetProvider(root=Path(root))
+            provider.currencies_path.write_bytes(json_encoder.encode(AVAILABLE_CURRENCIES))
+            with (
+                patch("src.lib.currency_check_exists.get_provider", return_value=provider),
+                patch("aiohttp.ClientSession.get", side_effect=AssertionError),
+            ):
+                self.assertTrue(await CheckCurrencyExists().is_currency_exists(currency="aud"))
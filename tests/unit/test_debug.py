@@ -0,0 +1,26 @@
+from unittest import TestCase
+
+from aiohttp.test_utils import make_mocked_request
+from aiohttp.web_exceptions import (
+    HTTPForbidden,
+    HTTPUnauthorized,
+)
+
+from src.lib.debug import check_debug_token
+
+DEBUG_TOKEN = "secret"  # noqa: S105
+
+
+class TestCheckDebugToken(TestCase):
+    def test_check_debug_token(self) -> None:
+        check_debug_token(
+            request=make_mocked_request("GET", "/debug/profile", headers={"Authorization": "Bearer secret"}),
+            token=DEBUG_TOKEN,
+        )
+        with self.assertRaises(HTTPUnauthorized):
+            check_debug_token(request=make_mocked_request("GET", "/debug/profile"), token=DEBUG_TOKEN)
+        with self.assertRaises(HTTPForbidden):
+            check_debug_token(
+                request=make_mocked_request("GET", "/debug/profile", headers={"Authorization": "Bearer wrong"}),
+                token=DEBUG_TOKEN,
+            )
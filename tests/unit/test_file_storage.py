@@ -1,15 +1,13 @@
 import datetime
+import os
+import tempfile
+import time
 from pathlib import Path
 from unittest import IsolatedAsyncioTestCase
-from unittest.mock import (
-    MagicMock,
-    patch,
-)
-
-import aiofiles
 
 from src.lib.cache_storage import FileStorage
 from src.lib.coders import json_encoder
+from src.lib.memory_cache import MemoryCache
 from src.lib.types import CurrencyInfo
 from tests.data import DataHelper
 from tests.helpers import currency_info_response
@@ -19,10 +17,6 @@ CURRENT_DATE = datetime.datetime.now(tz=datetime.UTC).date()
 
 data_helper = DataHelper.get_helper()
 
-aiofiles.threadpool.wrap.register(MagicMock)(  # type: ignore[attr-defined]
-    lambda *args, **kwargs: aiofiles.threadpool.AsyncBufferedIOBase(*args, **kwargs)  # type: ignore[attr-defined]
-)
-
 
 class TestFileStorage(IsolatedAsyncioTestCase):
     currency_info: CurrencyInfo
@@ -37,38 +31,129 @@ class TestFileStorage(IsolatedAsyncioTestCase):
         )
 
     def setUp(self) -> None:
-        self.cache_dir = Path("/test")
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache_dir = Path(self.temp_dir.name)
         self.key = "test_key"
-        self.mock_currency_file = MagicMock()
-        self.file_storage = FileStorage(cache_dir=self.cache_dir)
+        self.file_storage = FileStorage(cache_dir=self.cache_dir, expire=60, max_size=0)
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
 
     async def test_cache_currency_info(self) -> None:
         currency_info_bytes = json_encoder.encode(self.currency_info)
 
-        with patch("aiofiles.threadpool.sync_open", return_value=self.mock_currency_file):
-            res = await self.file_storage.cache_currency_info(
-                info=self.currency_info,
-                key=self.key,
-            )
-        self.mock_currency_file.write.assert_called_once_with(currency_info_bytes)
+        res = await self.file_storage.cache_currency_info(
+            info=self.currency_info,
+            key=self.key,
+        )
         self.assertEqual(res, currency_info_bytes)
+        self.assertEqual((self.cache_dir / self.key).read_bytes(), currency_info_bytes)
+        self.assertEqual([path.name for path in self.cache_dir.iterdir()], [self.key])
+        self.assertAlmostEqual((self.cache_dir / self.key).stat().st_mtime, time.time(), delta=5)
 
-    @patch.object(Path, "exists")
-    async def test_read_currency_info(self, path_exists: MagicMock) -> None:
+    async def test_read_currency_info(self) -> None:
         currency_info_bytes = json_encoder.encode(self.currency_info)
+        await self.file_storage.cache_encoded(key=self.key, value=currency_info_bytes)
 
-        with patch("aiofiles.threadpool.sync_open", return_value=self.mock_currency_file):
-            path_exists.return_value = True
-            self.mock_currency_file.read.return_value = json_encoder.encode(self.currency_info)
-            res = await self.file_storage.read_currency_info(self.key)
+        res = await self.file_storage.read_currency_info(self.key)
 
-        self.mock_currency_file.read.assert_called_once()
         self.assertEqual(res, currency_info_bytes)
 
-    @patch.object(Path, "exists")
-    async def test_read_currency_info_not_found(self, patch_exists: MagicMock) -> None:
-        with patch("aiofiles.threadpool.sync_open", return_value=self.mock_currency_file):
-            patch_exists.return_value = False
-            res = await self.file_storage.read_currency_info(self.key)
-        self.mock_currency_file.read.assert_not_called()
+    async def test_read_currency_info_not_found(self) -> None:
+        res = await self.file_storage.read_currency_info(self.key)
         self.assertIsNone(res)
+        self.assertIsNone(await self.file_storage.locate_currency_info(self.key))
+
+    async def test_locate_currency_info(self) -> None:
+        await self.file_storage.cache_encoded(key=self.key, value=b"{}")
+
+        cached_file = await self.file_storage.locate_currency_info(self.key)
+
+        if cached_file is None:
+            self.fail("The cached file is not located")
+        self.assertEqual(cached_file.path, self.cache_dir / self.key)
+        self.assertAlmostEqual(cached_file.ttl or 0, 60, delta=5)
+        self.assertIsNone(await self.file_storage.locate_currency_info(self.key, min_size=3))
+        memory_cache = MemoryCache()
+        file_storage = FileStorage(cache_dir=self.cache_dir, memory_cache=memory_cache, expire=60)
+        await file_storage.read_currency_info(self.key)
+        self.assertIsNone(await file_storage.locate_currency_info(self.key))
+
+    async def test_read_currency_info_expired(self) -> None:
+        await self.file_storage.cache_encoded(key=self.key, value=b"{}")
+        self.assertIsNotNone(await self.file_storage.locate_currency_info(self.key))
+        expired = time.time() - 61
+        os.utime(self.cache_dir / self.key, (expired, expired))
+
+        self.assertIsNone(await self.file_storage.read_currency_info(self.key))
+        self.assertIsNone(await self.file_storage.locate_currency_info(self.key))
+
+    async def test_read_currency_info_memory_cache(self) -> None:
+        memory_cache = MemoryCache()
+        file_storage = FileStorage(cache_dir=self.cache_dir, memory_cache=memory_cache, expire=60)
+        currency_info_bytes = json_encoder.encode(self.currency_info)
+        (self.cache_dir / self.key).write_bytes(currency_info_bytes)
+
+        self.assertEqual(await file_storage.read_currency_info(self.key), currency_info_bytes)
+        (self.cache_dir / self.key).unlink()
+        self.assertEqual(await file_storage.read_currency_info(self.key), currency_info_bytes)
+
+        self.assertEqual(memory_cache.hits, 1)
+
+    async def test_sweep(self) -> None:
+        memory_cache = MemoryCache()
+        file_storage = FileStorage(cache_dir=self.cache_dir, memory_cache=memory_cache, expire=60, max_size=20)
+        for number in range(4):
+            await file_storage.cache_encoded(key=f"key-{number}", value=b"0123456789")
+            written_at = time.time() - 10 + number
+            os.utime(self.cache_dir / f"key-{number}", (written_at, written_at))
+        expired = time.time() - 61
+        os.utime(self.cache_dir / "key-3", (expired, expired))
+        (self.cache_dir / ".checkpoint").write_bytes(b"0123456789" * 10)
+        (self.cache_dir / "timeseries").mkdir()
+
+        await file_storage.sweep()
+
+        self.assertEqual(
+            sorted(path.name for path in self.cache_dir.iterdir()),
+            [".checkpoint", "key-1", "key-2", "timeseries"],
+        )
+        self.assertNotIn("key-0", memory_cache)
+        self.assertEqual(file_storage.stats(), {"files": 2, "size_bytes": 20, "expired": 1, "evicted": 1})
+
+    async def test_past_dates_do_not_expire(self) -> None:
+        memory_cache = MemoryCache()
+        file_storage = FileStorage(cache_dir=self.cache_dir, memory_cache=memory_cache, expire=60)
+        today = datetime.datetime.now(tz=datetime.UTC).date()
+        past_key = f"{today - datetime.timedelta(days=30)}-usd.json"
+        today_key = f"{today}-usd.json"
+        await file_storage.cache_encoded_many(entries={past_key: b"{}", today_key: b"{}"})
+        ttls = {key: ttl for key, _, ttl in memory_cache.hottest(limit=2)}
+        self.assertIsNone(ttls[past_key])
+        self.assertAlmostEqual(ttls[today_key] or 0, 60, delta=5)
+        expired = time.time() - 61
+        for key in (past_key, today_key):
+            os.utime(self.cache_dir / key, (expired, expired))
+
+        await file_storage.sweep()
+
+        self.assertEqual([path.name for path in self.cache_dir.iterdir()], [past_key])
+        memory_cache.clear()
+        cached_file = await file_storage.locate_currency_info(past_key)
+        if cached_file is None:
+            self.fail("The cached file is not located")
+        self.assertIsNone(cached_file.ttl)
+        self.assertEqual(await file_storage.read_currency_info(past_key), b"{}")
+
+    async def test_keep_expired(self) -> None:
+        file_storage = FileStorage(cache_dir=self.cache_dir, expire=60, keep_expired=True)
+        await file_storage.cache_encoded(key=self.key, value=b"{}")
+        (self.cache_dir / ".checkpoint").write_bytes(b"")
+        expired = time.time() - 61
+        os.utime(self.cache_dir / self.key, (expired, expired))
+
+        await file_storage.sweep()
+
+        self.assertIsNone(await file_storage.read_currency_info(self.key))
+        self.assertEqual(await file_storage.read_stale_currency_info(self.key), b"{}")
+        self.assertEqual(await file_storage.cached_keys(), [self.key])
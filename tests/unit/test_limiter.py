@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import asyncio
+from unittest import IsolatedAsyncioTestCase
+
+from src.lib.limiter import (
+    AdaptiveLimiter,
+    UpstreamSaturatedError,
+)
+
+
+class TestAdaptiveLimiter(IsolatedAsyncioTestCase):
+    async def call(self, limiter: AdaptiveLimiter, delay: float = 0.0, error: BaseException | None = None) -> None:
+        async with limiter.slot():
+            await asyncio.sleep(delay)
+            if error is not None:
+                raise error
+
+    async def test_queue(self) -> None:
+        limiter = AdaptiveLimiter(initial=2, queue_size=1, queue_timeout=1)
+        peak = 0
+
+        async def call() -> None:
+            nonlocal peak
+            async with limiter.slot():
+                peak = max(peak, limiter.in_flight)
+                await asyncio.sleep(0.01)
+
+        results = await asyncio.gather(*(call() for _ in range(4)), return_exceptions=True)
+        self.assertEqual(peak, 2)
+        self.assertEqual([isinstance(result, UpstreamSaturatedError) for result in results], [False] * 3 + [True])
+        self.assertEqual((limiter.queued, limiter.rejected, limiter.in_flight), (1, 1, 0))
+
+    async def test_queue_timeout(self) -> None:
+        limiter = AdaptiveLimiter(initial=1, queue_timeout=0.01)
+        results = await asyncio.gather(self.call(limiter, delay=0.05), self.call(limiter), return_exceptions=True)
+        self.assertIsNone(results[0])
+        self.assertIsInstance(results[1], UpstreamSaturatedError)
+        self.assertEqual((limiter.expired, limiter.in_flight, limiter.stats()["waiting"]), (1, 0, 0))
+
+    async def test_aimd(self) -> None:
+        limiter = AdaptiveLimiter(initial=4, min_limit=1, max_limit=5, latency_target=0.05, backoff=0.5)
+        for _ in range(40):
+            await asyncio.gather(*(self.call(limiter) for _ in range(limiter.capacity)))
+        self.assertEqual(limiter.limit, 5)
+
+        with self.assertRaises(TimeoutError):
+            await self.call(limiter, error=TimeoutError())
+        self.assertEqual(limiter.limit, 2.5)
+        await asyncio.gather(*(self.call(limiter, delay=0.06) for _ in range(2)))
+        self.assertEqual((limiter.limit, limiter.slow, limiter.decreases), (1.25, 2, 2))
+        with self.assertRaises(ValueError):
+            await self.call(limiter, error=ValueError())
+        self.assertEqual(limiter.limit, 1.25)
@@ -0,0 +1,74 @@
+import io
+import json
+import logging
+from logging.handlers import QueueListener
+from unittest import TestCase
+from unittest.mock import (
+    MagicMock,
+    patch,
+)
+
+from src.lib.logs import (
+    JsonFormatter,
+    SampledAccessLogger,
+    setup_logging,
+)
+
+
+def access_log(status: int, time: float, *, sample_rate: float, random_value: float) -> list[logging.LogRecord]:
+    logger = MagicMock()
+    access_logger = SampledAccessLogger(logger=logger, log_format="")
+    access_logger.sample_rate = sample_rate
+    request = MagicMock(remote="127.0.0.1", method="GET", path_qs="/api/v1/currencies/usd")
+    request.headers = {"User-Agent": "test"}
+    response = MagicMock(status=status, body_length=42)
+    with patch("src.lib.logs.random.random", return_value=random_value):
+        access_logger.log(request=request, response=response, time=time)
+    return [call.kwargs["extra"]["fields"] for call in logger.info.call_args_list]
+
+
+class TestJsonFormatter(TestCase):
+    def test_format(self) -> None:
+        record = logging.makeLogRecord(
+            {"name": "app", "levelname": "INFO", "msg": "hit %s", "args": ("usd",), "fields": {"status": 200}},
+        )
+        entry = json.loads(JsonFormatter().format(record))
+        self.assertEqual(
+            {key: entry[key] for key in ("level", "logger", "message", "status")},
+            {"level": "INFO", "logger": "app", "message": "hit usd", "status": 200},
+        )
+        self.assertTrue(entry["time"].endswith("+00:00"))
+        self.assertNotIn("exception", entry)
+
+
+class TestSetupLogging(TestCase):
+    def test_listener_writes_json_lines(self) -> None:
+        root = logging.getLogger()
+        handlers, level = root.handlers[:], root.level
+        stream = io.StringIO()
+        try:
+            with patch("src.lib.logs.sys.stdout", stream):
+                listener = setup_logging(json_lines=True)
+            self.assertIsInstance(listener, QueueListener)
+            logging.getLogger("test").error("failed for %s", "usd", exc_info=ValueError("boom"))
+            listener.stop()
+        finally:
+            root.handlers[:] = handlers
+            root.setLevel(level)
+        entry = json.loads(stream.getvalue())
+        self.assertEqual((entry["logger"], entry["message"]), ("test", "failed for usd"))
+        self.assertIn("ValueError: boom", entry["exception"])
+
+
+class TestSampledAccessLogger(TestCase):
+    def test_sampling(self) -> None:
+        self.assertEqual(access_log(status=200, time=0.01, sample_rate=0.1, random_value=0.5), [])
+        [fields] = access_log(status=200, time=0.01, sample_rate=0.1, random_value=0.05)
+        self.assertEqual((fields["status"], fields["size"], fields["sample_rate"]), (200, 42, 0.1))
+        self.assertEqual(fields["duration_ms"], 10.0)
+
+    def test_errors_and_slow_requests_always_logged(self) -> None:
+        [error] = access_log(status=500, time=0.01, sample_rate=0, random_value=0.5)
+        self.assertEqual((error["status"], error["sample_rate"]), (500, 1.0))
+        [slow] = access_log(status=200, time=10, sample_rate=0, random_value=0.5)
+        self.assertEqual((slow["path"], slow["sample_rate"]), ("/api/v1/currencies/usd", 1.0))
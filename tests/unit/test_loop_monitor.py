@@ -0,0 +1,41 @@
+import asyncio
+import time
+from unittest import (
+    IsolatedAsyncioTestCase,
+    TestCase,
+)
+
+from src.lib.loop_monitor import LoopLagMonitor
+
+
+class TestLoopLagHistogram(TestCase):
+    def test_record(self) -> None:
+        monitor = LoopLagMonitor()
+        for lag in (0.0005, 0.003, 0.003, 0.2, 5):
+            monitor.record(lag=lag)
+        stats = monitor.stats()
+        self.assertEqual(stats["samples"], 5)
+        self.assertEqual(stats["lag_le_1ms"], 1)
+        self.assertEqual(stats["lag_le_5ms"], 2)
+        self.assertEqual(stats["lag_le_250ms"], 1)
+        self.assertEqual(stats["lag_gt_1000ms"], 1)
+        self.assertEqual(stats["lag_ms"], 5000)
+        self.assertEqual(stats["max_lag_ms"], 5000)
+
+
+def block_event_loop(duration: float) -> None:
+    time.sleep(duration)
+
+
+class TestLoopWatchdog(IsolatedAsyncioTestCase):
+    async def test_blocking_callback_logged(self) -> None:
+        monitor = LoopLagMonitor(interval=0.01, block_threshold=0.05)
+        monitor.start()
+        await asyncio.sleep(0.02)
+        with self.assertLogs("src.lib.loop_monitor", level="WARNING") as logs:
+            block_event_loop(duration=0.2)
+            await asyncio.sleep(0.02)
+        await monitor.stop()
+        self.assertEqual(monitor.blocked, 1)
+        self.assertIn("block_event_loop", logs.output[0])
+        self.assertGreater(monitor.max_lag, 0.1)
@@ -0,0 +1,34 @@
+from unittest import TestCase
+from unittest.mock import patch
+
+from src.lib.memory_cache import MemoryCache
+
+
+class TestMemoryCache(TestCase):
+    def test_lru_eviction(self) -> None:
+        cache = MemoryCache(max_entries=2)
+        cache.set("a", b"1")
+        cache.set("b", b"2")
+        self.assertEqual(cache.get("a"), b"1")
+        cache.set("c", b"3")
+        self.assertNotIn("b", cache)
+        self.assertEqual(len(cache), 2)
+
+    def test_expiry(self) -> None:
+        cache = MemoryCache(ttl=10)
+        with patch("src.lib.memory_cache.time.monotonic", return_value=100.0):
+            cache.set("a", b"1")
+        with patch("src.lib.memory_cache.time.monotonic", return_value=105.0):
+            self.assertEqual(cache.get("a"), b"1")
+        with patch("src.lib.memory_cache.time.monotonic", return_value=110.0):
+            self.assertIsNone(cache.get("a"))
+
+    def test_stats(self) -> None:
+        cache = MemoryCache()
+        cache.set("a", b"123")
+        cache.get("a")
+        cache.get("b")
+        stats = cache.stats()
+        self.assertEqual(stats["entries"], 1)
+        self.assertEqual(stats["size_bytes"], 3)
+        self.assertEqual(stats["hit_rate"], 0.5)
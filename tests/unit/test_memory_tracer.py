@@ -0,0 +1,63 @@
+import tracemalloc
+from unittest import TestCase
+from unittest.mock import patch
+
+from src.lib.memory_tracer import MemoryTracer
+
+
+def allocate() -> list[bytes]:
+    return [bytes(1000) + bytes([number % 256]) for number in range(2000)]
+
+
+class TestMemoryTracer(TestCase):
+    def setUp(self) -> None:
+        self.tracer = MemoryTracer(frames=2, sample_rate=1)
+        self.tracer.start()
+        self.addCleanup(self.tracer.stop)
+
+    def test_report(self) -> None:
+        retained = allocate()
+        report = self.tracer.report(limit=5)
+        self.assertGreaterEqual(report["traced_bytes"], 2_000_000)
+        self.assertEqual(len(report["sites"]), 5)
+        self.assertIn("test_memory_tracer.py:", report["sites"][0]["site"])
+        self.assertFalse(report["diff"])
+
+        diff = self.tracer.report(diff=True, reset=True, group_by="traceback")
+        self.assertTrue(diff["diff"])
+        top = next(site for site in diff["sites"] if "test_memory_tracer.py" in site["site"])
+        self.assertGreaterEqual(top["size_diff"], 2_000_000)
+        self.assertEqual(top["site"].count(";"), 1)
+        del retained
+        shrunk = self.tracer.report(diff=True, group_by="filename")
+        self.assertLessEqual(min(site["size_diff"] for site in shrunk["sites"]), -2_000_000)
+
+        with self.assertRaises(ValueError):
+            self.tracer.report(group_by="module")
+
+    def test_measure(self) -> None:
+        with self.tracer.measure():
+            retained = allocate()
+        stats = self.tracer.stats()
+        self.assertEqual(stats["sampled_requests"], 1)
+        self.assertGreaterEqual(stats["max_retained_bytes"], 2_000_000)
+        self.assertGreaterEqual(stats["avg_net_blocks"], 2000)
+        del retained
+
+        with patch("src.lib.memory_tracer.random.random", return_value=0.5):
+            self.tracer._sample_rate = 0.1  # noqa: SLF001
+            with self.tracer.measure():
+                pass
+        self.assertEqual(self.tracer.stats()["sampled_requests"], 1)
+
+    def test_stop_keeps_external_tracing(self) -> None:
+        self.tracer.stop()
+        self.assertFalse(tracemalloc.is_tracing())
+        tracemalloc.start()
+        try:
+            tracer = MemoryTracer()
+            tracer.start()
+            tracer.stop()
+            self.assertTrue(tracemalloc.is_tracing())
+        finally:
+            tracemalloc.stop()
@@ -0,0 +1,52 @@
+import asyncio
+import time
+from unittest import IsolatedAsyncioTestCase
+
+from src.lib.profiler import SlowRequestProfiler
+
+
+def spin(duration: float) -> None:
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        pass
+
+
+class TestSlowRequestProfiler(IsolatedAsyncioTestCase):
+    async def asyncTearDown(self) -> None:
+        await asyncio.to_thread(self.profiler.stop)
+
+    async def test_slow_request_samples_kept(self) -> None:
+        self.profiler = SlowRequestProfiler(threshold=0, interval=0.001)
+        self.profiler.start()
+        with self.profiler.profile():
+            spin(duration=0.1)
+        collapsed = self.profiler.collapsed()
+        self.assertIn("spin (test_profiler.py:", collapsed)
+        self.assertIn(";spin", collapsed.splitlines()[0])
+        self.assertTrue(collapsed.splitlines()[0].rsplit(" ", 1)[1].isdigit())
+        self.assertEqual(self.profiler.stats()["slow_requests"], 1)
+        self.profiler.collapsed(reset=True)
+        self.assertEqual(self.profiler.collapsed(), "")
+
+    async def test_fast_request_samples_dropped(self) -> None:
+        self.profiler = SlowRequestProfiler(threshold=60, interval=0.001)
+        self.profiler.start()
+        with self.profiler.profile():
+            spin(duration=0.05)
+        self.assertEqual(self.profiler.collapsed(), "")
+        self.assertEqual(self.profiler.stats()["profiled_requests"], 1)
+        self.assertEqual(self.profiler.stats()["slow_requests"], 0)
+
+    async def test_samples_attributed_to_running_task(self) -> None:
+        self.profiler = SlowRequestProfiler(threshold=0, interval=0.001)
+        self.profiler.start()
+
+        async def idle() -> None:
+            with self.profiler.profile():
+                await asyncio.sleep(0.05)
+
+        async def busy() -> None:
+            spin(duration=0.1)
+
+        await asyncio.gather(idle(), busy())
+        self.assertNotIn("spin", self.profiler.collapsed())
@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import asyncio
+import datetime
+import tempfile
+from pathlib import Path
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import (
+    AsyncMock,
+    patch,
+)
+
+from aiohttp import ClientConnectionError
+from aiohttp.web_exceptions import HTTPNotFound
+
+from src.config import get_settings
+from src.lib.coders import json_encoder
+from src.lib.limiter import AdaptiveLimiter
+from src.lib.providers import (
+    DatasetProvider,
+    JsDelivrProvider,
+    RacingProvider,
+    RateProvider,
+    UpstreamStatusError,
+    get_upstream_limiter,
+)
+from src.lib.types import ResponseType
+
+DATE_AND_CURRENCY_API_URL = (
+    "https://cdn.jsdelivr.net/npm/@fawazahmed0/currency-api@{date}/v1/currencies/{currency}.json"
+)
+TEST_DATE = datetime.date(2024, 5, 1)
+
+
+class StubProvider(RateProvider):
+    def __init__(self, name: str, delay: float, result: ResponseType | BaseException) -> None:
+        self.name = name
+        self._delay = delay
+        self._result = result
+        self.cancelled = False
+
+    async def fetch(self, currency: str, for_date: datetime.date) -> ResponseType:  # noqa: ARG002
+        try:
+            await asyncio.sleep(self._delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if isinstance(self._result, BaseException):
+            raise self._result
+        return self._result
+
+    async def currencies(self) -> dict[str, str]:
+        await asyncio.sleep(self._delay)
+        if isinstance(self._result, BaseException):
+            raise self._result
+        return {self.name: self.name.title()}
+
+
+class TestJsDelivrProvider(IsolatedAsyncioTestCase):
+    @patch("aiohttp.ClientSession.get")
+    async def test_request_currency_info(self, mock_get: AsyncMock) -> None:
+        prepare_url = DATE_AND_CURRENCY_API_URL.format(
+            date=TEST_DATE,
+            currency="usd",
+        )
+        mock_get.return_value.__aenter__.return_value.status = 200
+        mock_get.return_value.__aenter__.return_value.json = AsyncMock(return_value={})
+        res = await JsDelivrProvider.request_currency_info(url=prepare_url)
+        self.assertIsNotNone(res)
+        with self.assertRaises(HTTPNotFound):
+            mock_get.return_value.__aenter__.return_value.status = 404
+            await JsDelivrProvider.request_currency_info(url=prepare_url)
+        mock_get.return_value.__aenter__.return_value.status = 503
+        with self.assertRaises(UpstreamStatusError) as raised:
+            await JsDelivrProvider.request_currency_info(url=prepare_url)
+        self.assertEqual(raised.exception.upstream_status, 503)
+
+    @patch.object(JsDelivrProvider, "request_currency_info")
+    async def test_fetch(self, request_currency_info: AsyncMock) -> None:
+        request_currency_info.return_value = {"date": "2024-05-01", "usd": {"eur": 1}}
+        provider = JsDelivrProvider(url_template=DATE_AND_CURRENCY_API_URL)
+        res = await provider.fetch(currency="usd", for_date=TEST_DATE)
+        self.assertEqual(res, {"date": "2024-05-01", "values": {"eur": 1}})
+        request_currency_info.assert_awaited_once_with(
+            url=DATE_AND_CURRENCY_API_URL.format(date="2024-05-01", currency="usd"),
+        )
+
+    @patch.object(JsDelivrProvider, "request_currency_info")
+    async def test_fetch_limited(self, request_currency_info: AsyncMock) -> None:
+        request_currency_info.side_effect = ClientConnectionError
+        limiter = AdaptiveLimiter(initial=4, failures=(ClientConnectionError,))
+        provider = JsDelivrProvider(url_template=DATE_AND_CURRENCY_API_URL, limiter=limiter)
+        with self.assertRaises(ClientConnectionError):
+            await provider.fetch(currency="usd", for_date=TEST_DATE)
+        self.assertEqual((limiter.calls, limiter.failed, limiter.limit, limiter.in_flight), (1, 1, 3, 0))
+
+    @patch.object(get_settings().api, "UPSTREAM_LIMIT_ENABLED", new=True)
+    @patch.object(JsDelivrProvider, "request_currency_info")
+    async def test_fetch_limited_upstream_status(self, request_currency_info: AsyncMock) -> None:
+        request_currency_info.side_effect = UpstreamStatusError(status=503)
+        get_upstream_limiter.cache_clear()
+        self.addCleanup(get_upstream_limiter.cache_clear)
+        limiter = get_upstream_limiter()
+        if limiter is None:
+            self.fail("The upstream limiter is not enabled")
+        initial = limiter.limit
+        provider = JsDelivrProvider(url_template=DATE_AND_CURRENCY_API_URL, limiter=limiter)
+        with self.assertRaises(UpstreamStatusError):
+            await provider.fetch(currency="usd", for_date=TEST_DATE)
+        self.assertEqual(limiter.failed, 1)
+        self.assertLess(limiter.limit, initial)
+
+
+class TestDatasetProvider(IsolatedAsyncioTestCase):
+    async def test_fetch(self) -> None:
+        with tempfile.TemporaryDirectory() as root:
+            provider = DatasetProvider(root=Path(root))
+            path = provider.path(currency="usd", for_date=TEST_DATE)
+            path.parent.mkdir()
+            path.write_bytes(json_encoder.encode({"date": "2024-05-01", "usd": {"eur": 0.93}}))
+            res = await provider.fetch(currency="usd", for_date=TEST_DATE)
+            self.assertEqual(res["date"], "2024-05-01")
+            self.assertEqual(str(res["values"]["eur"]), "0.93")
+            with self.assertRaises(HTTPNotFound):
+                await provider.fetch(currency="eur", for_date=TEST_DATE)
+
+    async def test_currencies(self) -> None:
+        with tempfile.TemporaryDirectory() as root:
+            provider = DatasetProvider(root=Path(root))
+            with self.assertRaises(FileNotFoundError):
+                await provider.currencies()
+            provider.currencies_path.write_bytes(json_encoder.encode({"usd": "US Dollar", "eur": "Euro"}))
+            self.assertEqual(await provider.currencies(), {"usd": "US Dollar", "eur": "Euro"})
+
+
+class TestRacingProvider(IsolatedAsyncioTestCase):
+    async def test_first_success_wins(self) -> None:
+        slow = StubProvider(name="slow", delay=10, result={"date": "slow", "values": {}})
+        fast = StubProvider(name="fast", delay=0, result={"date": "fast", "values": {}})
+        missing = StubProvider(name="missing", delay=0, result=HTTPNotFound())
+        provider = RacingProvider(providers=[slow, missing, fast])
+        res = await provider.fetch(currency="usd", for_date=TEST_DATE)
+        self.assertEqual(res["date"], "fast")
+        self.assertTrue(slow.cancelled)
+        self.assertEqual(provider.stats(), {"slow_wins": 0, "missing_wins": 0, "fast_wins": 1})
+
+    async def test_failures(self) -> None:
+        missing = StubProvider(name="missing", delay=0, result=HTTPNotFound())
+        down = StubProvider(name="down", delay=0.01, result=ClientConnectionError())
+        with self.assertRaises(ClientConnectionError):
+            await RacingProvider(providers=[missing, down]).fetch(currency="usd", for_date=TEST_DATE)
+        with self.assertRaises(HTTPNotFound):
+            await RacingProvider(providers=[missing]).fetch(currency="usd", for_date=TEST_DATE)
+
+    async def test_currencies(self) -> None:
+        down = StubProvider(name="down", delay=0, result=ClientConnectionError())
+        dataset = StubProvider(name="dataset", delay=0.01, result={"date": "dataset", "values": {}})
+        provider = RacingProvider(providers=[down, dataset])
+        self.assertEqual(await provider.currencies(), {"dataset": "Dataset"})
+        self.assertEqual(provider.stats(), {"down_wins": 0, "dataset_wins": 0})
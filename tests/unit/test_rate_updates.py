@@ -0,0 +1,88 @@
+import asyncio
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch
+
+from aiohttp import ServerDisconnectedError
+from aiohttp.web_exceptions import HTTPNotFound
+
+from src.lib.rate_updates import (
+    CLOSED,
+    RateBroadcaster,
+    encode_event,
+)
+
+
+class TestRateBroadcaster(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.documents = [b'{"v":1}', b'{"v":1}', b'{"v":2}']
+        self.polled: list[str] = []
+        self.broadcaster = RateBroadcaster(poll=self.poll, interval=0.01)
+
+    async def poll(self, currency: str) -> bytes:
+        self.polled.append(currency)
+        if len(self.documents) > 1:
+            return self.documents.pop(0)
+        return self.documents[0]
+
+    def test_encode_event(self) -> None:
+        self.assertEqual(encode_event(data=b"{}"), b"event: rates\ndata: {}\n\n")
+
+    async def test_single_poller_fan_out(self) -> None:
+        async with self.broadcaster.subscribe(currency="usd") as first:
+            async with self.broadcaster.subscribe(currency="usd") as second:
+                self.assertEqual(self.broadcaster.stats()["currencies"], 1)
+                for queue in (first, second):
+                    self.assertEqual(await queue.get(), encode_event(data=b'{"v":1}'))
+                    self.assertEqual(await queue.get(), encode_event(data=b'{"v":2}'))
+                self.assertEqual(set(self.polled), {"usd"})
+        self.assertEqual(self.broadcaster.stats()["currencies"], 0)
+
+    async def test_latest_frame_for_new_subscriber(self) -> None:
+        async with self.broadcaster.subscribe(currency="usd") as first:
+            await first.get()
+            async with self.broadcaster.subscribe(currency="usd") as second:
+                self.assertEqual(second.get_nowait(), encode_event(data=b'{"v":1}'))
+
+    async def test_slow_subscriber_keeps_latest(self) -> None:
+        broadcaster = RateBroadcaster(poll=self.poll, max_queue_size=1)
+        async with broadcaster.subscribe(currency="eur") as queue:
+            broadcaster.publish(currency="eur", frame=b"1")
+            broadcaster.publish(currency="eur", frame=b"2")
+            self.assertEqual(queue.get_nowait(), b"2")
+            self.assertGreaterEqual(broadcaster.frames_dropped, 1)
+            await broadcaster.close()
+            self.assertEqual(queue.get_nowait(), CLOSED)
+
+    async def test_poll_failure_keeps_previous(self) -> None:
+        async def failing_poll(_currency: str) -> bytes:
+            raise HTTPNotFound
+
+        broadcaster = RateBroadcaster(poll=failing_poll)
+        self.assertEqual(await broadcaster.poll_once(currency="usd", previous=b"{}"), b"{}")
+        await asyncio.sleep(0)
+
+    async def test_poll_unexpected_failure_keeps_polling(self) -> None:
+        failures = [ServerDisconnectedError(), ValueError("corrupt document")]
+
+        async def flaky_poll(_currency: str) -> bytes:
+            if failures:
+                raise failures.pop(0)
+            return b'{"v":1}'
+
+        broadcaster = RateBroadcaster(poll=flaky_poll, interval=0.01)
+        async with broadcaster.subscribe(currency="usd") as queue:
+            self.assertEqual(await asyncio.wait_for(queue.get(), timeout=1), encode_event(data=b'{"v":1}'))
+            self.assertGreaterEqual(broadcaster.polls, 3)
+
+    async def test_stopped_poller_restarted(self) -> None:
+        broadcaster = RateBroadcaster(poll=self.poll, interval=0.01)
+        poll_once = patch.object(broadcaster, "poll_once", side_effect=RuntimeError("bug"))
+        poll_once.start()
+        async with broadcaster.subscribe(currency="usd") as first:
+            with self.assertLogs("src.lib.rate_updates", level="ERROR"):
+                await asyncio.sleep(0.01)
+            self.assertEqual(broadcaster.stats()["currencies"], 0)
+            poll_once.stop()
+            async with broadcaster.subscribe(currency="usd") as second:
+                for queue in (first, second):
+                    self.assertEqual(await asyncio.wait_for(queue.get(), timeout=1), encode_event(data=b'{"v":1}'))
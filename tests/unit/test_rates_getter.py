@@ -9,13 +9,23 @@ from typing import (
 from unittest import IsolatedAsyncioTestCase
 from unittest.mock import (
     AsyncMock,
+    MagicMock,
     patch,
 )
 
+from aiohttp import ClientConnectionError
 from aiohttp.web_exceptions import HTTPNotFound
 
-from src.lib.coders import json_encoder
+from src.lib.coders import (
+    MSGPACK_FORMAT,
+    json_encoder,
+)
 from src.lib.currency_rates_getter import CurrencyRatesGetter
+from src.lib.providers import (
+    JsDelivrProvider,
+    UpstreamStatusError,
+)
+from src.lib.stale_fallback import StaleFallback
 from tests.data import DataHelper
 from tests.helpers import currency_info_response
 
@@ -71,6 +81,7 @@ class TestCurrencyRatesGetter(IsolatedAsyncioTestCase):
             for_date=cls.test_date,
             storage=cls.storage,
             key_template="",
+            provider=JsDelivrProvider(),
         )
 
     def test_cache_key(self) -> None:
@@ -87,23 +98,8 @@ class TestCurrencyRatesGetter(IsolatedAsyncioTestCase):
                 )
                 self.assertEqual(template.format(for_date=self.test_date, currency=currency), cache_key)
 
-    @patch("aiohttp.ClientSession.get")
-    async def test_request_currency_info(self, mock_get: AsyncMock) -> None:
-        prepare_url = DATE_AND_CURRENCY_API_URL.format(
-            date=self.test_date,
-            currency=self.currency,
-        )
-        mock_get.return_value.__aenter__.return_value.status = 200
-        mock_get.return_value.__aenter__.return_value.json = AsyncMock(return_value={})
-        res = await CurrencyRatesGetter.request_currency_info(url=prepare_url)
-        self.assertIsNotNone(res)
-        with self.assertRaises(HTTPNotFound):
-            mock_get.return_value.__aenter__.return_value.status = 404
-            await CurrencyRatesGetter.request_currency_info(url=prepare_url)
-
-
-    @patch("src.lib.currency_rates_getter.settings.api.CURRENCY_API_WITH_DATE_URL", DATE_AND_CURRENCY_API_URL)
-    @patch.object(CurrencyRatesGetter, "request_currency_info")
+    @patch("src.lib.providers.settings.api.CURRENCY_API_WITH_DATE_URL", DATE_AND_CURRENCY_API_URL)
+    @patch.object(JsDelivrProvider, "request_currency_info")
     async def test_read_currency_info_for_date(self, req_currency_info: AsyncMock) -> None:
         decimal_exchange_rates = data_helper.convert_exchange_rate_values(
             source_currency=self.currency,
@@ -144,3 +140,135 @@ class TestCurrencyRatesGetter(IsolatedAsyncioTestCase):
         currency_info_from_cache.return_value = None
         await self.rates_getter.get_currency_info()
         get_and_cache.assert_called_once()
+
+    @patch.object(CurrencyRatesGetter, "get_and_cache_currency_info")
+    @patch.object(CurrencyRatesGetter, "get_currency_info_from_cache")
+    async def test_get_currency_info_admission(
+        self,
+        currency_info_from_cache: AsyncMock,
+        get_and_cache: AsyncMock,
+    ) -> None:
+        admission = MagicMock()
+        rates_getter = CurrencyRatesGetter(
+            currency=self.currency,
+            for_date=self.test_date,
+            storage=self.storage,
+            admission=admission,
+        )
+        currency_info_from_cache.return_value = json_encoder.encode(self.currency_info)
+        await rates_getter.get_currency_info()
+        admission.miss_slot.assert_not_called()
+        currency_info_from_cache.return_value = None
+        await rates_getter.get_currency_info()
+        admission.miss_slot.assert_called_once()
+        get_and_cache.assert_called_once()
+
+    async def test_get_currency_info_from_cache_transcodes(self) -> None:
+        storage = AsyncMock()
+        rates_getter = CurrencyRatesGetter(
+            currency=self.currency,
+            for_date=self.test_date,
+            storage=storage,
+            key_template="{for_date}-{currency}.json",
+            media_format=MSGPACK_FORMAT,
+        )
+        msgpack_bytes = MSGPACK_FORMAT.encoder.encode(self.currency_info)
+        storage.read_currency_info.side_effect = [None, json_encoder.encode(self.currency_info)]
+        storage.cache_currency_info.return_value = msgpack_bytes
+        res = await rates_getter.get_currency_info_from_cache()
+        self.assertEqual(res, msgpack_bytes)
+        storage.cache_currency_info.assert_called_once_with(
+            info=self.currency_info,
+            key=f"{self.test_date.isoformat()}-{self.currency}.msgpack",
+            encoder=MSGPACK_FORMAT.encoder,
+        )
+
+    @patch.object(CurrencyRatesGetter, "get_and_cache_currency_info")
+    @patch.object(CurrencyRatesGetter, "get_currency_info_from_cache")
+    async def test_get_currency_info_stale_fallback(
+        self,
+        currency_info_from_cache: AsyncMock,
+        get_and_cache: AsyncMock,
+    ) -> None:
+        storage = AsyncMock()
+        fallback = StaleFallback(cooldown=60)
+        yesterday = self.test_date - datetime.timedelta(days=1)
+        fallback.index.add(currency=self.currency, for_date=yesterday)
+        stale_bytes = json_encoder.encode(self.currency_info)
+        storage.read_stale_currency_info.return_value = stale_bytes
+        currency_info_from_cache.return_value = None
+        get_and_cache.side_effect = ClientConnectionError
+
+        rates_getter = CurrencyRatesGetter(
+            currency=self.currency,
+            for_date=self.test_date,
+            storage=storage,
+            key_template="{for_date}-{currency}.json",
+            fallback=fallback,
+        )
+        self.assertEqual(await rates_getter.get_currency_info(), stale_bytes)
+        self.assertEqual(rates_getter.stale_date, yesterday)
+        storage.read_stale_currency_info.assert_called_once_with(key=f"{yesterday.isoformat()}-{self.currency}.json")
+        self.assertTrue(fallback.is_degraded())
+
+        rates_getter = CurrencyRatesGetter(
+            currency=self.currency,
+            for_date=self.test_date,
+            storage=storage,
+            fallback=fallback,
+        )
+        self.assertEqual(await rates_getter.get_currency_info(), stale_bytes)
+        get_and_cache.assert_called_once()
+        self.assertEqual(fallback.stats()["served_stale"], 2)
+
+    @patch("src.lib.currency_rates_getter.coverage_window")
+    @patch.object(JsDelivrProvider, "request_currency_info")
+    async def test_get_currency_info_upstream_error_trips_fallback(
+        self,
+        request_currency_info: AsyncMock,
+        coverage_window: MagicMock,
+    ) -> None:
+        storage = AsyncMock()
+        storage.read_currency_info.return_value = None
+        stale_bytes = json_encoder.encode(self.currency_info)
+        storage.read_stale_currency_info.return_value = stale_bytes
+        fallback = StaleFallback(cooldown=60)
+        last_week = self.test_date - datetime.timedelta(days=7)
+        fallback.index.add(currency=self.currency, for_date=last_week - datetime.timedelta(days=1))
+        request_currency_info.side_effect = UpstreamStatusError(status=503)
+
+        rates_getter = CurrencyRatesGetter(
+            currency=self.currency,
+            for_date=last_week,
+            storage=storage,
+            fallback=fallback,
+            provider=JsDelivrProvider(),
+        )
+        self.assertEqual(await rates_getter.get_currency_info(), stale_bytes)
+        self.assertTrue(fallback.is_degraded())
+        coverage_window.observe.assert_not_called()
+
+    @patch.object(CurrencyRatesGetter, "get_and_cache_currency_info")
+    @patch.object(CurrencyRatesGetter, "get_currency_info_from_cache")
+    async def test_get_currency_info_stale_fallback_not_found(
+        self,
+        currency_info_from_cache: AsyncMock,
+        get_and_cache: AsyncMock,
+    ) -> None:
+        storage = AsyncMock()
+        fallback = StaleFallback(cooldown=60)
+        last_year = self.test_date - datetime.timedelta(days=365)
+        fallback.index.add(currency=self.currency, for_date=last_year - datetime.timedelta(days=1))
+        currency_info_from_cache.return_value = None
+        get_and_cache.side_effect = HTTPNotFound
+
+        rates_getter = CurrencyRatesGetter(
+            currency=self.currency,
+            for_date=last_year,
+            storage=storage,
+            fallback=fallback,
+        )
+        with self.assertRaises(HTTPNotFound):
+            await rates_getter.get_currency_info()
+        storage.read_stale_currency_info.assert_not_called()
+        self.assertFalse(fallback.is_degraded())
@@ -0,0 +1,59 @@
+from unittest import IsolatedAsyncioTestCase
+
+from fakeredis import FakeServer
+from fakeredis.aioredis import FakeConnection
+from redis.asyncio import Redis
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from src.config import RedisConfig
+from src.lib.redis_pool import InstrumentedConnectionPool
+
+
+class TestInstrumentedConnectionPool(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.server = FakeServer()
+        self.pool = InstrumentedConnectionPool(
+            connection_class=FakeConnection,
+            server=self.server,
+            max_connections=1,
+            timeout=0.05,
+        )
+
+    async def asyncTearDown(self) -> None:
+        await self.pool.disconnect()
+
+    async def test_stats(self) -> None:
+        redis = Redis(connection_pool=self.pool)
+        await redis.set("key", b"value")
+        self.assertEqual(await redis.get("key"), b"value")
+        stats = self.pool.stats()
+        self.assertEqual(stats["acquired"], 2)
+        self.assertEqual(stats["created"], 1)
+        self.assertEqual(stats["in_use"], 0)
+
+    async def test_blocking_timeout(self) -> None:
+        connection = await self.pool.get_connection()
+        self.assertEqual(self.pool.stats()["in_use"], 1)
+        with self.assertRaises(RedisConnectionError):
+            await self.pool.get_connection()
+        self.assertEqual(self.pool.timeouts, 1)
+        self.assertEqual(self.pool.connect_errors, 0)
+        await self.pool.release(connection)
+
+    async def test_connect_error(self) -> None:
+        self.server.connected = False
+        with self.assertRaises(RedisConnectionError):
+            await self.pool.get_connection()
+        self.assertEqual((self.pool.timeouts, self.pool.connect_errors), (0, 1))
+        stats = self.pool.stats()
+        self.assertEqual((stats["acquired"], stats["in_use"]), (1, 0))
+
+
+class TestRedisConfigPool(IsolatedAsyncioTestCase):
+    async def test_clients_share_pool(self) -> None:
+        config = RedisConfig(MAX_CONNECTIONS=3, POOL_TIMEOUT=1)
+        first, second = config.client, config.client
+        self.assertIs(first.connection_pool, second.connection_pool)
+        self.assertEqual(config.pool.max_connections, 3)
+        await config.close_pool()
+        self.assertIsNot(config.client.connection_pool, first.connection_pool)
@@ -4,8 +4,15 @@ from unittest import IsolatedAsyncioTestCase
 
 from fakeredis import FakeAsyncRedis
 
-from src.lib.cache_storage import RedisStorage
+from src.lib.cache_storage import (
+    RedisHashStorage,
+    RedisStorage,
+)
 from src.lib.coders import json_encoder
+from src.lib.compression import (
+    COMPRESSED_FLAG,
+    ValueCodec,
+)
 from src.lib.types import CurrencyInfo
 from tests.data import DataHelper
 from tests.helpers import currency_info_response
@@ -74,3 +81,66 @@ class TestRedisStorage(IsolatedAsyncioTestCase):
         await self.redis_storage._redis_client.delete(self.key)  # noqa: SLF001
         res_none = await self.redis_storage.read_currency_info(self.key)
         self.assertIsNone(res_none)
+
+    async def test_compression(self) -> None:
+        currency_info_bytes = json_encoder.encode(self.currency_info)
+        storage = RedisStorage(redis_client=self.redis_client, expire=60, codec=ValueCodec(min_size=0, min_saving=0))
+        await self.redis_client.set(name=self.key, value=currency_info_bytes)
+        self.assertEqual(await storage.read_currency_info(key=self.key), currency_info_bytes)
+        await storage.cache_encoded(key=self.key, value=currency_info_bytes)
+        stored = await self.redis_client.get(name=self.key)
+        self.assertTrue(stored.startswith(COMPRESSED_FLAG))
+        self.assertEqual(await storage.read_currency_info(key=self.key), currency_info_bytes)
+
+
+class TestRedisHashStorage(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.redis_client = FakeAsyncRedis()
+        self.storage = RedisHashStorage(redis_client=self.redis_client, expire=60, dual_read=True)
+        self.day = datetime.date(2024, 5, 1)
+
+    async def asyncTearDown(self) -> None:
+        await self.redis_client.flushall()
+        await self.redis_client.connection_pool.disconnect()
+
+    async def test_day_hash(self) -> None:
+        await self.storage.cache_encoded_many(entries={"2024-05-01-usd": b"1", "2024-05-01-usd.msgpack": b"2"})
+        await self.storage.cache_encoded(key="2024-05-02-usd", value=b"3")
+        self.assertEqual(await self.redis_client.hgetall("rates:2024-05-01"), {b"usd": b"1", b"usd.msgpack": b"2"})
+        self.assertEqual(await self.redis_client.ttl("rates:2024-05-01"), -1)
+        await self.storage.cache_encoded(key=f"{CURRENT_DATE.isoformat()}-usd", value=b"4")
+        self.assertIn(await self.redis_client.ttl(f"rates:{CURRENT_DATE.isoformat()}"), {59, 60})
+        self.assertEqual(await self.storage.read_currency_info(key="2024-05-01-usd.msgpack"), b"2")
+        self.assertIsNone(await self.storage.read_currency_info(key="2024-05-01-eur"))
+        self.assertEqual(
+            await self.storage.read_day(for_date=self.day),
+            {"2024-05-01-usd": b"1", "2024-05-01-usd.msgpack": b"2"},
+        )
+        self.assertEqual(
+            sorted(await self.storage.cached_keys()),
+            ["2024-05-01-usd", "2024-05-01-usd.msgpack", "2024-05-02-usd", f"{CURRENT_DATE.isoformat()}-usd"],
+        )
+        await self.storage.invalidate_day(for_date=self.day)
+        self.assertEqual(await self.storage.read_day(for_date=self.day), {})
+        self.assertEqual(
+            sorted(await self.storage.cached_keys()),
+            ["2024-05-02-usd", f"{CURRENT_DATE.isoformat()}-usd"],
+        )
+
+    async def test_dual_read(self) -> None:
+        await self.redis_client.setex("2024-05-01-eur", 30, b"1")
+        self.assertEqual(await self.storage.read_currency_info(key="2024-05-01-eur"), b"1")
+        self.assertEqual(await self.redis_client.hget("rates:2024-05-01", "eur"), b"1")
+        self.assertEqual(self.storage.legacy_reads, 1)
+        storage = RedisHashStorage(redis_client=self.redis_client, expire=60)
+        self.assertIsNone(await storage.read_currency_info(key="2024-05-01-rub"))
+
+    async def test_migrate(self) -> None:
+        await self.redis_client.setex("2024-05-01-eur", 30, b"1")
+        await self.redis_client.setex("2024-05-01-usd", 40, b"2")
+        await self.redis_client.setex("2024-05-02-usd", 50, b"3")
+        self.assertEqual(await self.storage.migrate(batch_size=2), 3)
+        self.assertEqual(await self.storage.read_currency_info(key="2024-05-01-usd"), b"2")
+        self.assertEqual(await self.redis_client.keys("2024-*"), [])
+        self.assertEqual(await self.redis_client.hgetall("rates:2024-05-01"), {b"eur": b"1", b"usd": b"2"})
+        self.assertIn(await self.redis_client.ttl("rates:2024-05-02"), {49, 50})
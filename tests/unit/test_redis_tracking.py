@@ -0,0 +1,144 @@
+import asyncio
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import (
+    MagicMock,
+    patch,
+)
+
+from fakeredis import FakeAsyncRedis
+from redis.asyncio import ConnectionPool
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from src.lib.cache_storage import RedisStorage
+from src.lib.redis_tracking import ClientSideCache
+
+
+class DroppingConnection:
+    """Tracking connection whose first instance is dropped by the server while listening."""
+
+    connects = 0
+    error: Exception = RedisConnectionError("Connection closed by server.")
+
+    def __init__(self, **_kwargs: object) -> None:
+        self._parser = MagicMock()
+        self.pid = 0
+
+    async def connect(self) -> None:
+        DroppingConnection.connects += 1
+
+    async def can_read_destructive(self) -> bool:
+        return False
+
+    async def disconnect(self) -> None:
+        pass
+
+    async def re_auth(self) -> None:
+        pass
+
+    async def send_command(self, *_args: object) -> None:
+        pass
+
+    async def read_response(self, *, push_request: bool = False) -> bytes:
+        if not push_request:
+            return b"OK"
+        if DroppingConnection.connects == 1:
+            raise DroppingConnection.error
+        await asyncio.Event().wait()
+        return b""
+
+
+class TestClientSideCache(IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.client_cache = ClientSideCache(url="redis://localhost:6379/0")
+        self.client_cache._tracking = True  # noqa: SLF001
+
+    def test_bypassed_without_tracking(self) -> None:
+        self.client_cache._tracking = False  # noqa: SLF001
+        self.client_cache.store(key="a", value=b"1", token=self.client_cache.begin_read())
+        self.assertIsNone(self.client_cache.get(key="a"))
+
+    async def test_push_invalidation(self) -> None:
+        self.client_cache.store(key="a", value=b"1", token=self.client_cache.begin_read())
+        self.client_cache.store(key="b", value=b"2", token=self.client_cache.begin_read())
+        await self.client_cache.handle_push_message([b"invalidate", [b"a"]])
+        self.assertIsNone(self.client_cache.get(key="a"))
+        self.assertEqual(self.client_cache.get(key="b"), b"2")
+        await self.client_cache.handle_push_message([b"invalidate", None])
+        self.assertIsNone(self.client_cache.get(key="b"))
+
+    @patch("src.lib.redis_tracking.RECONNECT_DELAY_SECONDS", 0)
+    async def test_tracking_resumes_after_disconnect(self) -> None:
+        DroppingConnection.connects = 0
+        client_cache = ClientSideCache(url="redis://localhost:6379/0")
+        client_cache._pool = ConnectionPool(connection_class=DroppingConnection, max_connections=1)  # noqa: SLF001
+        client_cache.local.set("untracked", b"1")
+        client_cache.start()
+        try:
+            for _ in range(100):
+                if client_cache.reconnects and client_cache.is_tracking:
+                    break
+                await asyncio.sleep(0.01)
+            self.assertTrue(client_cache.is_tracking)
+            self.assertEqual((client_cache.reconnects, DroppingConnection.connects), (1, 2))
+            self.assertNotIn("untracked", client_cache.local)
+        finally:
+            await client_cache.stop()
+
+    @patch("src.lib.redis_tracking.RECONNECT_DELAY_SECONDS", 0)
+    async def test_tracking_resumes_after_unexpected_error(self) -> None:
+        DroppingConnection.connects = 0
+        client_cache = ClientSideCache(url="redis://localhost:6379/0")
+        client_cache._pool = ConnectionPool(connection_class=DroppingConnection, max_connections=1)  # noqa: SLF001
+        with (
+            patch.object(DroppingConnection, "error", ValueError("unexpected push message")),
+            self.assertLogs("src.lib.redis_tracking", level="ERROR") as logs,
+        ):
+            client_cache.start()
+            try:
+                for _ in range(100):
+                    if client_cache.reconnects and client_cache.is_tracking:
+                        break
+                    await asyncio.sleep(0.01)
+                self.assertTrue(client_cache.is_tracking)
+                self.assertEqual(client_cache.reconnects, 1)
+            finally:
+                await client_cache.stop()
+        self.assertIn("unexpected push message", logs.output[0])
+
+    def test_invalidated_while_reading(self) -> None:
+        token = self.client_cache.begin_read()
+        self.client_cache.invalidate(["a"])
+        self.client_cache.store(key="a", value=b"stale", token=token)
+        self.assertIsNone(self.client_cache.get(key="a"))
+        self.client_cache.store(key="a", value=b"fresh", token=self.client_cache.begin_read())
+        self.assertEqual(self.client_cache.get(key="a"), b"fresh")
+
+
+class TestRedisStorageClientCache(IsolatedAsyncioTestCase):
+    redis_client: FakeAsyncRedis
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.redis_client = FakeAsyncRedis()
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop=loop)
+        loop.run_until_complete(cls.redis_client.connection_pool.disconnect())
+        loop.close()
+
+    async def asyncTearDown(self) -> None:
+        await self.redis_client.delete("test_key")
+
+    async def test_read_currency_info(self) -> None:
+        client_cache = ClientSideCache(url="redis://localhost:6379/0")
+        client_cache._tracking = True  # noqa: SLF001
+        storage = RedisStorage(redis_client=self.redis_client, expire=60, client_cache=client_cache)
+        await self.redis_client.set(name="test_key", value=b"{}")
+        self.assertEqual(await storage.read_currency_info(key="test_key"), b"{}")
+        await self.redis_client.delete("test_key")
+        self.assertEqual(await storage.read_currency_info(key="test_key"), b"{}")
+        self.assertEqual(client_cache.local.hits, 1)
+        client_cache.invalidate(["test_key"])
+        self.assertIsNone(await storage.read_currency_info(key="test_key"))
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import asyncio
+from unittest import IsolatedAsyncioTestCase
+
+from aiohttp.web_exceptions import HTTPNotFound
+from fakeredis import FakeAsyncRedis
+
+from src.lib.single_flight import SingleFlight
+
+
+class Upstream:
+    def __init__(self, delay: float = 0.01, error: BaseException | None = None) -> None:
+        self.cache: dict[str, bytes] = {}
+        self.fetches = 0
+        self._delay = delay
+        self._error = error
+
+    async def fetch(self) -> bytes:
+        self.fetches += 1
+        await asyncio.sleep(self._delay)
+        if self._error is not None:
+            raise self._error
+        self.cache["key"] = b"rates"
+        return b"rates"
+
+    async def read(self) -> bytes | None:
+        return self.cache.get("key")
+
+
+class TestSingleFlight(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.redis_client = FakeAsyncRedis()
+
+    async def asyncTearDown(self) -> None:
+        await self.redis_client.flushall()
+        await self.redis_client.connection_pool.disconnect()
+
+    async def test_local(self) -> None:
+        upstream = Upstream()
+        single_flight = SingleFlight()
+        results = await asyncio.gather(
+            *(single_flight.do(key="key", fetch=upstream.fetch, read=upstream.read) for _ in range(5)),
+        )
+        self.assertEqual(results, [b"rates"] * 5)
+        self.assertEqual(upstream.fetches, 1)
+        self.assertEqual(single_flight.stats()["saved"], 4)
+
+        failing = Upstream(error=HTTPNotFound())
+        calls = [single_flight.do(key="other", fetch=failing.fetch, read=failing.read) for _ in range(2)]
+        for result in await asyncio.gather(*calls, return_exceptions=True):
+            self.assertIsInstance(result, HTTPNotFound)
+        self.assertEqual(failing.fetches, 1)
+        self.assertEqual(single_flight.stats()["in_flight"], 0)
+
+    async def test_cluster(self) -> None:
+        upstream = Upstream(delay=0.05)
+        instances = [SingleFlight(redis_client=self.redis_client, poll_interval=0.01) for _ in range(3)]
+        results = await asyncio.gather(
+            *(instance.do(key="key", fetch=upstream.fetch, read=upstream.read) for instance in instances),
+        )
+        self.assertEqual(results, [b"rates"] * 3)
+        self.assertEqual(upstream.fetches, 1)
+        self.assertEqual(sum(instance.remote_shared for instance in instances), 2)
+
+    async def test_takeover(self) -> None:
+        failing = Upstream(delay=0.02, error=ConnectionError())
+        upstream = Upstream()
+        holder = SingleFlight(redis_client=self.redis_client)
+        waiter = SingleFlight(redis_client=self.redis_client, poll_interval=0.01)
+        failed, result = await asyncio.gather(
+            holder.do(key="key", fetch=failing.fetch, read=failing.read),
+            waiter.do(key="key", fetch=upstream.fetch, read=upstream.read),
+            return_exceptions=True,
+        )
+        self.assertIsInstance(failed, ConnectionError)
+        self.assertEqual(result, b"rates")
+        self.assertEqual((waiter.takeovers, upstream.fetches), (1, 1))
+
+    async def test_crashed_holder(self) -> None:
+        await self.redis_client.set("lease:key", "crashed", px=50)
+        upstream = Upstream()
+        waiter = SingleFlight(redis_client=self.redis_client, poll_interval=0.01)
+        self.assertEqual(await waiter.do(key="key", fetch=upstream.fetch, read=upstream.read), b"rates")
+        self.assertEqual(waiter.takeovers, 1)
+
+    async def test_wait_timeout(self) -> None:
+        await self.redis_client.set("lease:key", "stuck", px=10_000)
+        upstream = Upstream()
+        waiter = SingleFlight(redis_client=self.redis_client, poll_interval=0.01, wait_timeout=0.05)
+        self.assertEqual(await waiter.do(key="key", fetch=upstream.fetch, read=upstream.read), b"rates")
+        self.assertEqual(waiter.timeouts, 1)
@@ -0,0 +1,50 @@
+from unittest import TestCase
+
+from src.lib.sketch import (
+    CountMinSketch,
+    HeavyHitters,
+)
+
+
+class TestCountMinSketch(TestCase):
+    def test_estimate(self) -> None:
+        sketch = CountMinSketch(width=64, depth=4)
+        for number in range(1000):
+            sketch.add(key=f"key-{number % 100}")
+        sketch.add(key="hot", count=500)
+        self.assertGreaterEqual(sketch.estimate(key="hot"), 500)
+        self.assertGreaterEqual(sketch.estimate(key="key-1"), 10)
+        self.assertEqual(sketch.total, 1500)
+        sketch.clear()
+        self.assertEqual(sketch.estimate(key="hot"), 0)
+
+    def test_rows_hashed_independently(self) -> None:
+        sketch = CountMinSketch(width=16, depth=4)
+        rows_by_prefix: dict[tuple[int, int], set[tuple[int, ...]]] = {}
+        for number in range(2000):
+            indexes = sketch._indexes(key=f"key-{number}")  # noqa: SLF001
+            rows_by_prefix.setdefault((indexes[0], indexes[1]), set()).add(tuple(indexes[2:]))
+        self.assertTrue(any(len(rows) > 1 for rows in rows_by_prefix.values()))
+
+
+class TestHeavyHitters(TestCase):
+    def test_top(self) -> None:
+        heavy_hitters = HeavyHitters(k=3)
+        for number in range(1, 11):
+            for _ in range(number * 10):
+                heavy_hitters.add(key=f"2024-06-{number:02}/usd")
+        self.assertEqual(
+            [key for key, _count in heavy_hitters.top()],
+            ["2024-06-10/usd", "2024-06-09/usd", "2024-06-08/usd"],
+        )
+        self.assertEqual(heavy_hitters.top(limit=1), [("2024-06-10/usd", 100)])
+        self.assertEqual(heavy_hitters.stats(), {"total": 550, "tracked": 3})
+
+    def test_new_key_replaces_least_frequent(self) -> None:
+        heavy_hitters = HeavyHitters(k=2)
+        heavy_hitters.add(key="a", count=5)
+        heavy_hitters.add(key="b", count=1)
+        heavy_hitters.add(key="c", count=3)
+        self.assertEqual(heavy_hitters.top(), [("a", 5), ("c", 3)])
+        heavy_hitters.clear()
+        self.assertEqual(heavy_hitters.top(), [])
@@ -0,0 +1,77 @@
+import tempfile
+import time
+from pathlib import Path
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import (
+    AsyncMock,
+    patch,
+)
+
+from src.lib.currency_check_exists import CheckCurrencyExists
+from src.lib.memory_cache import MemoryCache
+from src.lib.snapshot import CacheSnapshot
+
+
+class TestCacheSnapshot(IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp_dir.name) / "snapshot.msgpack"
+        self.snapshot = CacheSnapshot(path=self.path, max_entries=2)
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    async def test_save_and_restore(self) -> None:
+        local_cache = MemoryCache()
+        local_cache.set("cold", b"1")
+        local_cache.set("warm", b"2", ttl=60)
+        local_cache.set("hot", b"3")
+        await self.snapshot.save(local_cache=local_cache, registry=CheckCurrencyExists({"usd", "eur"}))
+        self.assertTrue(self.path.is_file())
+
+        restored_cache = MemoryCache()
+        registry = CheckCurrencyExists()
+        restored = await self.snapshot.restore(local_cache=restored_cache, registry=registry)
+        self.assertEqual(restored, 2)
+        self.assertEqual(registry.cached_currencies, {"usd", "eur"})
+        self.assertIsNotNone(registry.expires_at)
+        self.assertNotIn("cold", restored_cache)
+        self.assertEqual([key for key, _, _ in restored_cache.hottest(limit=2)], ["hot", "warm"])
+        _, _, ttl = restored_cache.hottest(limit=2)[1]
+        self.assertIsNotNone(ttl)
+
+    async def test_restore_skips_expired_entries(self) -> None:
+        data = self.snapshot.build(local_cache=None, registry=CheckCurrencyExists())
+        self.assertEqual(data.entries, [])
+        local_cache = MemoryCache()
+        local_cache.set("expiring", b"1", ttl=60)
+        data = self.snapshot.build(local_cache=local_cache, registry=CheckCurrencyExists())
+        data.entries[0].expires_at = 0.0
+        self.assertEqual(CacheSnapshot.restore_entries(local_cache=MemoryCache(), entries=data.entries), 0)
+
+    async def test_restore_without_snapshot(self) -> None:
+        registry = CheckCurrencyExists()
+        restored = await self.snapshot.restore(local_cache=MemoryCache(), registry=registry)
+        self.assertEqual(restored, 0)
+        self.assertFalse(registry.cached_currencies)
+        self.path.write_bytes(b"garbage")
+        self.assertIsNone(self.snapshot.read())
+
+    async def test_restored_currencies_expire(self) -> None:
+        await self.snapshot.save(local_cache=None, registry=CheckCurrencyExists({"usd"}))
+        registry = CheckCurrencyExists()
+        await self.snapshot.restore(local_cache=None, registry=registry)
+        expires_at = registry.expires_at
+        self.assertIsNotNone(expires_at)
+        await self.snapshot.save(local_cache=None, registry=registry)
+        self.assertEqual(self.snapshot.read().currencies_expire_at, expires_at)  # type: ignore[union-attr]
+
+        registry.expires_at = time.time()
+        with patch.object(CheckCurrencyExists, "get_all_currencies", AsyncMock(return_value={"usd": "", "eur": ""})):
+            self.assertTrue(await registry.is_currency_exists(currency="eur"))
+        self.assertEqual(registry.cached_currencies, {"usd", "eur"})
+        self.assertIsNone(registry.expires_at)
+
+        expired = CheckCurrencyExists()
+        self.assertFalse(expired.restore(currencies=["usd"], expires_at=time.time() - 1))
+        self.assertFalse(expired.cached_currencies)
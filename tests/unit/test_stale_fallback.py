@@ -0,0 +1,48 @@
+import datetime
+from unittest import TestCase
+
+from src.lib.stale_fallback import (
+    DateIndex,
+    StaleFallback,
+)
+
+
+class TestDateIndex(TestCase):
+    def test_earlier(self) -> None:
+        index = DateIndex()
+        for key in (
+            "2024-05-03-usd.json",
+            "2024-05-01-usd.json",
+            "2024-05-01-usd.msgpack",
+            "2024-05-02-eur",
+            "2024-05-05-usd",
+            "not-a-date.json",
+        ):
+            index.add_key(key=key)
+        self.assertEqual(len(index), 4)
+        self.assertEqual(
+            index.earlier(currency="usd", for_date=datetime.date(2024, 5, 5), limit=3),
+            [datetime.date(2024, 5, 3), datetime.date(2024, 5, 1)],
+        )
+        self.assertEqual(
+            index.earlier(currency="usd", for_date=datetime.date(2024, 5, 4), limit=1),
+            [datetime.date(2024, 5, 3)],
+        )
+        self.assertEqual(index.earlier(currency="eur", for_date=datetime.date(2024, 5, 2), limit=3), [])
+        index.discard(currency="usd", for_date=datetime.date(2024, 5, 3))
+        self.assertEqual(
+            index.earlier(currency="usd", for_date=datetime.date(2024, 5, 4), limit=3),
+            [datetime.date(2024, 5, 1)],
+        )
+
+
+class TestStaleFallback(TestCase):
+    def test_degraded(self) -> None:
+        fallback = StaleFallback(cooldown=60)
+        self.assertFalse(fallback.is_degraded())
+        fallback.trip()
+        fallback.trip()
+        self.assertTrue(fallback.is_degraded())
+        self.assertEqual(fallback.stats()["trips"], 1)
+        self.assertTrue(StaleFallback(cooldown=0, forced=True).is_degraded())
+        self.assertFalse(StaleFallback(cooldown=0).is_degraded())
@@ -0,0 +1,69 @@
+import datetime
+import math
+import tempfile
+from decimal import Decimal
+from pathlib import Path
+from unittest import IsolatedAsyncioTestCase
+
+from src.lib.timeseries import TimeSeriesStore
+from src.lib.types import (
+    CurrencyInfo,
+    CurrencyValue,
+)
+
+START_DATE = datetime.date(2024, 5, 1)
+
+
+def usd_rates(for_date: datetime.date, eur: str) -> CurrencyInfo:
+    return CurrencyInfo(
+        date=for_date,
+        currency="usd",
+        values=[CurrencyValue(currency="eur", value=Decimal(eur)), CurrencyValue(currency="usd", value=1)],
+    )
+
+
+class TestTimeSeriesStore(IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.store = TimeSeriesStore(root=Path(self.tmp_dir.name) / "timeseries")
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    async def test_window(self) -> None:
+        self.assertEqual(self.store.window(base="usd", target="eur", start=START_DATE, end=START_DATE), [])
+        for offset, eur in ((0, "0.9"), (1, "0.8"), (3, "1.0")):
+            await self.store.record(info=usd_rates(for_date=START_DATE + datetime.timedelta(days=offset), eur=eur))
+        values = self.store.window(
+            base="usd",
+            target="eur",
+            start=START_DATE - datetime.timedelta(days=10),
+            end=START_DATE + datetime.timedelta(days=10),
+        )
+        self.assertEqual(values, [0.9, 0.8, 1.0])
+        next_date = START_DATE + datetime.timedelta(days=1)
+        self.assertEqual(self.store.window(base="usd", target="eur", start=next_date, end=START_DATE), [])
+
+    async def test_stats(self) -> None:
+        self.assertEqual(
+            await self.store.stats(base="usd", targets=["eur"], start=START_DATE, end=START_DATE),
+            {"eur": {"count": 0}},
+        )
+        for offset, eur in enumerate(("0.8", "1.0", "0.9")):
+            await self.store.record(info=usd_rates(for_date=START_DATE + datetime.timedelta(days=offset), eur=eur))
+        rates = await self.store.stats(
+            base="usd",
+            targets=("eur", "usd"),
+            start=START_DATE,
+            end=START_DATE + datetime.timedelta(days=2),
+        )
+        self.assertEqual(list(rates), ["eur", "usd"])
+        self.assertEqual(rates["usd"]["count"], 3)
+        stats = rates["eur"]
+        self.assertEqual(stats["count"], 3)
+        self.assertEqual(stats["min"], 0.8)
+        self.assertEqual(stats["max"], 1.0)
+        self.assertAlmostEqual(stats["mean"], 0.9)
+        self.assertAlmostEqual(stats["change_percent"], 12.5)
+        self.assertGreater(stats["volatility"], 0)
+        self.assertFalse(math.isnan(stats["volatility"]))
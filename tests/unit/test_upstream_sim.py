@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import datetime
+import random
+from typing import TYPE_CHECKING
+from unittest import (
+    IsolatedAsyncioTestCase,
+    TestCase,
+)
+
+from aiohttp import ClientPayloadError
+from aiohttp.test_utils import (
+    AioHTTPTestCase,
+    TestClient,
+    TestServer,
+)
+
+from src.lib.coders import json_decoder_decimal
+from src.lib.upstream_sim import (
+    CURRENCY_PATH,
+    LatencyDistribution,
+    SimulatorOptions,
+    create_simulator_app,
+    currency_codes,
+)
+
+if TYPE_CHECKING:
+    from aiohttp.web import Application
+
+LATEST = datetime.date(2024, 5, 1)
+
+
+class TestLatencyDistribution(TestCase):
+    def test_sample(self) -> None:
+        distribution = LatencyDistribution.parse("p50=10, p90=100,p100=1000")
+        rng = random.Random(0)  # noqa: S311
+        samples = sorted(distribution.sample(rng=rng) for _ in range(10_000))
+        self.assertAlmostEqual(samples[5_000], 0.01, delta=0.002)
+        self.assertAlmostEqual(samples[9_000], 0.1, delta=0.02)
+        self.assertLessEqual(samples[-1], 1)
+        with self.assertRaises(ValueError):
+            LatencyDistribution.parse("p0=10")
+
+    def test_currency_codes(self) -> None:
+        codes = currency_codes(count=2000)
+        self.assertEqual(len(set(codes)), 2000)
+        self.assertIn("usd", codes)
+
+
+class TestUpstreamSimulator(AioHTTPTestCase):
+    options = SimulatorOptions(latest=LATEST, seed=1)
+
+    async def get_application(self) -> Application:
+        return create_simulator_app(options=self.options)
+
+    def url(self, for_date: str, currency: str = "usd") -> str:
+        return CURRENCY_PATH.format(date=for_date, currency=currency)
+
+    async def test_document(self) -> None:
+        async with self.client.get(self.url(for_date="2024-04-30")) as response:
+            self.assertEqual(response.status, 200)
+            document = json_decoder_decimal.decode(await response.read())
+        self.assertEqual(document["date"], "2024-04-30")
+        self.assertEqual(document["usd"]["usd"], 1)
+        async with self.client.get(self.url(for_date="2024-04-30")) as response:
+            self.assertEqual(json_decoder_decimal.decode(await response.read()), document)
+        async with self.client.get(self.url(for_date="latest")) as response:
+            self.assertEqual(json_decoder_decimal.decode(await response.read())["date"], LATEST.isoformat())
+        for for_date, currency in (("2024-05-02", "usd"), ("2024-04-30", "abc"), ("yesterday", "usd")):
+            async with self.client.get(self.url(for_date=for_date, currency=currency)) as response:
+                self.assertEqual(response.status, 404)
+
+
+class TestUpstreamSimulatorFaults(IsolatedAsyncioTestCase):
+    url = CURRENCY_PATH.format(date="2024-04-30", currency="eur")
+
+    async def test_status_faults(self) -> None:
+        cases = (
+            (SimulatorOptions(latest=LATEST, error_rate=1), {500, 502, 503, 504}),
+            (SimulatorOptions(latest=LATEST, not_found_rate=1), {404}),
+        )
+        for options, statuses in cases:
+            with self.subTest(options=options):
+                async with TestClient(TestServer(create_simulator_app(options=options))) as client:
+                    async with client.get(self.url) as response:
+                        self.assertIn(response.status, statuses)
+
+    async def test_slow_body(self) -> None:
+        options = SimulatorOptions(latest=LATEST, slow_body_rate=1, chunk_size=16, chunk_delay=0)
+        async with TestClient(TestServer(create_simulator_app(options=options))) as client:
+            async with client.get(self.url) as response:
+                document = json_decoder_decimal.decode(await response.read())
+            self.assertEqual(document["date"], "2024-04-30")
+            async with client.get("/stats") as response:
+                self.assertEqual((await response.json())["slow"], 1)
+
+    async def test_reset(self) -> None:
+        options = SimulatorOptions(latest=LATEST, reset_rate=1)
+        async with TestClient(TestServer(create_simulator_app(options=options))) as client:
+            with self.assertRaises(ClientPayloadError):
+                async with client.get(self.url) as response:
+                    await response.read()
@@ -8,6 +8,7 @@ from unittest.mock import (
 
 from aiohttp.web_exceptions import (
     HTTPBadRequest,
+    HTTPNotFound,
     HTTPUnprocessableEntity,
 )
 
@@ -17,6 +18,7 @@ from tests.data import DataHelper
 data_helper = DataHelper.get_helper()
 
 AVAILABLE_CURRENCIES = data_helper.available_currencies
+COVERAGE_START = datetime.date(2020, 1, 1)
 
 
 class TestCurrencyValidators(IsolatedAsyncioTestCase):
@@ -47,6 +49,43 @@ class TestCurrencyValidators(IsolatedAsyncioTestCase):
                     validators.validate_provided_date(provided_date=date)
                 self.assertEqual(context.exception.reason, "The date specified must be in ISO format")
 
+    def test_validate_date_range(self) -> None:
+        current_date = datetime.datetime.now(tz=datetime.UTC).date()
+        start, end = validators.validate_date_range(start=None, end=None, default_days=7)
+        self.assertEqual(end, current_date)
+        self.assertEqual(start, current_date - datetime.timedelta(days=7))
+        start, end = validators.validate_date_range(start="2024-01-01", end="2024-02-01")
+        self.assertEqual((start, end), (datetime.date(2024, 1, 1), datetime.date(2024, 2, 1)))
+        with self.assertRaises(HTTPUnprocessableEntity):
+            validators.validate_date_range(start="2024-02-02", end="2024-02-01")
+
+    def test_coverage_window(self) -> None:
+        today = datetime.datetime.now(tz=datetime.UTC).date()
+        coverage_window = validators.CoverageWindow(start=datetime.date(2024, 3, 2))
+        coverage_window.check(for_date=datetime.date(2024, 3, 2))
+        coverage_window.check(for_date=today)
+        for date in (datetime.date(2024, 3, 1), today + datetime.timedelta(days=1)):
+            with self.subTest(date=date):
+                with self.assertRaises(HTTPNotFound):
+                    coverage_window.check(for_date=date)
+        self.assertEqual(coverage_window.stats()["rejected"], 2)
+
+        coverage_window.observe(for_date=datetime.date(2024, 2, 1), found=True)
+        self.assertEqual(coverage_window.start, datetime.date(2024, 2, 1))
+        coverage_window.observe(for_date=datetime.date(2024, 2, 1), found=False)
+        self.assertEqual(coverage_window.start, datetime.date(2024, 2, 1))
+
+        coverage_window = validators.CoverageWindow(start=datetime.date(2024, 3, 2))
+        coverage_window.observe(for_date=datetime.date(2024, 3, 2), found=False)
+        self.assertEqual(coverage_window.start, datetime.date(2024, 3, 2))
+        coverage_window.observe(for_date=datetime.date(2024, 6, 1), found=True)
+        coverage_window.observe(for_date=datetime.date(2024, 3, 2), found=False)
+        self.assertEqual(coverage_window.start, datetime.date(2024, 3, 3))
+        coverage_window.observe(for_date=datetime.date(2024, 5, 1), found=False)
+        self.assertEqual(coverage_window.start, datetime.date(2024, 3, 3))
+        self.assertEqual(coverage_window.stats()["learned"], 1)
+
+    @patch.object(validators, "coverage_window", validators.CoverageWindow(start=COVERAGE_START))
     @patch("src.lib.currency_check_exists.CheckCurrencyExists.get_all_currencies")
     async def test_get_currency_and_date(self, all_currencies: AsyncMock) -> None:
         request = MagicMock()
@@ -61,3 +100,7 @@ class TestCurrencyValidators(IsolatedAsyncioTestCase):
                 res_currency, res_date = await validators.get_currency_and_date(request=request)
                 self.assertEqual(res_currency, currency.lower())
                 self.assertEqual(res_date, date)
+
+        request.match_info = {"currency": "usd", "date": "2019-12-31"}
+        with self.assertRaises(HTTPNotFound):
+            await validators.get_currency_and_date(request=request)
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import asyncio
+from typing import TYPE_CHECKING
+from unittest import IsolatedAsyncioTestCase
+
+from src.lib.cache_storage import CacheStorage
+from src.lib.write_behind import WriteBehindStorage
+
+if TYPE_CHECKING:
+    from collections.abc import Mapping
+
+
+class DictStorage(CacheStorage):
+    def __init__(self) -> None:
+        self.entries: dict[str, bytes] = {}
+        self.batches: list[list[str]] = []
+        self.gate = asyncio.Event()
+        self.gate.set()
+        self.closed = False
+
+    async def cache_encoded(self, key: str, value: bytes) -> None:
+        await self.cache_encoded_many(entries={key: value})
+
+    async def cache_encoded_many(self, entries: Mapping[str, bytes]) -> None:
+        await self.gate.wait()
+        self.batches.append(list(entries))
+        self.entries.update(entries)
+
+    async def read_currency_info(self, key: str) -> bytes | None:
+        return self.entries.get(key)
+
+    async def cached_keys(self) -> list[str]:
+        return list(self.entries)
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+class TestWriteBehindStorage(IsolatedAsyncioTestCase):
+    async def test_write_through_until_started(self) -> None:
+        storage = DictStorage()
+        write_behind = WriteBehindStorage(storage=storage)
+        await write_behind.cache_encoded(key="a", value=b"1")
+        self.assertEqual(storage.entries, {"a": b"1"})
+
+    async def test_batches(self) -> None:
+        storage = DictStorage()
+        write_behind = WriteBehindStorage(storage=storage, batch_size=2, flush_interval=60)
+        write_behind.start()
+        storage.gate.clear()
+        await write_behind.cache_encoded(key="a", value=b"1")
+        await write_behind.cache_encoded(key="a", value=b"2")
+        self.assertEqual(storage.entries, {})
+        self.assertEqual(await write_behind.read_currency_info(key="a"), b"2")
+        await write_behind.cache_encoded(key="b", value=b"3")
+        await asyncio.sleep(0)
+        self.assertEqual(await write_behind.read_currency_info(key="b"), b"3")
+        self.assertEqual(sorted(await write_behind.cached_keys()), ["a", "b"])
+        storage.gate.set()
+        await write_behind.cache_encoded(key="c", value=b"4")
+        await write_behind.close()
+        self.assertEqual(storage.batches, [["a", "b"], ["c"]])
+        self.assertEqual(storage.entries, {"a": b"2", "b": b"3", "c": b"4"})
+        self.assertTrue(storage.closed)
+        stats = write_behind.stats()
+        self.assertEqual((stats["pending"], stats["written"], stats["coalesced"]), (0, 3, 1))
+
+    async def test_backpressure(self) -> None:
+        storage = DictStorage()
+        storage.gate.clear()
+        write_behind = WriteBehindStorage(storage=storage, max_pending=1, batch_size=1, put_timeout=0.01)
+        write_behind.start()
+        await write_behind.cache_encoded(key="a", value=b"1")
+        await asyncio.sleep(0.01)
+        await write_behind.cache_encoded(key="b", value=b"2")
+        await write_behind.cache_encoded(key="c", value=b"3")
+        self.assertEqual((write_behind.delayed, write_behind.dropped), (1, 1))
+        storage.gate.set()
+        await write_behind.close()
+        self.assertEqual(storage.entries, {"a": b"1", "b": b"2"})